@@ -0,0 +1,289 @@
+# app/admin.py
+import os, hmac, time
+from typing import Optional
+
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from .killswitch import clear_halt
+from .market import fetch_positions, current_position_side_qty
+from .symbols import SymbolResolver
+from .tca import load as tca_load, analyze as tca_analyze
+
+router = APIRouter(prefix="/admin")
+
+
+def require_admin(request: Request):
+    """
+    관리 엔드포인트 인증: X-Admin-Secret 헤더 == ADMIN_SECRET (비어 있으면 관리 기능 비활성).
+    RELAY_SHARED_SECRET은 TradingView 알림 바디에 평문으로 실리므로 관리 권한에 쓰지 않는다.
+    """
+    secret = request.app.state.cfg.admin_secret
+    if not secret:
+        raise HTTPException(403, "admin disabled (ADMIN_SECRET not set)")
+    got = request.headers.get("x-admin-secret") or ""
+    if not hmac.compare_digest(got, secret):
+        raise HTTPException(401, "unauthorized")
+
+
+@router.get("/config")
+def config_info(request: Request):
+    require_admin(request)
+    return request.app.state.config_reloader.info()
+
+
+@router.post("/config/reload")
+def config_reload(request: Request, force: bool = False):
+    require_admin(request)
+    res = request.app.state.config_reloader.reload(force=force)
+    if res.get("status") in ("rejected", "error"):
+        raise HTTPException(422, res)
+    return res
+
+
+@router.get("/ratelimit")
+def ratelimit_metrics(request: Request):
+    require_admin(request)
+    return {name: b.metrics() for name, b in request.app.state.budgets.items()}
+
+
+@router.get("/admission")
+async def admission_metrics(request: Request):
+    require_admin(request)
+    return request.app.state.admission.info()
+
+
+@router.get("/prewarm")
+def prewarm_info(request: Request):
+    require_admin(request)
+    return {**request.app.state.prewarm.info(), "snapshots": request.app.state.snapshots.info()}
+
+
+@router.post("/prewarm/run")
+def prewarm_run(request: Request):
+    require_admin(request)
+    return request.app.state.prewarm.run_once()
+
+
+@router.get("/sizing")
+def sizing_table(request: Request):
+    require_admin(request)
+    return request.app.state.sizing_table.info()
+
+
+@router.post("/sizing/rebuild")
+def sizing_rebuild(request: Request):
+    require_admin(request)
+    return request.app.state.sizing_table.rebuild(request.app.state.cfg)
+
+
+@router.get("/outbox")
+def outbox_pending(request: Request):
+    require_admin(request)
+    return {"pending": request.app.state.outbox.pending()}
+
+
+@router.get("/outbox/{cid}")
+def outbox_record(request: Request, cid: str):
+    require_admin(request)
+    rec = request.app.state.outbox.load(cid)
+    if rec is None:
+        raise HTTPException(404, "not found")
+    return rec
+
+
+@router.get("/latency")
+def latency(request: Request):
+    require_admin(request)
+    st = request.app.state
+    return {"clock": st.clock.info(), "max_signal_age_s": st.cfg.admission_max_signal_age_s, "strategies": st.latency.summary()}
+
+
+@router.post("/latency/clock")
+def latency_clock(request: Request):
+    require_admin(request)
+    request.app.state.clock.measure()
+    return request.app.state.clock.info()
+
+
+@router.get("/symbols")
+def symbols(request: Request, q: Optional[str] = None):
+    require_admin(request)
+    res = request.app.state.symbols
+    out = res.info()
+    if q:
+        out["resolved"] = {s.strip(): res.resolve(s) for s in q.split(",") if s.strip()}
+    return out
+
+
+@router.post("/symbols/reload")
+def symbols_reload(request: Request):
+    """신규 상장 반영: 마켓 재로딩 후 테이블 재생성."""
+    require_admin(request)
+    st = request.app.state
+    st.ex.load_markets(True)
+    st.symbols = SymbolResolver.from_exchange(st.ex)
+    return st.symbols.info()
+
+
+@router.get("/orderbook")
+def orderbook(request: Request, symbol: Optional[str] = None, side: str = "buy", amount: float = 0.0):
+    """피드 상태. symbol+amount를 주면 해당 수량의 예상 VWAP/임팩트."""
+    require_admin(request)
+    feed = request.app.state.orderbook
+    out = feed.info()
+    if symbol and amount > 0:
+        out["estimate"] = feed.estimate(symbol, side, amount)
+    return out
+
+
+@router.get("/indicators")
+def indicators(request: Request):
+    require_admin(request)
+    return request.app.state.indicators.info()
+
+
+@router.post("/indicators/refresh")
+def indicators_refresh(request: Request):
+    require_admin(request)
+    return request.app.state.indicators.refresh()
+
+
+@router.get("/candles")
+def candles(request: Request):
+    require_admin(request)
+    store = request.app.state.candles
+    if store is None:
+        return {"enabled": False}
+    return {"enabled": True, **store.info()}
+
+
+@router.post("/kill")
+def kill(request: Request, reason: str = "admin", flatten: bool = True, symbols: Optional[str] = None):
+    """중지 플래그 + 전 심볼 미체결 취소 + reduce-only 시장가 청산. 심볼별 ms 보고."""
+    require_admin(request)
+    syms = [s.strip() for s in (symbols or "").split(",") if s.strip()]
+    by = getattr(request.client, "host", "unknown")
+    return request.app.state.killswitch.kill(reason, by, flatten, syms)
+
+
+@router.get("/halt")
+def halt_info(request: Request):
+    require_admin(request)
+    return request.app.state.killswitch.info()
+
+
+@router.post("/halt")
+def halt_set(request: Request, reason: str = "admin"):
+    """청산 없이 신규 신호만 막음 (대기 중인 진입 아웃박스는 폐기)."""
+    require_admin(request)
+    return request.app.state.killswitch.kill(reason, getattr(request.client, "host", "unknown"), flatten=False)
+
+
+@router.post("/halt/clear")
+def halt_clear(request: Request):
+    require_admin(request)
+    return {"cleared": clear_halt(request.app.state.r)}
+
+
+@router.get("/leader")
+def leader(request: Request):
+    require_admin(request)
+    return request.app.state.leader.info()
+
+
+@router.get("/ledger")
+def ledger(request: Request, drift: bool = True):
+    """전략별 가상 포지션 + 상계 통계. drift=true: 심볼마다 거래소 순포지션과의 차이 (거래소 조회 1회/심볼)."""
+    require_admin(request)
+    app = request.app
+    led = app.state.ledger
+    exchange = None
+    if drift:
+        exchange = {}
+        for sym in led.info():
+            side, qty = current_position_side_qty(fetch_positions(app.state.ex, sym))
+            exchange[sym] = float(qty or 0.0) * (1.0 if side == "long" else -1.0)
+    return {"netting": app.state.netting.info(), "symbols": led.info(exchange)}
+
+
+@router.post("/ledger/assign")
+def ledger_assign(request: Request, strategy: str, symbol: str, qty: float, price: Optional[float] = None):
+    """
+    기존 거래소 포지션(가상 포지션 도입 전/수동 주문)을 전략에 귀속: qty 부호 있음(+롱/-숏).
+    price 없으면 거래소 진입가. 주문은 내지 않음 — 가상 포지션만 기록.
+    """
+    require_admin(request)
+    app = request.app
+    if price is None:
+        price = float(fetch_positions(app.state.ex, symbol).get("entryPrice") or 0.0)
+    if not price or price <= 0:
+        raise HTTPException(400, "price required (no exchange entry price)")
+    return {"strategy": strategy, "symbol": symbol, **app.state.ledger.apply(strategy, symbol, qty, price)}
+
+
+@router.get("/profile")
+def profile_info(request: Request):
+    require_admin(request)
+    return {**request.app.state.profiler.info(), "sampler": request.app.state.sampler.info()}
+
+
+@router.post("/profile/arm")
+def profile_arm(request: Request, count: int = 1, pattern: str = "", mode: str = "cprofile", ttl_s: float = 3600.0):
+    """다음 count개 웹훅(pattern: id 정규식)을 프로파일. mode=cprofile|sample, ttl_s 후 자동 해제."""
+    require_admin(request)
+    try:
+        return request.app.state.profiler.arm(count, pattern, mode, ttl_s)
+    except Exception as e:
+        raise HTTPException(400, str(e))
+
+
+@router.post("/profile/disarm")
+def profile_disarm(request: Request):
+    require_admin(request)
+    return {"disarmed": request.app.state.profiler.disarm()}
+
+
+@router.get("/profile/stacks", response_class=PlainTextResponse)
+def profile_stacks(request: Request, reset: bool = False):
+    """상시 샘플링 누적 (collapsed stack: flamegraph.pl / speedscope 입력)."""
+    require_admin(request)
+    sampler = request.app.state.sampler
+    out = sampler.folded()
+    if reset:
+        sampler.reset()
+    return out
+
+
+@router.get("/profile/{name}")
+def profile_run(request: Request, name: str, raw: bool = False):
+    """요청 프로파일 하나: 요약(JSON, cProfile은 누적 시간순 상위 함수) 또는 raw=1 → .prof/.folded 파일."""
+    require_admin(request)
+    rec = request.app.state.profiler.load(name)
+    if rec is None:
+        raise HTTPException(404, "profile not found")
+    if raw:
+        if not os.path.exists(rec["path"]):
+            raise HTTPException(404, "profile file pruned")
+        return FileResponse(rec["path"], filename=os.path.basename(rec["path"]))
+    return rec
+
+
+@router.get("/tca")
+def tca(request: Request, since_h: float = 24.0, by: str = "strategy,symbol,regime"):
+    """체결 비용 분석: 전체/그룹별 shortfall·지연·체결·수수료 bps + MAX_SLIPPAGE/FEE_BUFFER/엣지 조정 근거."""
+    require_admin(request)
+    app = request.app
+    a = tca_load(app.state.r, time.time() - since_h * 3600 if since_h > 0 else None)
+    return tca_analyze(a, [k.strip() for k in by.split(",") if k.strip()], app.state.cfg)
+
+
+@router.get("/transport")
+def transport(request: Request, reset: bool = False):
+    """공유 HTTP 전송: 호스트별 풀 크기/요청/새 연결/재사용률/연결 시간, DNS 캐시, 분류별 타임아웃."""
+    require_admin(request)
+    t = request.app.state.transport
+    out = t.info()
+    if reset:
+        t.stats.reset()
+    return out
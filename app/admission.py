@@ -0,0 +1,165 @@
+# app/admission.py
+import time, heapq, asyncio, itertools
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+EXIT, TARGET, ENTRY = 0, 1, 2
+_PRIO_NAME = {EXIT: "exit", TARGET: "target", ENTRY: "entry"}
+
+
+class AdmissionController:
+    """
+    웹훅 동시 처리 제한 + 우선순위 대기열 (이벤트 루프 내부에서만 사용, 락 불필요).
+    - 동시 처리 ADMISSION_MAX_CONCURRENT, 청산 계열은 ADMISSION_EXIT_RESERVE 만큼 추가 슬롯 사용 가능
+    - 대기열은 (우선순위, 도착순) 힙: 청산 > target > 진입
+    - 대기열이 가득 차면 진입은 503(Retry-After), 청산은 대기 중인 가장 늦은 진입을 밀어냄
+    - 신호가 ADMISSION_MAX_SIGNAL_AGE_S 보다 오래된 진입은 즉시/대기 중 만료 시 429로 버림
+    """
+    def __init__(self, cfg_getter: Callable[[], Any]):
+        self.cfg = cfg_getter
+        self.active = 0
+        self.active_by: Dict[str, int] = {"exit": 0, "target": 0, "entry": 0}
+        self._heap: List[list] = []          # [prio, seq, future, deadline, alive]
+        self._queued = 0
+        self._seq = itertools.count()
+        self._svc_ewma = 0.5                 # 처리 시간 EWMA (초)
+        self.counters: Dict[str, int] = {}
+
+    def _incr(self, k: str, n: int = 1):
+        self.counters[k] = self.counters.get(k, 0) + n
+
+    # --- capacity ---
+    def _limit(self, prio: int) -> int:
+        cfg = self.cfg()
+        return cfg.admission_max_concurrent + (cfg.admission_exit_reserve if prio == EXIT else 0)
+
+    def retry_after(self) -> int:
+        cfg = self.cfg()
+        per_slot = self._svc_ewma / max(1, cfg.admission_max_concurrent)
+        return max(1, int(round((self._queued + 1) * per_slot + 0.5)))
+
+    def _reject(self, code: int, reason: str, prio: int):
+        self._incr(f"rejected:{reason}:{_PRIO_NAME[prio]}")
+        headers = {"Retry-After": str(self.retry_after())} if code == 503 else None
+        raise HTTPException(status_code=code, detail=f"admission: {reason}", headers=headers)
+
+    def _evict_entry(self) -> bool:
+        """대기 중인 진입 중 가장 늦게 온 것을 밀어냄."""
+        victim = None
+        for item in self._heap:
+            if item[4] and item[0] == ENTRY and (victim is None or item[1] > victim[1]):
+                victim = item
+        if victim is None:
+            return False
+        victim[4] = False
+        self._queued -= 1
+        if not victim[2].done():
+            victim[2].set_exception(HTTPException(
+                status_code=503, detail="admission: evicted_by_exit",
+                headers={"Retry-After": str(self.retry_after())}))
+        self._incr("evicted:entry")
+        return True
+
+    def _dispatch(self):
+        """여유 슬롯이 있으면 대기열 앞에서부터 깨움."""
+        now = time.monotonic()
+        while self._heap:
+            prio, _, fut, deadline, alive = self._heap[0]
+            if not alive or fut.done():
+                heapq.heappop(self._heap)
+                continue
+            if deadline is not None and now > deadline:
+                heapq.heappop(self._heap)
+                self._queued -= 1
+                self._incr(f"rejected:expired_in_queue:{_PRIO_NAME[prio]}")
+                fut.set_exception(HTTPException(status_code=429, detail="admission: expired_in_queue"))
+                continue
+            if self.active >= self._limit(prio):
+                return
+            heapq.heappop(self._heap)
+            self._queued -= 1
+            self.active += 1
+            fut.set_result(None)
+
+    # --- public ---
+    def signal_deadline(self, intent, prio: int) -> Optional[float]:
+        """진입 신호의 만료 시각(monotonic). 나이 제한 없음/청산/타임스탬프 없음 → None."""
+        max_age = self.cfg().admission_max_signal_age_s
+        if max_age <= 0 or prio == EXIT or intent.alert_ts is None:
+            return None
+        return time.monotonic() + (max_age - (time.time() - intent.alert_ts))
+
+    @asynccontextmanager
+    async def slot(self, intent):
+        cfg = self.cfg()
+        prio = intent.priority
+        name = _PRIO_NAME[prio]
+        deadline = self.signal_deadline(intent, prio)
+        if deadline is not None and deadline <= time.monotonic():
+            self._reject(429, "stale_signal", prio)
+
+        t_q = time.monotonic()
+        # 청산은 대기열을 건너뜀 (진입/target 대기열은 일반 슬롯이 모두 찼다는 뜻)
+        if self.active < self._limit(prio) and (prio == EXIT or not self._queued):
+            self.active += 1
+        else:
+            if self._queued >= cfg.admission_max_queue and not (prio == EXIT and self._evict_entry()):
+                self._reject(503, "queue_full", prio)
+            fut = asyncio.get_running_loop().create_future()
+            wait_s = cfg.admission_queue_wait_s
+            if deadline is not None:
+                wait_s = min(wait_s, deadline - time.monotonic())
+            item = [prio, next(self._seq), fut, deadline, True]
+            heapq.heappush(self._heap, item)
+            self._queued += 1
+            self._incr(f"queued:{name}")
+            try:
+                await asyncio.wait_for(asyncio.shield(fut), timeout=max(0.0, wait_s))
+            except asyncio.TimeoutError:
+                if fut.done():
+                    if fut.exception() is not None:       # 밀려남/만료와 경합
+                        raise fut.exception()
+                    # 타임아웃 직전에 슬롯 배정됨 → 그대로 진행
+                else:
+                    item[4] = False
+                    self._queued -= 1
+                    self._reject(429 if deadline is not None and time.monotonic() >= deadline else 503,
+                                 "queue_timeout", prio)
+            except asyncio.CancelledError:
+                if fut.done() and fut.exception() is None:
+                    self.active -= 1
+                    self._dispatch()
+                elif item[4]:
+                    item[4] = False
+                    self._queued -= 1
+                raise
+
+        self._incr(f"admitted:{name}")
+        self.active_by[name] += 1
+        t0 = time.monotonic()
+        self._incr(f"queue_wait_ms:{name}", int((t0 - t_q) * 1000))
+        try:
+            yield
+        finally:
+            self._svc_ewma = 0.8 * self._svc_ewma + 0.2 * (time.monotonic() - t0)
+            self.active -= 1
+            self.active_by[name] -= 1
+            self._dispatch()
+
+    def info(self) -> Dict[str, Any]:
+        cfg = self.cfg()
+        return {
+            "active": self.active,
+            "active_by": dict(self.active_by),
+            "queued": self._queued,
+            "max_concurrent": cfg.admission_max_concurrent,
+            "exit_reserve": cfg.admission_exit_reserve,
+            "max_queue": cfg.admission_max_queue,
+            "queue_wait_s": cfg.admission_queue_wait_s,
+            "max_signal_age_s": cfg.admission_max_signal_age_s,
+            "service_ewma_ms": round(self._svc_ewma * 1000, 2),
+            "retry_after_s": self.retry_after(),
+            "counters": dict(self.counters),
+        }
@@ -123,3 +123,17 @@ def fetch_equity_generic(ex, cfg: Config):
         log("balance_zero", hint="equity=0 (check testnet funding / EQUITY_CODE / EQUITY_SOURCE / ex instance)", snapshot=snap)
         return 0.0
     return _inner
+
+
+def fetch_equity_cached(ex, cfg: Config, snaps):
+    """프리웜 스냅샷(SNAPSHOT_EQUITY_MAX_AGE_S 이내)이 있으면 재사용, 없으면 조회 후 저장."""
+    live = fetch_equity_generic(ex, cfg)
+    def _inner():
+        v = snaps.get("equity", cfg.equity_code, cfg.snapshot_equity_max_age_s)
+        if v is not None:
+            return v
+        v = live()
+        if v > 0:
+            snaps.put("equity", cfg.equity_code, v)
+        return v
+    return _inner
@@ -0,0 +1,64 @@
+# app/breaker.py
+import time, threading
+from typing import Dict, Any
+
+
+class CircuitBreaker:
+    """
+    연속 실패 fail_threshold 회 → open (reset_after_s 동안 호출 차단)
+    → half_open (시험 호출 1회 허용) → 성공 시 closed, 실패 시 다시 open.
+    """
+    def __init__(self, fail_threshold: int = 3, reset_after_s: float = 60.0):
+        self.fail_threshold = max(1, int(fail_threshold))
+        self.reset_after_s = float(reset_after_s)
+        self.failures = 0
+        self.opened_at: float = 0.0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.fail_threshold:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_after_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            st = self.state
+            if st == "closed":
+                return True
+            if st == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """결과를 판정할 수 없는 호출(로컬 예산 소진 등): 상태는 그대로, 시험 호출만 반납."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.fail_threshold:
+                if self.failures == self.fail_threshold:
+                    self.trips += 1
+                self.opened_at = time.time()
+
+    def info(self) -> Dict[str, Any]:
+        st = self.state
+        return {
+            "state": st,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in_s": round(max(0.0, self.opened_at + self.reset_after_s - time.time()), 3) if st == "open" else 0.0,
+        }
@@ -0,0 +1,158 @@
+# app/candles.py
+import os, time, fcntl, threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .regime_engine import timeframe_seconds
+
+# 고정 폭 레코드 (48B) — 파일 = 레코드 배열 그대로, 길이 = 파일 크기 // 48
+CANDLE_DTYPE = np.dtype([("ts", "<i8"), ("o", "<f8"), ("h", "<f8"), ("l", "<f8"), ("c", "<f8"), ("v", "<f8")])
+_PAGE = 1000
+
+
+def _safe(s: str) -> str:
+    return "".join(ch if ch.isalnum() else "_" for ch in s)
+
+
+class CandleStore:
+    """
+    (거래소, 심볼, 타임프레임)별 닫힌 봉 저장소. 레코드 파일을 np.memmap으로 열어 복사 없이 읽는다.
+    - sync(): 마지막 ts 이후만 받아 append, 중간 구멍이 있으면 그 구간만 받아 정렬 병합 후 원자 교체
+    - 쓰기는 파일 락(flock, 비차단) → 여러 워커 중 하나만 동기화, 나머지는 읽기만
+    - 읽기는 파일 크기로 길이를 정하므로 쓰는 중인 마지막 부분 레코드는 보이지 않음
+    - max_rows 초과 시 오래된 봉부터 잘라냄
+    """
+    def __init__(self, root: str, max_rows: int = 200000):
+        self.root = root
+        self.max_rows = max_rows
+        self._maps: Dict[str, Tuple[int, int, np.memmap]] = {}    # path → (inode, 길이, 맵)
+        self._lock = threading.Lock()
+        self._holes = set()        # 거래소에도 없는 구간 (점검 등) → 다시 받지 않음
+        self.stats = {"synced_rows": 0, "backfilled_rows": 0, "fetches": 0, "lock_busy": 0}
+
+    def path(self, exchange: str, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, _safe(exchange), f"{_safe(symbol)}_{timeframe}.bin")
+
+    # --- read ---
+    def read(self, exchange: str, symbol: str, timeframe: str, n: Optional[int] = None) -> np.ndarray:
+        """최근 n개 (없으면 전체) 구조화 배열 뷰. 파일이 없으면 빈 배열."""
+        p = self.path(exchange, symbol, timeframe)
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        rows = st.st_size // CANDLE_DTYPE.itemsize
+        if rows == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        with self._lock:
+            cached = self._maps.get(p)
+            if cached is None or cached[0] != st.st_ino or cached[1] != rows:
+                cached = (st.st_ino, rows, np.memmap(p, dtype=CANDLE_DTYPE, mode="r", shape=(rows,)))
+                self._maps[p] = cached
+        m = cached[2]
+        return m if n is None or n >= rows else m[rows - n:]
+
+    def last_ts(self, exchange: str, symbol: str, timeframe: str) -> Optional[int]:
+        a = self.read(exchange, symbol, timeframe, 1)
+        return int(a["ts"][0]) if len(a) else None
+
+    # --- write ---
+    def _fetch(self, ex, symbol: str, timeframe: str, since: int, until_ms: int) -> np.ndarray:
+        """[since, until_ms) 닫힌 봉을 페이지 단위로."""
+        step_ms = timeframe_seconds(timeframe) * 1000
+        out = []
+        t = since
+        while t < until_ms:
+            self.stats["fetches"] += 1
+            rows = ex.fetch_ohlcv(symbol, timeframe=timeframe, since=int(t), limit=_PAGE) or []
+            rows = [r for r in rows if r and len(r) > 5 and t <= r[0] < until_ms]
+            if not rows:
+                break
+            out.extend(rows)
+            t = int(rows[-1][0]) + step_ms
+        if not out:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        a = np.array([tuple(float(x or 0.0) for x in r[:6]) for r in out], dtype=[(k, "<f8") for k in CANDLE_DTYPE.names])
+        return a.astype(CANDLE_DTYPE)
+
+    @staticmethod
+    def _merge(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+        a = np.concatenate([np.asarray(old), new]) if len(old) else new
+        _, idx = np.unique(a["ts"][::-1], return_index=True)     # 같은 ts는 나중 것(새 데이터) 유지
+        return a[::-1][idx]
+
+    def _rewrite(self, p: str, a: np.ndarray):
+        tmp = f"{p}.tmp{os.getpid()}"
+        a.tofile(tmp)
+        os.replace(tmp, p)
+
+    def sync(self, ex, exchange: str, symbol: str, timeframe: str, lookback: int) -> Dict[str, int]:
+        """최소 lookback개의 닫힌 봉이 있도록 보충 + 최신 봉 append + 구멍 메우기."""
+        step_ms = timeframe_seconds(timeframe) * 1000
+        now_ms = int(time.time() * 1000)
+        closed_until = now_ms // step_ms * step_ms          # 이 시각 이전에 시작한 봉만 닫힘
+        p = self.path(exchange, symbol, timeframe)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        # 락은 별도 파일에 (데이터 파일은 병합 시 교체되어 inode가 바뀜)
+        with open(p + ".lock", "a") as lk:
+            try:
+                fcntl.flock(lk, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.stats["lock_busy"] += 1
+                return {"appended": 0, "backfilled": 0, "busy": 1}
+            try:
+                cur = self.read(exchange, symbol, timeframe)
+                want_from = closed_until - lookback * step_ms
+                appended = backfilled = 0
+                if len(cur) == 0 or int(cur["ts"][0]) > want_from:
+                    # 앞쪽 보충 (처음 또는 lookback 증가)
+                    head_until = int(cur["ts"][0]) if len(cur) else closed_until
+                    new = self._fetch(ex, symbol, timeframe, want_from, head_until)
+                    if len(new):
+                        backfilled += len(new)
+                        cur = self._merge(cur, new)
+                        self._rewrite(p, cur[-self.max_rows:])
+                        cur = self.read(exchange, symbol, timeframe)
+                ts = cur["ts"] if len(cur) else np.empty(0, dtype="<i8")
+                gaps = np.nonzero(np.diff(ts) > step_ms)[0] if len(ts) > 1 else []
+                gaps = [i for i in gaps if (p, int(ts[i])) not in self._holes]
+                if gaps:
+                    patch = []
+                    for i in gaps:
+                        x = self._fetch(ex, symbol, timeframe, int(ts[i]) + step_ms, int(ts[i + 1]))
+                        if len(x):
+                            patch.append(x)
+                        else:
+                            self._holes.add((p, int(ts[i])))
+                    if patch:
+                        new = np.concatenate(patch)
+                        backfilled += len(new)
+                        cur = self._merge(cur, new)
+                        self._rewrite(p, cur[-self.max_rows:])
+                        cur = self.read(exchange, symbol, timeframe)
+                last = int(cur["ts"][-1]) if len(cur) else want_from - step_ms
+                if last + step_ms < closed_until:
+                    new = self._fetch(ex, symbol, timeframe, last + step_ms, closed_until)
+                    if len(new):
+                        if len(cur) + len(new) > self.max_rows:
+                            self._rewrite(p, self._merge(cur, new)[-self.max_rows:])
+                        else:
+                            with open(p, "ab") as fh:
+                                fh.write(new.tobytes())
+                        appended = len(new)
+                self.stats["synced_rows"] += appended
+                self.stats["backfilled_rows"] += backfilled
+                return {"appended": appended, "backfilled": backfilled, "busy": 0}
+            finally:
+                fcntl.flock(lk, fcntl.LOCK_UN)
+
+    def info(self) -> Dict[str, object]:
+        files = {}
+        for dirpath, _, names in os.walk(self.root):
+            for n in names:
+                if n.endswith(".bin"):
+                    p = os.path.join(dirpath, n)
+                    rows = os.path.getsize(p) // CANDLE_DTYPE.itemsize
+                    files[os.path.relpath(p, self.root)] = rows
+        return {"root": self.root, "max_rows": self.max_rows, "files": files, "stats": dict(self.stats)}
@@ -1,6 +1,7 @@
 # app/config.py
 import os
 from dataclasses import dataclass
+from typing import List, Mapping
 
 # .env 자동 로드 (main.py에서 불러도 중복 호출 안전)
 try:
@@ -9,21 +10,21 @@ try:
 except Exception:
     pass
 
-def _env_bool(key: str, default: bool = False) -> bool:
-    v = os.getenv(key)
+def _env_bool(env: Mapping[str, str], key: str, default: bool = False) -> bool:
+    v = env.get(key)
     if v is None:
         return default
     return v.strip().lower() in ("1", "true", "yes", "on")
 
-def _env_float(key: str, default: float) -> float:
+def _env_float(env: Mapping[str, str], key: str, default: float) -> float:
     try:
-        return float(os.getenv(key, str(default)))
+        return float(env.get(key, str(default)))
     except Exception:
         return default
 
-def _env_int(key: str, default: int) -> int:
+def _env_int(env: Mapping[str, str], key: str, default: int) -> int:
     try:
-        return int(float(os.getenv(key, str(default))))
+        return int(float(env.get(key, str(default))))
     except Exception:
         return default
 
@@ -52,6 +53,17 @@ class Config:
     regime_phemex_sec_prod: str
     regime_symbol_eth: str
     regime_symbol_btc: str
+    regime_universe: str         # 콤마 구분 ccxt 심볼 (비우면 SYMBOL, BTC/USDT:USDT)
+    regime_basket: str           # 바스켓 구성 (비우면 universe 전체)
+    regime_basket_quorum: float  # bull/bear 판정에 필요한 바스켓 비율 (1.0 = 전부 일치)
+    regime_scope: str            # "basket" | "symbol" | "both"
+    regime_timeframe: str
+    regime_ema_len: int
+    regime_atr_len: int
+    regime_rv_window: int
+    regime_rv_max: float         # 연율화 실현변동성 상한 (0=off)
+    regime_ttl_s: float          # 스냅샷 재사용 시간
+    regime_funding_symbol: str   # basket 스코프에서 펀딩 게이트 기준 심볼
 
     # Fallback symbol
     symbol_fallback: str
@@ -65,6 +77,9 @@ class Config:
     fee_buffer: float
     recon_retries: int
     recon_wait: float
+    reconcile_deadline_s: float     # target 모드 수렴 대기 한도
+    reconcile_max_iter: int         # target 모드 주문 반복 한도
+    reconcile_poll_s: float         # target 모드 체결/포지션 재조회 간격
     use_mark_price: bool
     taker_fee: float
     min_notional_usdt: float
@@ -104,6 +119,14 @@ class Config:
     assume_hold_hours: float
     vix_url: str
     vix_max: float
+    vix_poll_s: float              # 백그라운드 재검증 주기
+    vix_stale_s: float             # 이 나이까지는 마지막 값 사용
+    external_timeout_s: float
+    external_breaker_fails: int
+    external_breaker_reset_s: float
+    funding_interval_h: float      # 정산 주기 (Phemex 8h)
+    funding_settle_s: float        # 정산 후 재조회 지연
+    funding_max_age_s: float       # 예측 펀딩비 재조회 최대 주기
 
     # Logging
     log_level: str
@@ -117,6 +140,7 @@ class Config:
     balance_debug: bool
 
     relay_shared_secret: str
+    admin_secret: str           # /admin/* 전용 (비어 있으면 관리 기능 비활성)
 
     # === Edge / Funding / TP policy ===
     edge_filter_enabled: bool
@@ -132,122 +156,445 @@ class Config:
     risk_hard_reject: bool
     allow_bump_to_min_order: bool
 
+    # === Shared rate-limit budget (Redis token bucket) ===
+    rl_enabled: bool
+    rl_capacity: float          # 버킷 크기 (버스트)
+    rl_refill_per_s: float      # 초당 보충 토큰
+    rl_order_reserve: float     # INFO 호출이 남겨둬야 하는 토큰 (주문 우선)
+    rl_order_max_wait_s: float
+    rl_info_max_wait_s: float
+    rl_breaker_fails: int
+    rl_breaker_reset_s: float
+
+    # === Admission control (웹훅 동시성/백프레셔) ===
+    admission_max_concurrent: int   # 동시에 처리하는 웹훅 수
+    admission_exit_reserve: int     # 청산 전용 추가 슬롯
+    admission_max_queue: int
+    admission_queue_wait_s: float
+    admission_max_signal_age_s: float   # 0=끄기, 진입 신호 timestamp 기준
+
+    # === Latency accounting ===
+    clock_skew_refresh_s: float     # 거래소 서버 시각 재측정 주기 (0=기동 시 1회)
+
+    # === L2 order book (depth-aware slippage) ===
+    orderbook_enabled: bool
+    orderbook_max_age_s: float      # 마지막 갱신이 이보다 오래된 호가는 쓰지 않음
+    orderbook_ws_url: str           # 비면 Phemex 기본 (testnet/mainnet)
+
+    # === Streaming indicators (Donchian/ATR/EMA) ===
+    indicator_enabled: bool
+    indicator_timeframe: str        # 전략 타임프레임 (번들 Pine: 5m)
+    indicator_don_len: int          # Pine lenDon
+    indicator_atr_len: int          # Pine atrLen
+    indicator_ema_len: int
+    indicator_sl_atr_x: float       # Pine atrSLx
+    indicator_tp_atr_x: float       # Pine atrTPx
+    indicator_levels: str           # fill=알림에 없을 때만 서버 SL/TP, override=항상 서버 값
+    indicator_validate: str         # off|log|enforce — 진입가가 Donchian 돌파인지
+    indicator_validate_tol: float   # 허용 오차(비율)
+
+    # === Candle store (memmap) ===
+    candle_store_enabled: bool
+    candle_store_dir: str
+    candle_store_max_rows: int      # (거래소, 심볼, 타임프레임)당 보관 봉 수
+
+    # === Kill switch ===
+    kill_max_workers: int           # 비상 청산 동시 요청 수 (심볼 병렬)
+
+    # === Hot standby (Redis lease + fencing) ===
+    ha_mode: str                    # off|lease
+    ha_instance_id: str             # 비면 hostname:pid
+    ha_lease_ttl_s: float           # 리더 임대 TTL
+    ha_renew_s: float               # 리더 갱신 주기 (< TTL)
+    ha_poll_s: float                # 대기 인스턴스 획득 시도 주기
+    ha_takeover_wait_s: float       # 대기 인스턴스로 온 웹훅이 승격을 기다리는 최대 시간 (0=즉시 503)
+
+    # === Bar-close prewarm / snapshots ===
+    prewarm_enabled: bool
+    prewarm_timeframes: str         # "5m,15m" — 전략 타임프레임
+    prewarm_lead_s: float           # 봉 마감 몇 초 전에 갱신
+    prewarm_symbols: str            # 비면 SYMBOL
+    snapshot_price_max_age_s: float # 요청 경로 티커 재사용 한도 (0=항상 조회)
+    snapshot_equity_max_age_s: float
+    leverage_cache_ttl_s: float     # 같은 레버리지 재설정 생략 기간 (0=항상 호출)
+
+    # === Sizing table ===
+    sizing_strategies: str          # 테이블을 미리 만들 전략 (그 외는 "*" 기본 행)
+    sizing_table_max_age_s: float   # 이보다 오래된 테이블은 사용 안 함 (0=테이블 끄기)
+
+    status_refresh_s: float         # /status 용 포지션/잔고 스냅샷 갱신 주기 (0=끄기)
+    response_verbose: bool          # 웹훅 응답에 ccxt 원본 주문/포지션 포함 (디버깅, ?verbose=1 과 동일)
+    batch_max_items: int            # /tv-webhook/batch 항목 수 상한
+
+    # === Virtual sub-positions / netting ===
+    netting_enabled: bool           # 같은 심볼 동시 신호를 순수량 주문 하나로 (원웨이 모드만)
+    netting_window_ms: float        # 단건 웹훅도 이 시간 동안 모아 상계 (0=단건은 즉시)
+    netting_max_wait_ms: float      # 배치 라운드가 나머지 항목을 기다리는 최대 시간
+
+    # === Profiling ===
+    profile_dir: str                # 요청 프로파일(.prof/.folded) 저장 위치
+    profile_keep: int               # 보관 개수 (디스크/Redis 요약)
+    profile_top: int                # cProfile 요약에 남길 함수 수
+    profile_sample_hz: float        # 상시 스택 샘플링 주기 (0=끄기)
+    profile_sample_max_stacks: int  # 상시 샘플링이 구분하는 스택 수 상한
+
+    # === TCA ===
+    tca_enabled: bool               # 체결마다 알림가/도착가/한도가/체결가 기록 (tca:trades)
+    tca_max_trades: int             # 스트림 보관 건수 (대략)
+
+    # === HTTP transport (app/transport.py) ===
+    http_pool_maxsize: int          # 호스트당 유지 커넥션 수 기본값
+    http_pool_hosts: str            # 호스트별 개별 크기 "api.phemex.com=16,..."
+    http_keepalive_idle_s: int      # TCP keep-alive 프로브 시작 (유휴 초)
+    http_dns_ttl_s: float           # DNS 캐시 TTL (0=끄기)
+    http_connect_timeout_s: float
+    http_read_timeout_order_s: float    # 주문/취소/레버리지
+    http_read_timeout_info_s: float     # 포지션/잔고/주문 조회
+    http_read_timeout_market_s: float   # 티커/캔들/호가/펀딩
+
+    # === Order outbox ===
+    outbox_inline_attempts: int     # 요청 안에서 시도 횟수 (이후 202 + 스윕)
+    outbox_max_attempts: int        # 총 시도 한도
+    outbox_backoff_s: float         # 지수 백오프 시작값
+    outbox_backoff_max_s: float
+    outbox_max_age_s: float         # 기록 후 이 시간이 지나면 제출 포기 (0=무제한)
+    outbox_sweep_s: float
+
     phemex_position_mode: str   # "oneway" | "hedge"
     phemex_hedged: bool         # True if hedge
 
+    # === Hot reload ===
+    config_file: str            # JSON 또는 KEY=VALUE 파일 (env 위에 덮어씀)
+    config_redis_key: str       # Redis hash (파일 위에 덮어씀)
+    config_reload_interval: float
+
+    config_version: int = 0     # 리로드마다 +1 (결정 로그에 기록)
+
+    def validate(self) -> List[str]:
+        """리로드 전 값 검증. 오류 메시지 목록(비어 있으면 통과)."""
+        errs: List[str] = []
+        for k in ("alloc_pct",
+                  "alloc_bull_bull", "alloc_bull_neutral", "alloc_bull_bear",
+                  "alloc_bear_bull", "alloc_bear_neutral", "alloc_bear_bear"):
+            v = getattr(self, k)
+            if not (0.0 <= v <= 1.0): errs.append(f"{k} out of [0,1]: {v}")
+        for k in ("lev_default",
+                  "lev_bull_bull", "lev_bull_neutral", "lev_bull_bear",
+                  "lev_bear_bull", "lev_bear_neutral", "lev_bear_bear"):
+            v = getattr(self, k)
+            if not (1 <= v <= 100): errs.append(f"{k} out of [1,100]: {v}")
+        if not (0.0 < self.max_slippage <= 0.2): errs.append(f"max_slippage out of (0,0.2]: {self.max_slippage}")
+        if not (0.0 <= self.fee_buffer < 0.1):   errs.append(f"fee_buffer out of [0,0.1): {self.fee_buffer}")
+        if not (0.0 < self.margin_buffer <= 1.0): errs.append(f"margin_buffer out of (0,1]: {self.margin_buffer}")
+        if not (0.0 <= self.taker_fee < 0.01):   errs.append(f"taker_fee out of [0,0.01): {self.taker_fee}")
+        if not (0.0 < self.risk_pct <= 1.0):     errs.append(f"risk_pct out of (0,1]: {self.risk_pct}")
+        if self.sizing_mode not in ("risk", "notional", "fixed"):
+            errs.append(f"sizing_mode invalid: {self.sizing_mode}")
+        for k in ("cooldown_min_bull", "cooldown_min_bear", "min_notional_usdt", "daily_max_dd_usdt", "funding_abs_max"):
+            if getattr(self, k) < 0: errs.append(f"{k} must be >= 0")
+        for k in ("loss_streak_limit_bull", "loss_streak_limit_bear", "idempotency_ttl", "recon_retries"):
+            if getattr(self, k) < 1: errs.append(f"{k} must be >= 1")
+        if self.recon_wait <= 0: errs.append("recon_wait must be > 0")
+        if self.reconcile_deadline_s <= 0 or self.reconcile_poll_s <= 0 or self.reconcile_max_iter < 1:
+            errs.append("reconcile_deadline_s/reconcile_poll_s must be > 0, reconcile_max_iter >= 1")
+        if self.rl_capacity <= 0 or self.rl_refill_per_s <= 0:
+            errs.append("rl_capacity/rl_refill_per_s must be > 0")
+        if not (0 <= self.rl_order_reserve < self.rl_capacity):
+            errs.append(f"rl_order_reserve out of [0,rl_capacity): {self.rl_order_reserve}")
+        if self.regime_scope not in ("basket", "symbol", "both"):
+            errs.append(f"regime_scope invalid: {self.regime_scope}")
+        if not (0.0 < self.regime_basket_quorum <= 1.0):
+            errs.append(f"regime_basket_quorum out of (0,1]: {self.regime_basket_quorum}")
+        if self.regime_ema_len < 2 or self.regime_atr_len < 1 or self.regime_rv_window < 2:
+            errs.append("regime_ema_len/atr_len/rv_window too small")
+        if self.admission_max_concurrent < 1: errs.append("admission_max_concurrent must be >= 1")
+        for k in ("admission_exit_reserve", "admission_max_queue", "admission_queue_wait_s", "admission_max_signal_age_s"):
+            if getattr(self, k) < 0: errs.append(f"{k} must be >= 0")
+        for k in ("clock_skew_refresh_s", "orderbook_max_age_s"):
+            if getattr(self, k) < 0: errs.append(f"{k} must be >= 0")
+        if min(self.indicator_don_len, self.indicator_atr_len, self.indicator_ema_len) < 1:
+            errs.append("indicator_don_len/atr_len/ema_len must be >= 1")
+        if self.candle_store_max_rows < 1000: errs.append("candle_store_max_rows must be >= 1000")
+        if self.kill_max_workers < 1: errs.append("kill_max_workers must be >= 1")
+        if self.batch_max_items < 1: errs.append("batch_max_items must be >= 1")
+        if self.netting_window_ms < 0 or self.netting_max_wait_ms < 0: errs.append("netting_*_ms must be >= 0")
+        if self.profile_keep < 1 or self.profile_top < 1: errs.append("profile_keep/profile_top must be >= 1")
+        if self.tca_max_trades < 100: errs.append("tca_max_trades must be >= 100")
+        if self.http_pool_maxsize < 1 or self.http_keepalive_idle_s < 1:
+            errs.append("http_pool_maxsize/http_keepalive_idle_s must be >= 1")
+        if min(self.http_connect_timeout_s, self.http_read_timeout_order_s, self.http_read_timeout_info_s,
+               self.http_read_timeout_market_s, self.external_timeout_s) <= 0 or self.http_dns_ttl_s < 0:
+            errs.append("http_*_timeout_s/external_timeout_s must be > 0, http_dns_ttl_s >= 0")
+        if not 0 <= self.profile_sample_hz <= 1000: errs.append("profile_sample_hz must be in [0, 1000]")
+        if self.ha_mode not in ("off", "lease"): errs.append(f"ha_mode invalid: {self.ha_mode}")
+        if not (0 < self.ha_renew_s < self.ha_lease_ttl_s): errs.append("ha_renew_s must be in (0, ha_lease_ttl_s)")
+        if self.ha_poll_s <= 0 or self.ha_takeover_wait_s < 0: errs.append("ha_poll_s must be > 0, ha_takeover_wait_s >= 0")
+        if self.indicator_levels not in ("fill", "override"):
+            errs.append(f"indicator_levels invalid: {self.indicator_levels}")
+        if self.indicator_validate not in ("off", "log", "enforce"):
+            errs.append(f"indicator_validate invalid: {self.indicator_validate}")
+        tf = self.indicator_timeframe
+        if not (tf[:-1].isdigit() and tf[-1:] in ("m", "h", "d", "w")):
+            errs.append(f"indicator_timeframe invalid: {tf}")
+        for tf in (t.strip() for t in self.prewarm_timeframes.split(",")):
+            if tf and not (tf[:-1].isdigit() and tf[-1] in "mhdw"):
+                errs.append(f"prewarm_timeframes invalid: {tf}")
+        for k in ("prewarm_lead_s", "snapshot_price_max_age_s", "snapshot_equity_max_age_s", "leverage_cache_ttl_s",
+                  "sizing_table_max_age_s", "status_refresh_s"):
+            if getattr(self, k) < 0: errs.append(f"{k} must be >= 0")
+        if self.outbox_inline_attempts < 1 or self.outbox_max_attempts < self.outbox_inline_attempts:
+            errs.append("outbox attempts: need 1 <= inline <= max")
+        for k in ("outbox_backoff_s", "outbox_backoff_max_s", "outbox_max_age_s", "outbox_sweep_s"):
+            if getattr(self, k) < 0: errs.append(f"{k} must be >= 0")
+        return errs
+
     @staticmethod
     def from_env() -> "Config":
-        pos_mode_raw = os.getenv("PHEMEX_POSITION_MODE", "oneway").strip().lower()
+        return Config.from_mapping(os.environ)
+
+    @staticmethod
+    def from_mapping(env: Mapping[str, str]) -> "Config":
+        pos_mode_raw = env.get("PHEMEX_POSITION_MODE", "oneway").strip().lower()
         pos_mode = "hedge" if pos_mode_raw in ("hedge", "hedged", "dual", "dual_side", "dual-side", "dualside") else "oneway"
         hedged = (pos_mode == "hedge")
         
         return Config(
             # Trade
-            trade_testnet=_env_bool("PHEMEX_TESTNET", True),
-            phemex_api_key_dev=os.getenv("PHEMEX_API_KEY_DEV", ""),
-            phemex_secret_dev=os.getenv("PHEMEX_SECRET_DEV", ""),
-            phemex_api_key_prod=os.getenv("PHEMEX_API_KEY_PROD", ""),
-            phemex_secret_prod=os.getenv("PHEMEX_SECRET_PROD", ""),
-            api_key_fallback=os.getenv("PHEMEX_API_KEY", ""),
-            api_sec_fallback=os.getenv("PHEMEX_SECRET", ""),
+            trade_testnet=_env_bool(env, "PHEMEX_TESTNET", True),
+            phemex_api_key_dev=env.get("PHEMEX_API_KEY_DEV", ""),
+            phemex_secret_dev=env.get("PHEMEX_SECRET_DEV", ""),
+            phemex_api_key_prod=env.get("PHEMEX_API_KEY_PROD", ""),
+            phemex_secret_prod=env.get("PHEMEX_SECRET_PROD", ""),
+            api_key_fallback=env.get("PHEMEX_API_KEY", ""),
+            api_sec_fallback=env.get("PHEMEX_SECRET", ""),
 
             phemex_position_mode=pos_mode,
             phemex_hedged=hedged,
             
             # Regime
-            regime_exchange=os.getenv("REGIME_EXCHANGE", "binance").lower(),
-            regime_testnet=_env_bool("REGIME_TESTNET", False),
-            regime_binance_market=os.getenv("REGIME_BINANCE_MARKET", "spot").lower(),
-            regime_binance_key_dev=os.getenv("REGIME_BINANCE_API_KEY_DEV", ""),
-            regime_binance_sec_dev=os.getenv("REGIME_BINANCE_SECRET_DEV", ""),
-            regime_binance_key_prod=os.getenv("REGIME_BINANCE_API_KEY_PROD", ""),
-            regime_binance_sec_prod=os.getenv("REGIME_BINANCE_SECRET_PROD", ""),
-            regime_phemex_key_dev=os.getenv("REGIME_PHEMEX_API_KEY_DEV", ""),
-            regime_phemex_sec_dev=os.getenv("REGIME_PHEMEX_SECRET_DEV", ""),
-            regime_phemex_key_prod=os.getenv("REGIME_PHEMEX_API_KEY_PROD", ""),
-            regime_phemex_sec_prod=os.getenv("REGIME_PHEMEX_SECRET_PROD", ""),
-            regime_symbol_eth=os.getenv("REGIME_SYMBOL_ETH", ""),
-            regime_symbol_btc=os.getenv("REGIME_SYMBOL_BTC", ""),
+            regime_exchange=env.get("REGIME_EXCHANGE", "binance").lower(),
+            regime_testnet=_env_bool(env, "REGIME_TESTNET", False),
+            regime_binance_market=env.get("REGIME_BINANCE_MARKET", "spot").lower(),
+            regime_binance_key_dev=env.get("REGIME_BINANCE_API_KEY_DEV", ""),
+            regime_binance_sec_dev=env.get("REGIME_BINANCE_SECRET_DEV", ""),
+            regime_binance_key_prod=env.get("REGIME_BINANCE_API_KEY_PROD", ""),
+            regime_binance_sec_prod=env.get("REGIME_BINANCE_SECRET_PROD", ""),
+            regime_phemex_key_dev=env.get("REGIME_PHEMEX_API_KEY_DEV", ""),
+            regime_phemex_sec_dev=env.get("REGIME_PHEMEX_SECRET_DEV", ""),
+            regime_phemex_key_prod=env.get("REGIME_PHEMEX_API_KEY_PROD", ""),
+            regime_phemex_sec_prod=env.get("REGIME_PHEMEX_SECRET_PROD", ""),
+            regime_symbol_eth=env.get("REGIME_SYMBOL_ETH", ""),
+            regime_symbol_btc=env.get("REGIME_SYMBOL_BTC", ""),
+            regime_universe=env.get("REGIME_UNIVERSE", ""),
+            regime_basket=env.get("REGIME_BASKET", ""),
+            regime_basket_quorum=_env_float(env, "REGIME_BASKET_QUORUM", 1.0),
+            regime_scope=env.get("REGIME_SCOPE", "basket").strip().lower(),
+            regime_timeframe=env.get("REGIME_TIMEFRAME", "4h"),
+            regime_ema_len=_env_int(env, "REGIME_EMA_LEN", 200),
+            regime_atr_len=_env_int(env, "REGIME_ATR_LEN", 14),
+            regime_rv_window=_env_int(env, "REGIME_RV_WINDOW", 30),
+            regime_rv_max=_env_float(env, "REGIME_RV_MAX", 0.0),
+            regime_ttl_s=_env_float(env, "REGIME_TTL_S", 60.0),
+            regime_funding_symbol=env.get("REGIME_FUNDING_SYMBOL", "ETH/USDT:USDT"),
 
             # Symbols
-            symbol_fallback=os.getenv("SYMBOL", "ETH/USDT:USDT"),
+            symbol_fallback=env.get("SYMBOL", "ETH/USDT:USDT"),
 
             # Redis
-            redis_url=os.getenv("REDIS_URL", "redis://redis:6379/0"),
-            idempotency_ttl=_env_int("IDEMPOTENCY_TTL", 900),
+            redis_url=env.get("REDIS_URL", "redis://redis:6379/0"),
+            idempotency_ttl=_env_int(env, "IDEMPOTENCY_TTL", 900),
 
             # Risk & Order
-            max_slippage=_env_float("MAX_SLIPPAGE", 0.004),
-            fee_buffer=_env_float("FEE_BUFFER", 0.003),
-            recon_retries=_env_int("RECONCILE_RETRIES", 8),
-            recon_wait=_env_float("RECONCILE_INTERVAL", 1.5),
-            use_mark_price=_env_bool("USE_MARK_PRICE", True),
-            taker_fee=_env_float("TAKER_FEE", 0.0006),
-            min_notional_usdt=_env_float("MIN_NOTIONAL_USDT", 5.0),
+            max_slippage=_env_float(env, "MAX_SLIPPAGE", 0.004),
+            fee_buffer=_env_float(env, "FEE_BUFFER", 0.003),
+            recon_retries=_env_int(env, "RECONCILE_RETRIES", 8),
+            recon_wait=_env_float(env, "RECONCILE_INTERVAL", 1.5),
+            reconcile_deadline_s=_env_float(env, "RECONCILE_DEADLINE_S", 10.0),
+            reconcile_max_iter=_env_int(env, "RECONCILE_MAX_ITER", 3),
+            reconcile_poll_s=_env_float(env, "RECONCILE_POLL_S", 0.2),
+            use_mark_price=_env_bool(env, "USE_MARK_PRICE", True),
+            taker_fee=_env_float(env, "TAKER_FEE", 0.0006),
+            min_notional_usdt=_env_float(env, "MIN_NOTIONAL_USDT", 5.0),
 
             # Sizing
-            server_sizing=_env_bool("SERVER_SIZING", True),
-            sizing_mode=os.getenv("SIZING_MODE", "notional").lower(),
-            risk_pct=_env_float("RISK_PCT", 0.004),
-            alloc_pct=_env_float("ALLOC_PCT", 0.50),
-            lev_default=_env_int("LEVERAGE_DEFAULT", 20),
-            margin_buffer=_env_float("MARGIN_BUFFER", 0.98),
+            server_sizing=_env_bool(env, "SERVER_SIZING", True),
+            sizing_mode=env.get("SIZING_MODE", "notional").lower(),
+            risk_pct=_env_float(env, "RISK_PCT", 0.004),
+            alloc_pct=_env_float(env, "ALLOC_PCT", 0.50),
+            lev_default=_env_int(env, "LEVERAGE_DEFAULT", 20),
+            margin_buffer=_env_float(env, "MARGIN_BUFFER", 0.98),
 
             # Regime Gate
-            alloc_bull_bull=_env_float("ALLOC_BULL_BULL", 0.50),
-            alloc_bull_neutral=_env_float("ALLOC_BULL_NEUTRAL", 0.25),
-            alloc_bull_bear=_env_float("ALLOC_BULL_BEAR", 0.10),
-            lev_bull_bull=_env_int("LEV_BULL_BULL", 8),
-            lev_bull_neutral=_env_int("LEV_BULL_NEUTRAL", 6),
-            lev_bull_bear=_env_int("LEV_BULL_BEAR", 3),
-
-            alloc_bear_bull=_env_float("ALLOC_BEAR_BULL", 0.00),
-            alloc_bear_neutral=_env_float("ALLOC_BEAR_NEUTRAL", 0.10),
-            alloc_bear_bear=_env_float("ALLOC_BEAR_BEAR", 0.50),
-            lev_bear_bull=_env_int("LEV_BEAR_BULL", 3),
-            lev_bear_neutral=_env_int("LEV_BEAR_NEUTRAL", 4),
-            lev_bear_bear=_env_int("LEV_BEAR_BEAR", 8),
+            alloc_bull_bull=_env_float(env, "ALLOC_BULL_BULL", 0.50),
+            alloc_bull_neutral=_env_float(env, "ALLOC_BULL_NEUTRAL", 0.25),
+            alloc_bull_bear=_env_float(env, "ALLOC_BULL_BEAR", 0.10),
+            lev_bull_bull=_env_int(env, "LEV_BULL_BULL", 8),
+            lev_bull_neutral=_env_int(env, "LEV_BULL_NEUTRAL", 6),
+            lev_bull_bear=_env_int(env, "LEV_BULL_BEAR", 3),
+
+            alloc_bear_bull=_env_float(env, "ALLOC_BEAR_BULL", 0.00),
+            alloc_bear_neutral=_env_float(env, "ALLOC_BEAR_NEUTRAL", 0.10),
+            alloc_bear_bear=_env_float(env, "ALLOC_BEAR_BEAR", 0.50),
+            lev_bear_bull=_env_int(env, "LEV_BEAR_BULL", 3),
+            lev_bear_neutral=_env_int(env, "LEV_BEAR_NEUTRAL", 4),
+            lev_bear_bear=_env_int(env, "LEV_BEAR_BEAR", 8),
 
             # Cooldown/DD
-            loss_streak_limit_bull=_env_int("LOSS_STREAK_LIMIT_BULL", 5),
-            loss_streak_limit_bear=_env_int("LOSS_STREAK_LIMIT_BEAR", 4),
-            cooldown_min_bull=_env_int("COOLDOWN_MIN_BULL", 90),
-            cooldown_min_bear=_env_int("COOLDOWN_MIN_BEAR", 120),
-            daily_max_dd_usdt=_env_float("DAILY_MAX_DD_USDT", 0.0),
+            loss_streak_limit_bull=_env_int(env, "LOSS_STREAK_LIMIT_BULL", 5),
+            loss_streak_limit_bear=_env_int(env, "LOSS_STREAK_LIMIT_BEAR", 4),
+            cooldown_min_bull=_env_int(env, "COOLDOWN_MIN_BULL", 90),
+            cooldown_min_bear=_env_int(env, "COOLDOWN_MIN_BEAR", 120),
+            daily_max_dd_usdt=_env_float(env, "DAILY_MAX_DD_USDT", 0.0),
 
             # Funding/VIX/Edge inputs
-            funding_abs_max=_env_float("FUNDING_ABS_MAX", 0.0003),
-            assume_hold_hours=_env_float("ASSUME_HOLD_HOURS", 2.0),
-            vix_url=os.getenv("VIX_URL", ""),
-            vix_max=_env_float("VIX_MAX", 30.0),
+            funding_abs_max=_env_float(env, "FUNDING_ABS_MAX", 0.0003),
+            assume_hold_hours=_env_float(env, "ASSUME_HOLD_HOURS", 2.0),
+            vix_url=env.get("VIX_URL", ""),
+            vix_max=_env_float(env, "VIX_MAX", 30.0),
+            vix_poll_s=_env_float(env, "VIX_POLL_S", 60.0),
+            vix_stale_s=_env_float(env, "VIX_STALE_S", 900.0),
+            external_timeout_s=_env_float(env, "EXTERNAL_TIMEOUT_S", 3.0),
+            external_breaker_fails=_env_int(env, "EXTERNAL_BREAKER_FAILS", 3),
+            external_breaker_reset_s=_env_float(env, "EXTERNAL_BREAKER_RESET_S", 120.0),
+            funding_interval_h=_env_float(env, "FUNDING_INTERVAL_H", 8.0),
+            funding_settle_s=_env_float(env, "FUNDING_SETTLE_S", 5.0),
+            funding_max_age_s=_env_float(env, "FUNDING_MAX_AGE_S", 900.0),
 
             # Logging
-            log_level=os.getenv("LOG_LEVEL", "INFO").upper(),
-            log_json=_env_bool("LOG_JSON", True),
-            log_to_file=_env_bool("LOG_TO_FILE", False),
-            log_file=os.getenv("LOG_FILE", "/app/relay.log"),
+            log_level=env.get("LOG_LEVEL", "INFO").upper(),
+            log_json=_env_bool(env, "LOG_JSON", True),
+            log_to_file=_env_bool(env, "LOG_TO_FILE", False),
+            log_file=env.get("LOG_FILE", "/app/relay.log"),
 
             # Equity
-            equity_code=os.getenv("EQUITY_CODE", "USDT").upper(),
-            equity_source=os.getenv("EQUITY_SOURCE", "free").lower(),
-            balance_debug=_env_bool("BALANCE_DEBUG", True),
+            equity_code=env.get("EQUITY_CODE", "USDT").upper(),
+            equity_source=env.get("EQUITY_SOURCE", "free").lower(),
+            balance_debug=_env_bool(env, "BALANCE_DEBUG", True),
 
-            relay_shared_secret=os.getenv("RELAY_SHARED_SECRET", ""),
+            relay_shared_secret=env.get("RELAY_SHARED_SECRET", ""),
+            admin_secret=env.get("ADMIN_SECRET", ""),
 
             # Edge / TP policy
-            edge_filter_enabled=_env_bool("EDGE_FILTER_ENABLED", True),
-            min_edge_usdt=_env_float("MIN_EDGE_USDT", 0.0),
-            holding_hours_est=_env_float(
-                "HOLDING_HOURS_EST",
-                _env_float("ASSUME_HOLD_HOURS", 8.0)  # backward compat
+            edge_filter_enabled=_env_bool(env, "EDGE_FILTER_ENABLED", True),
+            min_edge_usdt=_env_float(env, "MIN_EDGE_USDT", 0.0),
+            holding_hours_est=_env_float(env, "HOLDING_HOURS_EST",
+                _env_float(env, "ASSUME_HOLD_HOURS", 8.0)  # backward compat
             ),
-            edge_require_tp=_env_bool("EDGE_REQUIRE_TP", False),
-            edge_allow_derive_tp=_env_bool("EDGE_ALLOW_DERIVE_TP", True),
-            edge_atr_tp_x=_env_float("EDGE_ATR_TP_X", 3.0),
+            edge_require_tp=_env_bool(env, "EDGE_REQUIRE_TP", False),
+            edge_allow_derive_tp=_env_bool(env, "EDGE_ALLOW_DERIVE_TP", True),
+            edge_atr_tp_x=_env_float(env, "EDGE_ATR_TP_X", 3.0),
 
             # Risk sizing safety
-            risk_atr_fallback_x=_env_float("RISK_ATR_FALLBACK_X", 2.0),
-            risk_min_dist_ticks=_env_int("RISK_MIN_DIST_TICKS", 1),
-            risk_hard_reject=_env_bool("RISK_HARD_REJECT", False),
-            allow_bump_to_min_order=_env_bool("ALLOW_BUMP_TO_MIN_ORDER", True),
+            risk_atr_fallback_x=_env_float(env, "RISK_ATR_FALLBACK_X", 2.0),
+            risk_min_dist_ticks=_env_int(env, "RISK_MIN_DIST_TICKS", 1),
+            risk_hard_reject=_env_bool(env, "RISK_HARD_REJECT", False),
+            allow_bump_to_min_order=_env_bool(env, "ALLOW_BUMP_TO_MIN_ORDER", True),
+
+            # Rate-limit budget
+            rl_enabled=_env_bool(env, "RL_ENABLED", True),
+            rl_capacity=_env_float(env, "RL_CAPACITY", 60.0),
+            rl_refill_per_s=_env_float(env, "RL_REFILL_PER_S", 4.0),
+            rl_order_reserve=_env_float(env, "RL_ORDER_RESERVE", 15.0),
+            rl_order_max_wait_s=_env_float(env, "RL_ORDER_MAX_WAIT_S", 2.0),
+            rl_info_max_wait_s=_env_float(env, "RL_INFO_MAX_WAIT_S", 0.5),
+            rl_breaker_fails=_env_int(env, "RL_BREAKER_FAILS", 5),
+            rl_breaker_reset_s=_env_float(env, "RL_BREAKER_RESET_S", 30.0),
+
+            # Admission
+            admission_max_concurrent=_env_int(env, "ADMISSION_MAX_CONCURRENT", 8),
+            admission_exit_reserve=_env_int(env, "ADMISSION_EXIT_RESERVE", 4),
+            admission_max_queue=_env_int(env, "ADMISSION_MAX_QUEUE", 32),
+            admission_queue_wait_s=_env_float(env, "ADMISSION_QUEUE_WAIT_S", 10.0),
+            admission_max_signal_age_s=_env_float(env, "ADMISSION_MAX_SIGNAL_AGE_S", 0.0),
+
+            # Latency
+            clock_skew_refresh_s=_env_float(env, "CLOCK_SKEW_REFRESH_S", 300.0),
+
+            # Order book
+            orderbook_enabled=_env_bool(env, "ORDERBOOK_ENABLED", True),
+            orderbook_max_age_s=_env_float(env, "ORDERBOOK_MAX_AGE_S", 2.0),
+            orderbook_ws_url=env.get("ORDERBOOK_WS_URL", ""),
+
+            # Indicators
+            indicator_enabled=_env_bool(env, "INDICATOR_ENABLED", True),
+            indicator_timeframe=env.get("INDICATOR_TIMEFRAME", "5m").strip(),
+            indicator_don_len=_env_int(env, "INDICATOR_DON_LEN", 20),
+            indicator_atr_len=_env_int(env, "INDICATOR_ATR_LEN", 14),
+            indicator_ema_len=_env_int(env, "INDICATOR_EMA_LEN", 200),
+            indicator_sl_atr_x=_env_float(env, "INDICATOR_SL_ATR_X", 2.5),
+            indicator_tp_atr_x=_env_float(env, "INDICATOR_TP_ATR_X", 4.5),
+            indicator_levels=env.get("INDICATOR_LEVELS", "fill").strip().lower(),
+            indicator_validate=env.get("INDICATOR_VALIDATE", "log").strip().lower(),
+            indicator_validate_tol=_env_float(env, "INDICATOR_VALIDATE_TOL", 0.002),
+
+            # Candle store
+            candle_store_enabled=_env_bool(env, "CANDLE_STORE_ENABLED", True),
+            candle_store_dir=env.get("CANDLE_STORE_DIR", "/app/data/candles"),
+            candle_store_max_rows=_env_int(env, "CANDLE_STORE_MAX_ROWS", 200000),
+
+            # Kill switch
+            kill_max_workers=_env_int(env, "KILL_MAX_WORKERS", 16),
+
+            # Hot standby
+            ha_mode=env.get("HA_MODE", "off").strip().lower(),
+            ha_instance_id=env.get("HA_INSTANCE_ID", "").strip(),
+            ha_lease_ttl_s=_env_float(env, "HA_LEASE_TTL_S", 3.0),
+            ha_renew_s=_env_float(env, "HA_RENEW_S", 1.0),
+            ha_poll_s=_env_float(env, "HA_POLL_S", 0.25),
+            ha_takeover_wait_s=_env_float(env, "HA_TAKEOVER_WAIT_S", 4.0),
+
+            # Prewarm / snapshots
+            prewarm_enabled=_env_bool(env, "PREWARM_ENABLED", True),
+            prewarm_timeframes=env.get("PREWARM_TIMEFRAMES", "5m"),
+            prewarm_lead_s=_env_float(env, "PREWARM_LEAD_S", 3.0),
+            prewarm_symbols=env.get("PREWARM_SYMBOLS", ""),
+            snapshot_price_max_age_s=_env_float(env, "SNAPSHOT_PRICE_MAX_AGE_S", 10.0),
+            snapshot_equity_max_age_s=_env_float(env, "SNAPSHOT_EQUITY_MAX_AGE_S", 60.0),
+            leverage_cache_ttl_s=_env_float(env, "LEVERAGE_CACHE_TTL_S", 3600.0),
+
+            # Sizing table
+            sizing_strategies=env.get("SIZING_STRATEGIES", "bull,bear"),
+            sizing_table_max_age_s=_env_float(env, "SIZING_TABLE_MAX_AGE_S", 600.0),
+            status_refresh_s=_env_float(env, "STATUS_REFRESH_S", 30.0),
+            response_verbose=_env_bool(env, "RESPONSE_VERBOSE", False),
+            batch_max_items=_env_int(env, "BATCH_MAX_ITEMS", 20),
+
+            # Virtual sub-positions / netting
+            netting_enabled=_env_bool(env, "NETTING_ENABLED", True),
+            netting_window_ms=_env_float(env, "NETTING_WINDOW_MS", 0.0),
+            netting_max_wait_ms=_env_float(env, "NETTING_MAX_WAIT_MS", 1500.0),
+
+            # Profiling
+            profile_dir=env.get("PROFILE_DIR", "/app/data/profiles"),
+            profile_keep=_env_int(env, "PROFILE_KEEP", 20),
+            profile_top=_env_int(env, "PROFILE_TOP", 40),
+            profile_sample_hz=_env_float(env, "PROFILE_SAMPLE_HZ", 0.0),
+            profile_sample_max_stacks=_env_int(env, "PROFILE_SAMPLE_MAX_STACKS", 5000),
+
+            # TCA
+            tca_enabled=_env_bool(env, "TCA_ENABLED", True),
+            tca_max_trades=_env_int(env, "TCA_MAX_TRADES", 100000),
+
+            # HTTP transport
+            http_pool_maxsize=_env_int(env, "HTTP_POOL_MAXSIZE", 8),
+            http_pool_hosts=env.get("HTTP_POOL_HOSTS", ""),
+            http_keepalive_idle_s=_env_int(env, "HTTP_KEEPALIVE_IDLE_S", 30),
+            http_dns_ttl_s=_env_float(env, "HTTP_DNS_TTL_S", 60.0),
+            http_connect_timeout_s=_env_float(env, "HTTP_CONNECT_TIMEOUT_S", 2.0),
+            http_read_timeout_order_s=_env_float(env, "HTTP_READ_TIMEOUT_ORDER_S", 8.0),
+            http_read_timeout_info_s=_env_float(env, "HTTP_READ_TIMEOUT_INFO_S", 5.0),
+            http_read_timeout_market_s=_env_float(env, "HTTP_READ_TIMEOUT_MARKET_S", 5.0),
+
+            # Outbox
+            outbox_inline_attempts=_env_int(env, "OUTBOX_INLINE_ATTEMPTS", 3),
+            outbox_max_attempts=_env_int(env, "OUTBOX_MAX_ATTEMPTS", 6),
+            outbox_backoff_s=_env_float(env, "OUTBOX_BACKOFF_S", 0.25),
+            outbox_backoff_max_s=_env_float(env, "OUTBOX_BACKOFF_MAX_S", 4.0),
+            outbox_max_age_s=_env_float(env, "OUTBOX_MAX_AGE_S", 120.0),
+            outbox_sweep_s=_env_float(env, "OUTBOX_SWEEP_S", 10.0),
+
+            # Hot reload
+            config_file=env.get("CONFIG_FILE", ""),
+            config_redis_key=env.get("CONFIG_REDIS_KEY", "relay:config"),
+            config_reload_interval=_env_float(env, "CONFIG_RELOAD_INTERVAL", 5.0),
         )
@@ -0,0 +1,171 @@
+# app/config_reload.py
+import os, json, time, hashlib, threading
+from dataclasses import replace, fields
+from typing import Dict, Any, Optional, Tuple
+
+from .config import Config
+from .logging_utils import log as logf
+
+# 프로세스 재시작 없이는 바꿀 수 없는 값 (클라이언트/커넥션/로거가 이미 생성됨)
+RESTART_ONLY = (
+    "trade_testnet", "phemex_api_key_dev", "phemex_secret_dev", "phemex_api_key_prod", "phemex_secret_prod",
+    "api_key_fallback", "api_sec_fallback",
+    "regime_exchange", "regime_testnet", "regime_binance_market",
+    "regime_binance_key_dev", "regime_binance_sec_dev", "regime_binance_key_prod", "regime_binance_sec_prod",
+    "regime_phemex_key_dev", "regime_phemex_sec_dev", "regime_phemex_key_prod", "regime_phemex_sec_prod",
+    "redis_url", "phemex_position_mode", "phemex_hedged",
+    "log_level", "log_json", "log_to_file", "log_file",
+    "config_file", "config_redis_key", "config_reload_interval",
+    "funding_interval_h", "funding_settle_s", "funding_max_age_s",
+    "rl_breaker_fails", "rl_breaker_reset_s",
+    "ha_mode", "ha_instance_id",
+    "http_pool_maxsize", "http_pool_hosts", "http_keepalive_idle_s",
+    "candle_store_enabled", "candle_store_dir", "candle_store_max_rows",
+    "orderbook_enabled", "indicator_enabled", "clock_skew_refresh_s",
+)
+
+
+def _decode(x) -> str:
+    return x.decode() if isinstance(x, (bytes, bytearray)) else str(x)
+
+
+def load_file_overrides(path: str) -> Dict[str, str]:
+    """*.json → 객체, 그 외 → KEY=VALUE(.env 형식)."""
+    if not path or not os.path.exists(path):
+        return {}
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        if not isinstance(obj, dict):
+            raise ValueError(f"{path}: top-level JSON must be an object")
+        return {str(k): (json.dumps(v) if isinstance(v, (dict, list)) else str(v)) for k, v in obj.items()}
+    from dotenv import dotenv_values
+    return {k: v for k, v in dotenv_values(path).items() if v is not None}
+
+
+def load_redis_overrides(r, key: str) -> Dict[str, str]:
+    if not key:
+        return {}
+    return {_decode(k): _decode(v) for k, v in (r.hgetall(key) or {}).items()}
+
+
+def merged_env(r, config_file: str, redis_key: str) -> Tuple[Dict[str, str], Dict[str, int]]:
+    env = dict(os.environ)
+    file_ov = load_file_overrides(config_file)
+    env.update(file_ov)
+    redis_ov = load_redis_overrides(r, redis_key) if r is not None else {}
+    env.update(redis_ov)
+    return env, {"file": len(file_ov), "redis": len(redis_ov)}
+
+
+def startup_config(r=None) -> Config:
+    """
+    기동 시 설정: env < CONFIG_FILE (< Redis hash, r가 있으면). 클라이언트/로거 생성 전에 병합하므로
+    RESTART_ONLY 키도 파일/Redis에서 적용된다. 읽기/검증 실패 시 env 설정 (첫 reload가 오류를 기록).
+    """
+    base = Config.from_env()
+    try:
+        env, _ = merged_env(r, base.config_file, base.config_redis_key)
+        cfg = Config.from_mapping(env)
+    except Exception:
+        return base
+    return base if cfg.validate() else cfg
+
+
+class ConfigReloader:
+    """
+    env < CONFIG_FILE < Redis hash(CONFIG_REDIS_KEY) 순으로 병합 → 검증 → app.state.cfg 원자 교체.
+    - 진행 중인 요청은 시작 시 잡은 cfg 스냅샷을 끝까지 사용 (객체 교체만 하고 수정하지 않음)
+    - 변경이 없으면(digest 동일) 버전을 올리지 않음
+    """
+    def __init__(self, app, r, logger):
+        self.app = app
+        self.r = r
+        self.logger = logger
+        self.digest: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._rejected_digest: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _merged(self, cfg: Config) -> Tuple[Dict[str, str], Dict[str, int]]:
+        return merged_env(self.r, cfg.config_file, cfg.config_redis_key)
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            old: Config = self.app.state.cfg
+            try:
+                env, sources = self._merged(old)
+            except Exception as e:
+                self.last_error = f"load_failed: {e}"
+                logf(self.logger, old.log_json, "config_reload_failed", error=self.last_error, cfg_version=old.config_version)
+                return {"status": "error", "error": self.last_error, "version": old.config_version}
+
+            digest = hashlib.sha1(json.dumps(env, sort_keys=True).encode()).hexdigest()
+            if digest == self.digest and not force:
+                return {"status": "unchanged", "version": old.config_version, "digest": digest}
+            if digest == self._rejected_digest and not force:
+                return {"status": "rejected", "errors": [self.last_error], "version": old.config_version}
+
+            new = Config.from_mapping(env)
+            errors = new.validate()
+            errors += [f"restart_required:{k}" for k in RESTART_ONLY if getattr(new, k) != getattr(old, k)]
+            if errors:
+                self.last_error = "; ".join(errors)
+                self._rejected_digest = digest
+                logf(self.logger, old.log_json, "config_reload_rejected", errors=errors, cfg_version=old.config_version)
+                return {"status": "rejected", "errors": errors, "version": old.config_version}
+
+            changed = [f.name for f in fields(Config)
+                       if f.name != "config_version" and getattr(new, f.name) != getattr(old, f.name)]
+            if self.digest is not None and not changed and not force:
+                self.digest = digest
+                return {"status": "unchanged", "version": old.config_version, "digest": digest}
+
+            new = replace(new, config_version=old.config_version + 1)
+            self.app.state.cfg = new          # 단일 참조 교체 (원자적)
+            self.digest = digest
+            self.loaded_at = time.time()
+            self.last_error = None
+            logf(self.logger, new.log_json, "config_reloaded",
+                 cfg_version=new.config_version, changed=changed, sources=sources, digest=digest)
+            for cb in list(getattr(self.app.state, "on_config_change", []) or []):
+                try:
+                    cb(old, new)
+                except Exception as e:
+                    logf(self.logger, new.log_json, "config_listener_error", error=str(e))
+            return {"status": "reloaded", "version": new.config_version, "changed": changed, "digest": digest}
+
+    def info(self) -> Dict[str, Any]:
+        cfg: Config = self.app.state.cfg
+        return {
+            "version": cfg.config_version,
+            "digest": self.digest,
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+            "file": cfg.config_file or None,
+            "redis_key": cfg.config_redis_key or None,
+            "interval_s": cfg.config_reload_interval,
+        }
+
+    # --- background polling ---
+    def _run(self):
+        while not self._stop.is_set():
+            interval = float(self.app.state.cfg.config_reload_interval or 0)
+            if self._stop.wait(max(0.5, interval)):
+                break
+            try:
+                self.reload()
+            except Exception as e:
+                self.last_error = str(e)
+
+    def start(self):
+        if self._thread or float(self.app.state.cfg.config_reload_interval or 0) <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="config-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
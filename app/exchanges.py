@@ -8,29 +8,36 @@ def pick_keys(use_testnet: bool, key_dev: str, sec_dev: str, key_prod: str, sec_
         return (key_dev or fallback_key), (sec_dev or fallback_sec)
     return (key_prod or fallback_key), (sec_prod or fallback_sec)
 
-def make_phemex(testnet: bool, api_key: str = "", secret: str = ""):
+def make_phemex(testnet: bool, api_key: str = "", secret: str = "", transport=None):
     ex = ccxt.phemex({"apiKey": api_key, "secret": secret, "enableRateLimit": True})
     ex.set_sandbox_mode(bool(testnet))
+    if transport is not None:
+        transport.attach(ex)
     ex.load_markets()
     return ex
 
-def make_binance(market: str = "spot", testnet: bool = False, api_key: str = "", secret: str = ""):
+def make_binance(market: str = "spot", testnet: bool = False, api_key: str = "", secret: str = "", transport=None):
     if market == "usdm":
         exb = ccxt.binanceusdm({"apiKey": api_key, "secret": secret, "enableRateLimit": True})
         if testnet:
             exb.urls["api"]["fapi"]   = "https://testnet.binancefuture.com/fapi/v1"
             exb.urls["api"]["public"] = exb.urls["api"]["fapi"]
         exb.options["defaultType"] = "future"
+        if transport is not None:
+            transport.attach(exb)
         exb.load_markets()
         return exb
     else:
         exb = ccxt.binance({"apiKey": api_key, "secret": secret, "enableRateLimit": True})
         exb.options["defaultType"] = "spot"
         if testnet: exb.set_sandbox_mode(True)
+        if transport is not None:
+            transport.attach(exb)
         exb.load_markets()
         return exb
 
-def build_exchanges(cfg: Config):
+def build_exchanges(cfg: Config, transport=None):
+    # transport: 공유 HTTP 세션 (app/transport.py). 없으면 ccxt 기본 세션
     # trade
     trade_key, trade_sec = pick_keys(
         cfg.trade_testnet,
@@ -38,7 +45,7 @@ def build_exchanges(cfg: Config):
         cfg.phemex_api_key_prod, cfg.phemex_secret_prod,
         cfg.api_key_fallback, cfg.api_sec_fallback
     )
-    ex_trade = make_phemex(cfg.trade_testnet, trade_key, trade_sec)
+    ex_trade = make_phemex(cfg.trade_testnet, trade_key, trade_sec, transport)
 
     # regime
     if cfg.regime_exchange == "phemex":
@@ -47,14 +54,14 @@ def build_exchanges(cfg: Config):
             cfg.regime_phemex_key_dev, cfg.regime_phemex_sec_dev,
             cfg.regime_phemex_key_prod, cfg.regime_phemex_sec_prod
         )
-        ex_regime = make_phemex(cfg.regime_testnet, reg_key, reg_sec)
+        ex_regime = make_phemex(cfg.regime_testnet, reg_key, reg_sec, transport)
     elif cfg.regime_exchange == "binance":
         bin_key, bin_sec = pick_keys(
             cfg.regime_testnet,
             cfg.regime_binance_key_dev, cfg.regime_binance_sec_dev,
             cfg.regime_binance_key_prod, cfg.regime_binance_sec_prod
         )
-        ex_regime = make_binance(cfg.regime_binance_market, cfg.regime_testnet, bin_key, bin_sec)
+        ex_regime = make_binance(cfg.regime_binance_market, cfg.regime_testnet, bin_key, bin_sec, transport)
     else:
         ex_regime = ex_trade
 
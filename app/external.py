@@ -0,0 +1,140 @@
+# app/external.py
+import time, threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from .breaker import CircuitBreaker
+from .regime import safe_float, is_http_url
+
+
+def json_field(*keys: str) -> Callable[[Any], Optional[float]]:
+    """응답 JSON의 첫 번째 존재 키를 float로."""
+    def _extract(j):
+        if not isinstance(j, dict):
+            return None
+        for k in keys:
+            if j.get(k) is not None:
+                return safe_float(j.get(k))
+        return None
+    return _extract
+
+
+@dataclass
+class ExternalFeed:
+    name: str
+    url: str
+    extract: Callable[[Any], Optional[float]]
+    interval_s: float = 60.0      # 이 시간이 지나면 백그라운드 재검증
+    stale_s: float = 600.0        # 이 시간까지는 오래된 값도 서빙, 이후 None
+    # runtime
+    value: Optional[float] = None
+    fetched_at: float = 0.0
+    last_error: Optional[str] = None
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+
+class ExternalPoller:
+    """
+    외부 지표(VIX 등) 폴러. 요청 경로는 get()으로 마지막 값과 나이만 읽는다 (네트워크 없음).
+    - stale-while-revalidate: interval_s 경과 시 값은 그대로 주고 백그라운드 갱신을 깨움
+    - stale_s 초과 시 None (게이트 비활성과 동일하게 취급)
+    - 소스 실패가 반복되면 피드별 서킷 브레이커가 열려 재시도를 늦춘다
+    - 클라이언트 하나를 재사용 (keep-alive 커넥션 풀). 릴레이는 공유 전송 계층의 requests.Session을
+      넘기고 (app/transport.py, external 타임아웃), 없으면 자체 httpx.Client
+    """
+    def __init__(self, timeout_s: float = 3.0, client: Optional[Any] = None):
+        self.client = client or httpx.Client(timeout=timeout_s, limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=120))
+        self.feeds: Dict[str, ExternalFeed] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, feed: ExternalFeed):
+        if not is_http_url(feed.url):
+            self.feeds.pop(feed.name, None)
+            return
+        old = self.feeds.get(feed.name)
+        if old is not None and old.url == feed.url:
+            feed.value, feed.fetched_at = old.value, old.fetched_at
+            feed.breaker.failures, feed.breaker.opened_at, feed.breaker.trips = old.breaker.failures, old.breaker.opened_at, old.breaker.trips
+        self.feeds[feed.name] = feed
+        self._wake.set()
+
+    # --- read path ---
+    def get(self, name: str) -> Tuple[Optional[float], Optional[float]]:
+        f = self.feeds.get(name)
+        if f is None or not f.fetched_at:
+            return None, None
+        age = time.time() - f.fetched_at
+        if age > f.interval_s:
+            self._wake.set()
+        if age > f.stale_s:
+            return None, age
+        return f.value, age
+
+    def info(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            n: {"value": f.value, "age_s": round(now - f.fetched_at, 3) if f.fetched_at else None,
+                "last_error": f.last_error, "breaker": f.breaker.info()}
+            for n, f in self.feeds.items()
+        }
+
+    # --- fetch ---
+    def fetch(self, f: ExternalFeed) -> bool:
+        if not f.breaker.allow():
+            return False
+        try:
+            resp = self.client.get(f.url)
+            resp.raise_for_status()
+            v = f.extract(resp.json())
+            if v is None:
+                raise ValueError("no value in response")
+        except Exception as e:
+            f.last_error = str(e)[:200]
+            f.breaker.record_failure()
+            return False
+        f.value, f.fetched_at, f.last_error = v, time.time(), None
+        f.breaker.record_success()
+        return True
+
+    def poll_due(self) -> float:
+        now = time.time()
+        nxt = now + 60.0
+        for f in list(self.feeds.values()):
+            due = f.fetched_at + f.interval_s
+            if due <= now:
+                self.fetch(f)
+                due = f.fetched_at + f.interval_s
+                if due <= now:
+                    bi = f.breaker.info()
+                    due = now + (bi["retry_in_s"] or min(f.interval_s, 10.0))
+            nxt = min(nxt, due)
+        return max(0.2, nxt - time.time())
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.poll_due()
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="external-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+def register_default_feeds(poller: ExternalPoller, cfg):
+    """VIX_URL 기반 기본 피드. 설정 리로드 시 다시 호출해도 값/브레이커는 유지된다."""
+    poller.register(ExternalFeed(
+        name="vix", url=cfg.vix_url, extract=json_field("vix", "value"),
+        interval_s=cfg.vix_poll_s, stale_s=cfg.vix_stale_s,
+        breaker=CircuitBreaker(cfg.external_breaker_fails, cfg.external_breaker_reset_s),
+    ))
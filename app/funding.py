@@ -0,0 +1,136 @@
+# app/funding.py
+import time, threading
+from typing import Dict, Any, Optional, Iterable
+
+from .regime import safe_float
+from .logging_utils import log as logf
+
+
+def next_funding_boundary_ms(now_ms: int, interval_s: int) -> int:
+    """UTC 00:00 기준 고정 주기(Phemex 기본 8h) 다음 정산 시각."""
+    iv = int(interval_s) * 1000
+    return (now_ms // iv + 1) * iv
+
+
+class FundingCache:
+    """
+    심볼별 펀딩비 캐시. 웹훅/edge 계산 경로는 get()만 호출하며 (처음 보는 심볼 1회 외에는) 네트워크 I/O가 없다.
+    - 갱신 시점: 다음 정산 시각 + settle_s (새 주기 시작 직후), 또는 max_age_s의 90% 경과 (예측치 드리프트)
+    - on_push(): WebSocket 등 외부 푸시로 즉시 갱신
+    - 처음 보는 심볼은 동기 조회 1회 후 백그라운드 갱신 대상으로 등록 (첫 거래에서 게이트가 빠지지 않게)
+    - max_age_s 보다 오래된 값은 서빙하지 않음 (None + 로그, 갱신 실패가 길어진 경우)
+    """
+    def __init__(self, ex, interval_s: int = 8 * 3600, settle_s: float = 5.0, max_age_s: float = 900.0,
+                 logger=None, log_json: bool = True):
+        self.ex = ex
+        self.logger = logger
+        self.log_json = log_json
+        self.interval_s = interval_s
+        self.settle_s = settle_s
+        self.max_age_s = max_age_s
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._tracked: Dict[str, None] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _log(self, event: str, **kw):
+        if self.logger is not None:
+            logf(self.logger, self.log_json, event, **kw)
+
+    # --- read path ---
+    def get(self, symbol: str) -> Optional[float]:
+        rec = self.entries.get(symbol)
+        if rec is None:
+            if symbol in self._tracked:
+                return None
+            self.track([symbol])
+            if self.refresh(symbol) is None and symbol not in self.entries:
+                self._log("funding_unavailable", symbol=symbol, reason="first_fetch_failed")
+                return None
+            rec = self.entries[symbol]
+        age = time.time() - rec["fetched_at"]
+        if age > self.max_age_s:
+            if not rec.get("stale_logged"):
+                rec["stale_logged"] = True
+                self._log("funding_unavailable", symbol=symbol, reason="stale", age_s=round(age, 1))
+            return None
+        return rec["rate"]
+
+    def info(self, symbol: str) -> Optional[Dict[str, Any]]:
+        rec = self.entries.get(symbol)
+        if rec is None:
+            return None
+        return {**rec, "age_s": round(time.time() - rec["fetched_at"], 3)}
+
+    def track(self, symbols: Iterable[str]):
+        added = False
+        for s in symbols:
+            if s and s not in self._tracked:
+                self._tracked[s] = None
+                added = True
+        if added:
+            self._wake.set()
+
+    # --- write path ---
+    def on_push(self, symbol: str, rate: Optional[float], next_ts_ms: Optional[int] = None, source: str = "push"):
+        now_ms = int(time.time() * 1000)
+        if not next_ts_ms or next_ts_ms <= now_ms:
+            next_ts_ms = next_funding_boundary_ms(now_ms, self.interval_s)
+        self.entries[symbol] = {"rate": rate, "next_ts": int(next_ts_ms), "fetched_at": time.time(), "source": source}
+        self._tracked.setdefault(symbol, None)
+
+    def refresh(self, symbol: str) -> Optional[float]:
+        """거래소 REST 조회 (백그라운드/프리웜 전용)."""
+        try:
+            fr = self.ex.fetch_funding_rate(symbol)
+        except Exception:
+            return None
+        if not isinstance(fr, dict):
+            return None
+        v = fr.get("fundingRate")
+        info = fr.get("info") or {}
+        if v is None:
+            v = info.get("fundingRate") or info.get("lastFundingRate") or info.get("predictedFundingRate")
+        nxt = fr.get("nextFundingTimestamp") or fr.get("fundingTimestamp")
+        self.on_push(symbol, safe_float(v), int(nxt) if nxt else None, source="rest")
+        return self.entries[symbol]["rate"]
+
+    def _due_at(self, symbol: str) -> float:
+        rec = self.entries.get(symbol)
+        if rec is None:
+            return 0.0
+        # get()은 max_age_s 초과 값을 버리므로 그 전에 갱신
+        return min(rec["next_ts"] / 1000.0 + self.settle_s, rec["fetched_at"] + 0.9 * self.max_age_s)
+
+    def refresh_due(self) -> float:
+        """만기된 심볼 갱신 후 다음 만기까지 남은 초."""
+        now = time.time()
+        nxt = now + 60.0
+        for s in list(self._tracked):
+            due = self._due_at(s)
+            if due <= now:
+                self.refresh(s)
+                due = self._due_at(s)
+                if due <= now:                 # 조회 실패 → 잠시 후 재시도
+                    due = now + 10.0
+            nxt = min(nxt, due)
+        return max(0.2, nxt - time.time())
+
+    # --- background ---
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.refresh_due()
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def start(self, symbols: Iterable[str] = ()):
+        self.track(symbols)
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="funding-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,223 @@
+# app/indicators.py
+import time, threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .logging_utils import log as logf
+from .prewarm import prewarm_symbols
+from .regime_engine import timeframe_seconds
+
+_CLOSE_DELAY_S = 2.0      # 봉 마감 후 거래소 집계 대기
+_CONFIRM_GRACE_S = 30.0   # 확정봉 알림이 봉 마감 뒤 도착하는 허용 지연 (TradingView 알림 지연)
+
+
+class IndicatorState:
+    """
+    닫힌 봉 하나당 O(1) 갱신.
+    - Donchian: ta.highest(high, len)/ta.lowest(low, len) — 단조 deque (분할상환 O(1))
+    - ATR: ta.atr = TR의 RMA(Wilder), 첫 len개는 SMA로 시드 (Pine과 동일)
+    - EMA: alpha=2/(len+1), 첫 len개 SMA로 시드 (워밍업이 3×len 봉이라 시드 차이는 무시 가능)
+    최근 len_don 개 OHLC는 고정 크기 링버퍼(numpy)에 유지.
+    """
+    def __init__(self, len_don: int = 20, atr_len: int = 14, ema_len: int = 200):
+        self.len_don, self.atr_len, self.ema_len = len_don, atr_len, ema_len
+        self.ring = np.full((len_don, 5), np.nan)    # ts, high, low, close, tr
+        self.n = 0
+        self.ts: Optional[int] = None
+        self.close: Optional[float] = None
+        self.atr: Optional[float] = None
+        self.ema: Optional[float] = None
+        self._hi: deque = deque()    # (n, high) 내림차순
+        self._lo: deque = deque()    # (n, low) 오름차순
+        self._tr_sum = 0.0
+        self._ema_sum = 0.0
+        self.prev_don_high: Optional[float] = None   # Pine upper[1]
+        self.prev_don_low: Optional[float] = None
+
+    def update(self, ts: int, high: float, low: float, close: float) -> bool:
+        """닫힌 봉 반영. 이미 반영한 ts 이하면 무시(False)."""
+        if self.ts is not None and ts <= self.ts:
+            return False
+        prev_c = self.close
+        tr = high - low if prev_c is None else max(high - low, abs(high - prev_c), abs(low - prev_c))
+        self.prev_don_high, self.prev_don_low = self.don_high, self.don_low
+        i = self.n
+        self.ring[i % self.len_don] = (ts, high, low, close, tr)
+
+        while self._hi and self._hi[-1][1] <= high:
+            self._hi.pop()
+        self._hi.append((i, high))
+        if self._hi[0][0] <= i - self.len_don:
+            self._hi.popleft()
+        while self._lo and self._lo[-1][1] >= low:
+            self._lo.pop()
+        self._lo.append((i, low))
+        if self._lo[0][0] <= i - self.len_don:
+            self._lo.popleft()
+
+        k = i + 1
+        if k < self.atr_len:
+            self._tr_sum += tr
+        elif k == self.atr_len:
+            self.atr = (self._tr_sum + tr) / self.atr_len
+        else:
+            self.atr = (self.atr * (self.atr_len - 1) + tr) / self.atr_len
+
+        if k < self.ema_len:
+            self._ema_sum += close
+        elif k == self.ema_len:
+            self.ema = (self._ema_sum + close) / self.ema_len
+        else:
+            a = 2.0 / (self.ema_len + 1)
+            self.ema = a * close + (1 - a) * self.ema
+
+        self.n, self.ts, self.close = k, int(ts), float(close)
+        return True
+
+    @property
+    def don_high(self) -> Optional[float]:
+        return self._hi[0][1] if self.n >= self.len_don else None
+
+    @property
+    def don_low(self) -> Optional[float]:
+        return self._lo[0][1] if self.n >= self.len_don else None
+
+    @property
+    def ready(self) -> bool:
+        return self.n >= max(self.len_don, self.atr_len)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"ts": self.ts, "close": self.close, "don_high": self.don_high, "don_low": self.don_low,
+                "prev_don_high": self.prev_don_high, "prev_don_low": self.prev_don_low,
+                "atr": self.atr, "ema": self.ema, "bars": self.n, "ready": self.ready}
+
+
+def derive_levels(side: str, entry: float, atr: Optional[float], sl_x: float, tp_x: float) -> Dict[str, Optional[float]]:
+    """ATR 배수로 SL/TP (Pine: longSL = close - atrSLx*atr, longTP = close + atrTPx*atr)."""
+    if not atr or atr <= 0 or not entry:
+        return {"sl": None, "tp": None}
+    d = 1.0 if side == "buy" else -1.0
+    return {"sl": entry - d * sl_x * atr if sl_x > 0 else None,
+            "tp": entry + d * tp_x * atr if tp_x > 0 else None}
+
+
+def validate_breakout(side: str, price: float, st: Dict[str, Any], tol: float,
+                      signal_ts: Optional[float] = None, tf_s: Optional[float] = None) -> Optional[str]:
+    """
+    진입가가 Donchian 돌파인지 (Pine: high/close > upper[1]). 통과면 None, 아니면 사유.
+    - 진행 중인 봉의 신호(rtBreak): upper[1] = 닫힌 봉들의 Donchian (don_*)
+    - 확정봉 신호(closeBreak): 봉 마감 갱신이 먼저 돌았으면 don_*에 신호 봉이 이미 들어가 있음
+      → 신호 시각(signal_ts, 초)이 st["ts"] 봉 마감 직후면 그 봉의 upper[1]인 prev_don_* 기준도 허용
+    """
+    if not st.get("ready") or not price:
+        return None
+    hi, lo = st["don_high"], st["don_low"]
+    if signal_ts and tf_s and st.get("ts") is not None:
+        since_close = signal_ts - (st["ts"] / 1000.0 + tf_s)
+        if -_CLOSE_DELAY_S <= since_close < _CONFIRM_GRACE_S:
+            if st.get("prev_don_high") is not None and hi is not None:
+                hi = min(hi, st["prev_don_high"])
+            if st.get("prev_don_low") is not None and lo is not None:
+                lo = max(lo, st["prev_don_low"])
+    if side == "buy" and hi is not None and price < hi * (1.0 - tol):
+        return f"price {price} below donchian high {hi}"
+    if side == "sell" and lo is not None and price > lo * (1.0 + tol):
+        return f"price {price} above donchian low {lo}"
+    return None
+
+
+class IndicatorEngine:
+    """
+    거래 심볼(PREWARM_SYMBOLS/SYMBOL)의 전략 타임프레임 지표를 봉 마감마다 갱신.
+    기동 시 워밍업 봉을 한 번 받고, 이후에는 마지막 ts 이후의 닫힌 봉만 받아 O(1) 갱신.
+    웹훅 경로는 get()만 호출 (I/O 없음).
+    """
+    def __init__(self, ex, cfg_getter, logger=None, candles=None, exchange_name: str = ""):
+        self.ex = ex
+        self.cfg = cfg_getter
+        self.logger = logger
+        self.candles = candles          # CandleStore (있으면 동기화 후 memmap에서 읽음)
+        self.exchange_name = exchange_name
+        self.states: Dict[str, IndicatorState] = {}
+        self._key = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _log(self, event: str, **kw):
+        if self.logger is not None:
+            logf(self.logger, self.cfg().log_json, event, **kw)
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        st = self.states.get(symbol)
+        if st is None or not st.ready:
+            return None
+        cfg = self.cfg()
+        # 마지막 닫힌 봉이 세 봉 이상 지났으면 (피드 정지) 사용하지 않음
+        step = timeframe_seconds(cfg.indicator_timeframe)
+        if st.ts is None or time.time() - st.ts / 1000.0 > 3 * step:
+            return None
+        return st.snapshot()
+
+    def _closed_bars(self, sym: str, since: Optional[int], limit: int) -> List[list]:
+        cfg = self.cfg()
+        step_ms = timeframe_seconds(cfg.indicator_timeframe) * 1000
+        if self.candles is not None:
+            tf = cfg.indicator_timeframe
+            self.candles.sync(self.ex, self.exchange_name, sym, tf, limit)
+            a = self.candles.read(self.exchange_name, sym, tf, limit)
+            if since is not None:
+                a = a[a["ts"] >= since]
+            return [(int(r["ts"]), r["o"], r["h"], r["l"], r["c"]) for r in a]
+        rows = self.ex.fetch_ohlcv(sym, timeframe=cfg.indicator_timeframe, since=since, limit=limit)
+        now_ms = time.time() * 1000
+        return [r for r in rows or [] if r and len(r) > 4 and r[0] + step_ms <= now_ms]
+
+    def refresh(self) -> Dict[str, Any]:
+        cfg = self.cfg()
+        key = (cfg.indicator_timeframe, cfg.indicator_don_len, cfg.indicator_atr_len, cfg.indicator_ema_len)
+        if key != self._key:                 # 설정 변경 → 처음부터 다시
+            self.states, self._key = {}, key
+        out = {}
+        warm = max(cfg.indicator_don_len, cfg.indicator_atr_len, cfg.indicator_ema_len) * 3
+        step_ms = timeframe_seconds(cfg.indicator_timeframe) * 1000
+        for sym in prewarm_symbols(cfg):
+            st = self.states.get(sym)
+            try:
+                if st is None:
+                    st = IndicatorState(cfg.indicator_don_len, cfg.indicator_atr_len, cfg.indicator_ema_len)
+                    rows = self._closed_bars(sym, None, warm + 1)
+                else:
+                    rows = self._closed_bars(sym, st.ts + step_ms, 100)
+                for r in rows:
+                    st.update(int(r[0]), float(r[2]), float(r[3]), float(r[4]))
+                self.states[sym] = st
+                out[sym] = st.snapshot()
+            except Exception as e:
+                self.last_error = str(e)[:200]
+                self._log("indicator_refresh_error", symbol=sym, error=self.last_error)
+        return out
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            step = timeframe_seconds(self.cfg().indicator_timeframe)
+            now = time.time()
+            nxt = (now // step + 1) * step + _CLOSE_DELAY_S
+            if self._stop.wait(max(1.0, nxt - now)):
+                break
+
+    def start(self):
+        if self._thread or not self.cfg().indicator_enabled:
+            return
+        self._thread = threading.Thread(target=self._run, name="indicators", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def info(self) -> Dict[str, Any]:
+        return {"enabled": self._thread is not None, "timeframe": self.cfg().indicator_timeframe,
+                "symbols": {s: st.snapshot() for s, st in self.states.items()}, "last_error": self.last_error}
@@ -0,0 +1,210 @@
+# app/intent.py
+import math
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional
+
+from .parsers import parse_comment_field
+from .symbols import tv_to_ccxt_symbol, UnknownSymbol
+
+# 파싱 테이블 (모듈 로드 시 1회 생성)
+_SLOT = {k: i for i, k in enumerate((
+    "id", "symbol", "ticker", "side", "action", "qty", "amount", "contracts", "qtyPct", "percent",
+    "marketPosition", "marketPositionSize", "prevMarketPosition", "price", "entry", "sl", "tp", "atr",
+    "strategy", "leverage", "reduceOnly", "sizing", "riskPct", "allocPct", "timestamp", "relaySecret", "comment",
+))}
+_N_SLOTS = len(_SLOT)
+_SIDE_MAP = {"buy": "buy", "long": "buy", "sell": "sell", "short": "sell"}
+_TARGET_MP = frozenset(("long", "short", "flat"))
+_STRATEGY_BY_SIDE = {"buy": "bull", "sell": "bear"}
+
+
+def _num(v) -> Optional[float]:
+    if v is None:
+        return None
+    if type(v) is float:
+        return v if math.isfinite(v) else None
+    try:
+        f = float(v)
+    except Exception:
+        return None
+    return f if math.isfinite(f) else None
+
+
+def _first_num(a, b, c=None) -> Optional[float]:
+    for v in (a, b, c):
+        if v is not None:
+            f = _num(v)
+            if f is not None:
+                return f
+    return None
+
+
+def _bool(v) -> bool:
+    if isinstance(v, str):
+        return v.strip().lower() in ("1", "true", "yes", "on")
+    return bool(v)
+
+
+def parse_alert_ts(v) -> Optional[float]:
+    """TradingView timestamp → epoch 초. 숫자(초/ms) 또는 ISO8601({{timenow}}) 허용."""
+    if v is None or v == "":
+        return None
+    f = _num(v)
+    if f is not None:
+        return f / 1000.0 if f > 1e11 else f
+    try:
+        dt = datetime.fromisoformat(str(v).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+@lru_cache(maxsize=512)
+def _resolve_symbol(tv_sym: str) -> Optional[str]:
+    return tv_to_ccxt_symbol(tv_sym)
+
+
+def _lower(v) -> str:
+    return v.lower() if isinstance(v, str) else ""
+
+
+class OrderIntent(NamedTuple):
+    """웹훅 바디를 1회 파싱한 불변 주문 의도 (__slots__ = () 튜플). 이후 단계는 raw dict를 다시 보지 않는다."""
+    id: Optional[str]
+    symbol: str                     # ccxt 심볼 (fallback 적용 후)
+    tv_symbol: Optional[str]
+    side: Optional[str]             # "buy" | "sell" | None
+    mode: str                       # "delta" | "target" | "none"
+    qty: Optional[float]            # 절대 수량 (qty > amount > contracts)
+    qty_pct: Optional[float]        # 부분청산 비율(%)
+    market_position: str
+    market_position_size: Optional[float]
+    prev_market_position: str
+    price: Optional[float]          # 알림 가격 (슬리피지 기준가)
+    entry: Optional[float]
+    sl: Optional[float]
+    tp: Optional[float]
+    atr: Optional[float]
+    strategy: str
+    leverage: Optional[int]
+    reduce_only: bool
+    sizing: Optional[str]
+    risk_pct: Optional[float]
+    alloc_pct: Optional[float]
+    timestamp: Optional[str]
+    alert_ts: Optional[float]       # timestamp → epoch 초
+    relay_secret: Optional[str]
+    is_exit: bool
+    comment: Dict[str, Any]
+
+    @property
+    def priority(self) -> int:
+        """어드미션 우선순위: 0=청산/flat/reduceOnly, 1=target, 2=신규 진입."""
+        if self.is_exit or self.reduce_only or self.market_position == "flat":
+            return 0
+        return 1 if self.mode == "target" else 2
+
+    def desired(self) -> Dict[str, Any]:
+        """reconcile_target 등 기존 헬퍼가 쓰는 desired dict 형태."""
+        if self.mode == "target":
+            return {"mode": "target", "marketPosition": self.market_position, "size": self.market_position_size}
+        if self.mode == "delta":
+            return {"mode": "delta", "side": self.side, "amount": self.qty}
+        return {"mode": "none"}
+
+
+def normalize_payload(raw: Mapping[str, Any], symbol_fallback: str,
+                      resolve: Optional[Callable[[str], Optional[str]]] = None) -> OrderIntent:
+    """
+    TradingView 웹훅 바디(dict)를 OrderIntent로 단일 패스 정규화.
+    - 바디 키를 한 번만 순회해 슬롯 테이블에 배치 (없는 키 조회 비용 없음)
+    - comment는 parse_comment_field로 한 번만 파싱
+    - 수치 필드는 최상위 > comment 순으로 채택
+    - 심볼은 resolve(마켓 테이블, 없으면 정규식 변환)로 해석. 심볼이 없을 때만 symbol_fallback,
+      해석할 수 없는 심볼은 UnknownSymbol (다른 코인 알림이 SYMBOL로 체결되는 것 방지)
+    - 형식 오류는 ValueError
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("payload must be a JSON object")
+    v = [None] * _N_SLOTS
+    slot = _SLOT.get
+    for k, x in raw.items():
+        i = slot(k)
+        if i is not None and x is not None:
+            v[i] = x
+    (tv_id, f_sym, f_ticker, f_side, f_action, f_qty, f_amount, f_contracts, f_qty_pct, f_percent,
+     f_mp, f_mps, f_prev_mp, f_price, f_entry, f_sl, f_tp, f_atr, f_strategy, f_lev, f_ro,
+     f_sizing, f_risk, f_alloc, f_ts, f_secret, f_comment) = v
+
+    comm = parse_comment_field(f_comment) if f_comment is not None else {}
+    if not isinstance(comm, dict):
+        comm = {}
+    cg = comm.get
+
+    tv_sym = f_sym or f_ticker
+    if tv_sym:
+        sym = (resolve or _resolve_symbol)(str(tv_sym))
+        if sym is None:
+            raise UnknownSymbol(f"unknown symbol: {tv_sym}")
+    else:
+        sym = symbol_fallback
+
+    side = _SIDE_MAP.get(_lower(f_side or f_action))
+    mp = _lower(f_mp)
+    mps = _num(f_mps)
+    prev_mp = _lower(f_prev_mp)
+
+    if mp in _TARGET_MP and mps is not None:
+        mode = "target"
+    elif side:
+        mode = "delta"
+    else:
+        mode = "none"
+
+    lev_raw = _num(f_lev)
+    if tv_id is not None:
+        tv_id = str(tv_id)
+    is_exit = (
+        mp == "flat"
+        or (tv_id is not None and "EXIT" in tv_id.upper())
+        or (mode == "delta" and ((prev_mp == "long" and side == "sell") or (prev_mp == "short" and side == "buy")))
+    )
+    # 청산은 amount > qty > contracts (기존 알림 호환), 진입/target은 qty > amount > contracts
+    if is_exit:
+        qty = _first_num(f_amount, f_qty, f_contracts)
+        if qty is None and comm:
+            qty = _num(cg("amount"))
+    else:
+        qty = _first_num(f_qty, f_amount, f_contracts)
+
+    return OrderIntent(
+        tv_id,
+        sym,
+        str(tv_sym) if tv_sym else None,
+        side,
+        mode,
+        qty,
+        _first_num(f_qty_pct, cg("qtyPct"), f_percent),
+        mp,
+        mps,
+        prev_mp,
+        _num(f_price),
+        _first_num(f_entry, cg("entry")),
+        _first_num(f_sl, cg("sl")),
+        _first_num(f_tp, cg("tp")),
+        _first_num(f_atr, cg("atr")),
+        _lower(f_strategy) or _STRATEGY_BY_SIDE.get(side, "unknown"),
+        int(lev_raw) if lev_raw else None,
+        _bool(f_ro),
+        str(f_sizing).lower() if f_sizing else None,
+        _num(f_risk),
+        _num(f_alloc),
+        str(f_ts) if f_ts is not None else None,
+        parse_alert_ts(f_ts),
+        f_secret,
+        is_exit,
+        comm,
+    )
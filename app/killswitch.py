@@ -0,0 +1,240 @@
+# app/killswitch.py
+"""
+비상 청산 (kill switch): 전 심볼 병렬로 미체결 취소 + reduce-only 시장가 청산 + 전역 중지 플래그.
+
+    python -m app.killswitch [--reason R] [--symbols A,B] [--no-flatten] [--status] [--clear]
+
+CLI는 릴레이 프로세스 없이 같은 .env로 거래소/Redis에 직접 붙는다 (릴레이가 죽었을 때도 사용 가능).
+"""
+import copy, json, time, argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+from .logging_utils import log as logf
+from .orders import create_market_order
+from .prewarm import prewarm_symbols
+
+HALT_KEY = "relay:halt"
+
+
+class Halted(HTTPException):
+    """중지 플래그가 서 있는 동안의 신규 주문/신호 → 503."""
+    def __init__(self, reason: str = ""):
+        super().__init__(503, f"halted: {reason}" if reason else "halted")
+
+
+# --- 전역 중지 플래그 (모든 워커/프로세스가 Redis 키 하나를 본다) ---
+def is_halted(r) -> Optional[Dict[str, Any]]:
+    v = r.get(HALT_KEY)
+    if v is None:
+        return None
+    try:
+        return json.loads(v)
+    except Exception:
+        return {"reason": v.decode() if isinstance(v, bytes) else str(v)}
+
+
+def set_halt(r, reason: str = "", by: str = "") -> Dict[str, Any]:
+    rec = {"reason": reason, "by": by, "ts": time.time()}
+    r.set(HALT_KEY, json.dumps(rec))
+    return rec
+
+
+def clear_halt(r) -> bool:
+    return bool(r.delete(HALT_KEY))
+
+
+def fast_client(ex, workers: int, transport=None):
+    """
+    같은 계정/엔드포인트의 ccxt 인스턴스를 클라이언트 스로틀 없이 하나 더 만든다.
+    공유 인스턴스는 enableRateLimit(호출 간 ~120ms 직렬 대기)라 심볼 수십 개면 수 초가 걸림.
+    RateBudget/서킷도 거치지 않음 (비상 경로). 만들 수 없으면 원래 인스턴스.
+    transport가 있으면 전용 세션(풀 = workers, order 타임아웃)을 같은 전송 계층에서 받음.
+    """
+    raw = getattr(ex, "raw", ex)
+    try:
+        k = type(raw)({"apiKey": raw.apiKey, "secret": raw.secret, "enableRateLimit": False,
+                       "options": copy.deepcopy(raw.options or {})})
+        k.urls = copy.deepcopy(raw.urls)
+        k.set_markets(raw.markets, raw.currencies)
+        try:
+            if transport is not None:
+                from .transport import ORDER
+                transport.attach(k, transport.new_session(workers, ORDER), workers, ORDER)
+            else:
+                import requests
+                k.session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=workers))
+        except Exception:
+            pass
+        return k
+    except Exception:
+        return raw
+
+
+def _legs(positions: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """심볼 → 0이 아닌 포지션 목록 (헤지 모드면 롱/숏 두 개일 수 있음)."""
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for p in positions or ():
+        if p and p.get("symbol") and float(p.get("contracts") or 0) > 0:
+            out.setdefault(p["symbol"], []).append(p)
+    return out
+
+
+class KillSwitch:
+    """
+    계정별 ccxt 클라이언트(accounts)에 대해:
+      1) 중지 플래그를 먼저 세움 → 웹훅/아웃박스가 신규 주문을 받지 않음
+      2) 대기 중인 진입 아웃박스 기록 폐기
+      3) 결제통화별 포지션 1회 조회 후 심볼마다 [미체결 취소 → 레그별 reduce-only 시장가 → 조건부 주문 취소]
+         를 스레드 풀에서 동시에 실행. 심볼별 구간 시간(ms)과 전체 dispatch 시간을 보고.
+    현재 설정은 거래 계정 하나(trade)지만 accounts는 이름 → 클라이언트 dict로 받는다.
+    """
+    def __init__(self, r, accounts: Dict[str, Any], cfg_getter, logger=None, outbox=None, transport=None):
+        self.r = r
+        self.transport = transport
+        self.accounts = accounts
+        self.cfg = cfg_getter
+        self.logger = logger
+        self.outbox = outbox
+        self._fast: Dict[str, Any] = {}
+        self.last: Optional[Dict[str, Any]] = None
+
+    def _log(self, event: str, **kw):
+        if self.logger is not None:
+            logf(self.logger, self.cfg().log_json, event, **kw)
+
+    def client(self, name: str):
+        k = self._fast.get(name)
+        if k is None:
+            k = self._fast[name] = fast_client(self.accounts[name], self.cfg().kill_max_workers, self.transport)
+        return k
+
+    def prepare(self):
+        """기동 시 전용 클라이언트를 미리 만들어 둠 (비상 시 생성 비용 제거)."""
+        for name in self.accounts:
+            self.client(name)
+
+    def _symbol(self, k, cfg, sym: str, legs: List[Dict[str, Any]], t0: float) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"orders": [], "errors": []}
+        try:
+            k.cancel_all_orders(sym)
+        except Exception as e:
+            out["errors"].append(f"cancel: {str(e)[:200]}")
+        out["cancel_ms"] = round((time.time() - t0) * 1000, 1)
+        for p in legs:
+            side = "sell" if p.get("side") == "long" else "buy"
+            try:
+                o = create_market_order(k, sym, side, float(p["contracts"]), reduce_only=True, cfg=cfg)
+                out["orders"].append({"id": (o or {}).get("id"), "side": side, "amount": float(p["contracts"])})
+            except Exception as e:
+                out["errors"].append(f"close {p.get('side')}: {str(e)[:200]}")
+        if legs:
+            out["close_ms"] = round((time.time() - t0) * 1000, 1)
+        try:
+            k.cancel_all_orders(sym, {"stop": True})       # 트리거 전 조건부(SL/TP) 주문
+        except Exception as e:
+            out["errors"].append(f"cancel_stop: {str(e)[:200]}")
+        out["done_ms"] = round((time.time() - t0) * 1000, 1)
+        return out
+
+    def _positions(self, k, settles: Iterable[str]) -> List[Dict[str, Any]]:
+        poss: List[Dict[str, Any]] = []
+        for s in settles:
+            poss.extend(k.fetch_positions(None, {"settle": s}) or [])
+        return poss
+
+    def flatten(self, symbols: Iterable[str] = ()) -> Dict[str, Any]:
+        cfg = self.cfg()
+        t0 = time.time()
+        extra = set(symbols) | set(prewarm_symbols(cfg))
+        if self.outbox is not None:
+            extra |= {rec["symbol"] for rec in self.outbox.pending()}
+        out: Dict[str, Any] = {"accounts": {}}
+        jobs = []
+        with ThreadPoolExecutor(max_workers=max(1, cfg.kill_max_workers), thread_name_prefix="kill") as pool:
+            for name in self.accounts:
+                k = self.client(name)
+                acct: Dict[str, Any] = {"symbols": {}, "errors": []}
+                out["accounts"][name] = acct
+                settles = {"USDT"}
+                for s in extra:
+                    try:
+                        settles.add(k.market(s).get("settle") or "USDT")
+                    except Exception:
+                        pass
+                try:
+                    legs = _legs(self._positions(k, sorted(settles)))
+                except Exception as e:
+                    # 포지션을 못 읽으면 아는 심볼의 미체결 취소만이라도
+                    legs = {}
+                    acct["errors"].append(f"positions: {str(e)[:200]}")
+                acct["positions_ms"] = round((time.time() - t0) * 1000, 1)
+                for sym in sorted(set(legs) | extra):
+                    jobs.append((acct, sym, pool.submit(self._symbol, k, cfg, sym, legs.get(sym, []), t0)))
+            for acct, sym, fut in jobs:
+                try:
+                    acct["symbols"][sym] = fut.result()
+                except Exception as e:
+                    acct["symbols"][sym] = {"errors": [str(e)[:200]]}
+        res = [v for a in out["accounts"].values() for v in a["symbols"].values()]
+        closes = [v["close_ms"] for v in res if "close_ms" in v]
+        out["dispatch_ms"] = max(closes) if closes else 0.0
+        out["total_ms"] = round((time.time() - t0) * 1000, 1)
+        out["closed"] = sum(len(v.get("orders", [])) for v in res)
+        out["errors"] = sum(len(v.get("errors", [])) for v in res) + sum(len(a["errors"]) for a in out["accounts"].values())
+        return out
+
+    def kill(self, reason: str = "", by: str = "", flatten: bool = True, symbols: Iterable[str] = ()) -> Dict[str, Any]:
+        t0 = time.time()
+        out: Dict[str, Any] = {"halt": set_halt(self.r, reason, by)}
+        if self.outbox is not None:
+            out["outbox_dropped"] = self.outbox.drop_entries("halted")
+        if flatten:
+            out.update(self.flatten(symbols))
+        out["ts"] = t0
+        self.last = out
+        self._log("kill_switch", reason=reason, by=by, closed=out.get("closed"), errors=out.get("errors"),
+                  dispatch_ms=out.get("dispatch_ms"), total_ms=out.get("total_ms"),
+                  symbols={s: {k: v.get(k) for k in ("cancel_ms", "close_ms", "done_ms")}
+                           for a in out.get("accounts", {}).values() for s, v in a["symbols"].items()})
+        return out
+
+    def info(self) -> Dict[str, Any]:
+        return {"halted": is_halted(self.r), "accounts": list(self.accounts), "last": self.last}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="emergency flatten + global halt")
+    ap.add_argument("--reason", default="cli")
+    ap.add_argument("--symbols", default="", help="추가로 취소/청산할 심볼 (쉼표 구분)")
+    ap.add_argument("--no-flatten", action="store_true", help="중지 플래그만 세움")
+    ap.add_argument("--status", action="store_true")
+    ap.add_argument("--clear", action="store_true", help="중지 플래그 해제")
+    args = ap.parse_args()
+
+    from dotenv import load_dotenv
+    from .config import Config
+    from .redis_utils import connect as redis_connect
+    load_dotenv()
+    cfg = Config.from_env()
+    r = redis_connect(cfg.redis_url)
+    if args.status or args.clear:
+        if args.clear:
+            print(json.dumps({"cleared": clear_halt(r)}))
+        print(json.dumps({"halted": is_halted(r)}, default=str))
+        return
+    from .exchanges import build_exchanges
+    from .outbox import Outbox
+    from .transport import Transport
+    transport = Transport(cfg)
+    ex, _ = build_exchanges(cfg, transport)
+    ks = KillSwitch(r, {"trade": ex}, lambda: cfg, None, Outbox(r, ex, lambda: cfg), transport)
+    ks.prepare()
+    syms = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    print(json.dumps(ks.kill(args.reason, "cli", not args.no_flatten, syms), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
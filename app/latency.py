@@ -0,0 +1,154 @@
+# app/latency.py
+import time, threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+
+# (구간, 시작 스탬프, 끝 스탬프) — 스탬프는 로컬 epoch 초
+SEGMENTS = (
+    ("delivery", "alert", "recv"),     # TradingView → 우리 (TV 시계 기준, 음수면 시계 차이)
+    ("queue", "recv", "start"),        # 어드미션 대기
+    ("gate", "start", "gate"),         # 멱등/레짐/리스크 게이트 + 사이징
+    ("submit", "gate", "submit"),      # 아웃박스 기록 ~ 제출 직전
+    ("ack", "submit", "ack"),          # 거래소 접수 응답 (재시도 포함)
+    ("fill", "ack", "fill"),           # 접수 → 체결 (거래소 시각을 로컬로 환산)
+    ("internal", "recv", "submit"),    # 우리 처리 시간 합계
+    ("total", "alert", "fill"),
+)
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+_HIST_TTL_S = 30 * 24 * 3600
+
+
+def segments(stamps: Dict[str, Optional[float]]) -> Dict[str, float]:
+    out = {}
+    for name, a, b in SEGMENTS:
+        ta, tb = stamps.get(a), stamps.get(b)
+        if ta is not None and tb is not None:
+            out[name] = round((tb - ta) * 1000.0, 2)
+    return out
+
+
+def _bucket(ms: float) -> str:
+    i = bisect_left(BUCKETS_MS, ms)
+    return str(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else "inf"
+
+
+class ClockSkew:
+    """
+    거래소 서버 시각 - 로컬 시각 (ms). fetch_time 왕복의 중간점 기준, 최근 표본 중 RTT가 가장 짧은 것을 채택.
+    """
+    def __init__(self, ex, samples: int = 5):
+        self.ex = ex
+        self.samples = samples
+        self.offset_ms: Optional[float] = None
+        self.rtt_ms: Optional[float] = None
+        self.measured_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def measure(self) -> Optional[float]:
+        best = None
+        for _ in range(self.samples):
+            try:
+                t0 = time.time()
+                server = float(self.ex.fetch_time())
+                t1 = time.time()
+            except Exception:
+                continue
+            rtt = (t1 - t0) * 1000.0
+            off = server - (t0 + t1) * 500.0
+            if best is None or rtt < best[0]:
+                best = (rtt, off)
+        if best is not None:
+            self.rtt_ms, self.offset_ms = round(best[0], 3), round(best[1], 3)
+            self.measured_at = time.time()
+        return self.offset_ms
+
+    def to_local(self, exchange_ms: Optional[float]) -> Optional[float]:
+        """거래소 ms 타임스탬프 → 로컬 epoch 초."""
+        if not exchange_ms:
+            return None
+        return (float(exchange_ms) - (self.offset_ms or 0.0)) / 1000.0
+
+    def info(self) -> Dict[str, Any]:
+        return {"offset_ms": self.offset_ms, "rtt_ms": self.rtt_ms, "measured_at": self.measured_at}
+
+    def _run(self, interval_s: float):
+        while not self._stop.wait(interval_s):
+            self.measure()
+
+    def start(self, interval_s: float):
+        if self._thread or interval_s <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval_s,), name="clock-skew", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def fill_ts(order: Optional[Dict[str, Any]], skew: ClockSkew, seen_at: Optional[float] = None) -> Optional[float]:
+    """
+    체결 시각(로컬 초): 거래소 lastTradeTimestamp > timestamp 순으로 스큐 보정.
+    거래소 시각이 없으면 폴링으로 체결을 확인한 시각(seen_at, 상한값).
+    """
+    if not isinstance(order, dict):
+        return None
+    if str(order.get("status") or "").lower() not in ("closed", "filled"):
+        return None
+    return skew.to_local(order.get("lastTradeTimestamp") or order.get("timestamp")) or seen_at
+
+
+class LatencyRecorder:
+    """전략별 구간 히스토그램 (Redis hash lat:{strategy}, 필드 {구간}:{버킷}/sum/count → 모든 워커 합산)."""
+    def __init__(self, r):
+        self.r = r
+
+    def record(self, strategy: str, segs: Dict[str, float]):
+        if not segs:
+            return
+        k = f"lat:{strategy or 'default'}"
+        try:
+            pipe = self.r.pipeline(transaction=False)
+            for name, ms in segs.items():
+                pipe.hincrby(k, f"{name}:{_bucket(ms)}", 1)
+                pipe.hincrby(k, f"{name}:count", 1)
+                pipe.hincrbyfloat(k, f"{name}:sum", ms)
+            pipe.expire(k, _HIST_TTL_S)
+            pipe.sadd("lat:strategies", strategy or "default")
+            pipe.execute()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _quantile(counts: List[int], q: float) -> Optional[float]:
+        total = sum(counts)
+        if not total:
+            return None
+        need = q * total
+        acc = 0
+        for i, c in enumerate(counts):
+            acc += c
+            if acc >= need:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else float("inf")
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        labels = [str(b) for b in BUCKETS_MS] + ["inf"]
+        for s in sorted(x.decode() if isinstance(x, bytes) else x for x in (self.r.smembers("lat:strategies") or [])):
+            raw = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in (self.r.hgetall(f"lat:{s}") or {}).items()}
+            segs = {}
+            for name, _, _ in SEGMENTS:
+                n = int(raw.get(f"{name}:count", 0))
+                if not n:
+                    continue
+                counts = [int(raw.get(f"{name}:{b}", 0)) for b in labels]
+                p = lambda q: self._quantile(counts, q)
+                segs[name] = {
+                    "count": n, "mean_ms": round(raw.get(f"{name}:sum", 0.0) / n, 2),
+                    "p50_ms": p(0.5), "p90_ms": p(0.9), "p99_ms": p(0.99),
+                    "buckets": {b: c for b, c in zip(labels, counts) if c},
+                }
+            out[s] = segs
+        return out
@@ -0,0 +1,180 @@
+# app/leader.py
+import os, time, socket, asyncio, threading
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from .logging_utils import log as logf
+
+LEASE_KEY = "relay:leader"
+EPOCH_KEY = "relay:leader:epoch"
+_DRIFT_S = 0.2          # 로컬 판단은 Redis TTL보다 이만큼 먼저 만료 (시계/지연 여유)
+
+# 획득: 비어 있으면 SET NX PX + 에폭 증가 (원자적) → 새 에폭, 아니면 0
+_ACQUIRE_LUA = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+  return redis.call('INCR', KEYS[2])
+end
+return 0
+"""
+# 갱신: 내 임대일 때만 PEXPIRE
+_RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+# 해제: 내 임대일 때만 DEL
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+# 펜싱: 임대 보유자 == 나 && 현재 에폭 == 내 토큰 이면 (아웃박스 기록이 있으면 토큰을 찍고) 1
+_FENCE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] and redis.call('GET', KEYS[2]) == ARGV[2] then
+  if #KEYS > 2 then redis.call('HSET', KEYS[3], 'fence', ARGV[2]) end
+  return 1
+end
+return 0
+"""
+
+
+class NotLeader(HTTPException):
+    """대기(standby) 인스턴스 → 503 (nginx가 다른 업스트림으로 넘김)."""
+    def __init__(self, detail: str = "standby"):
+        super().__init__(503, detail)
+
+
+def instance_id(cfg) -> str:
+    return cfg.ha_instance_id or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderLease:
+    """
+    active/standby: 두 인스턴스가 Redis 임대(relay:leader, PX=HA_LEASE_TTL_S) 하나를 두고 경쟁.
+    - 리더는 HA_RENEW_S 마다 갱신, 못 하면 로컬 유효기간이 끝나는 즉시 수신 중단
+    - 대기 인스턴스는 HA_POLL_S 마다 획득 시도 → 임대 만료 후 ~POLL 이내 승격
+    - 획득할 때마다 relay:leader:epoch 증가 = 펜싱 토큰. 주문 제출 직전 fence()가 토큰이 최신인지 확인
+      (멈췄다 깨어난 옛 리더는 에폭이 바뀌어 제출 불가 → 스플릿 브레인 이중 주문 방지)
+    - 대기 중에도 마켓/스냅샷/호가/지표/커넥션은 그대로 워밍 (create_app 전체가 뜸)
+    HA_MODE=off 면 항상 리더, 펜싱 없음.
+    """
+    def __init__(self, r, cfg_getter, logger=None):
+        self.r = r
+        self.cfg = cfg_getter
+        self.logger = logger
+        self.me = instance_id(cfg_getter())
+        self.epoch: Optional[int] = None
+        self._valid_until = 0.0
+        self._acquire = r.register_script(_ACQUIRE_LUA)
+        self._renew = r.register_script(_RENEW_LUA)
+        self._release = r.register_script(_RELEASE_LUA)
+        self._fence = r.register_script(_FENCE_LUA)
+        self.stats = {"acquired": 0, "lost": 0, "fence_rejects": 0, "errors": 0}
+        self.since: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.cfg().ha_mode == "lease"
+
+    def _log(self, event: str, **kw):
+        if self.logger is not None:
+            logf(self.logger, self.cfg().log_json, event, **kw)
+
+    def is_leader(self) -> bool:
+        if not self.enabled:
+            return True
+        return self.epoch is not None and time.monotonic() < self._valid_until
+
+    def _lose(self, reason: str):
+        if self.epoch is not None:
+            self.stats["lost"] += 1
+            self._log("leader_lost", instance=self.me, epoch=self.epoch, reason=reason)
+        self.epoch, self._valid_until, self.since = None, 0.0, None
+
+    def tick(self):
+        cfg = self.cfg()
+        ttl_ms = int(cfg.ha_lease_ttl_s * 1000)
+        t0 = time.monotonic()
+        try:
+            if self.epoch is not None:
+                if self._renew(keys=[LEASE_KEY], args=[self.me, ttl_ms]):
+                    self._valid_until = t0 + cfg.ha_lease_ttl_s - _DRIFT_S
+                else:
+                    self._lose("lease_taken")
+            else:
+                ep = int(self._acquire(keys=[LEASE_KEY, EPOCH_KEY], args=[self.me, ttl_ms]) or 0)
+                if ep:
+                    self.epoch, self._valid_until, self.since = ep, t0 + cfg.ha_lease_ttl_s - _DRIFT_S, time.time()
+                    self.stats["acquired"] += 1
+                    self._log("leader_acquired", instance=self.me, epoch=ep)
+        except Exception as e:
+            # Redis 장애: 갱신 못 함 → 로컬 유효기간이 지나면 is_leader()가 False
+            self.stats["errors"] += 1
+            self.last_error = str(e)[:200]
+            if self.epoch is not None and time.monotonic() >= self._valid_until:
+                self._lose("redis_error")
+
+    def fence(self, rec_key: Optional[str] = None) -> bool:
+        """주문 제출 직전: 내 에폭이 아직 최신이면 True (rec_key가 있으면 그 기록에 fence=에폭)."""
+        if not self.enabled:
+            return True
+        ep = self.epoch
+        if ep is None or not self.is_leader():
+            self.stats["fence_rejects"] += 1
+            return False
+        keys = [LEASE_KEY, EPOCH_KEY] + ([rec_key] if rec_key else [])
+        if self._fence(keys=keys, args=[self.me, ep]):
+            return True
+        self.stats["fence_rejects"] += 1
+        self._lose("fenced")
+        return False
+
+    async def wait(self, timeout: float) -> bool:
+        """대기 인스턴스로 들어온 요청: 승격될 때까지 최대 timeout 초 기다림 (활성 인스턴스가 죽은 경우)."""
+        end = time.monotonic() + timeout
+        while not self.is_leader():
+            if time.monotonic() >= end:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.tick()
+            cfg = self.cfg()
+            if self._stop.wait(cfg.ha_renew_s if self.epoch is not None else cfg.ha_poll_s):
+                break
+
+    def start(self):
+        if self._thread or not self.enabled:
+            return
+        self.tick()
+        self._thread = threading.Thread(target=self._run, name="leader-lease", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """정상 종료: 임대를 바로 놓아 대기 인스턴스가 TTL을 기다리지 않고 승격."""
+        self._stop.set()
+        if self.epoch is not None:
+            try:
+                self._release(keys=[LEASE_KEY], args=[self.me])
+            except Exception:
+                pass
+            self._lose("shutdown")
+
+    def info(self) -> Dict[str, Any]:
+        holder = None
+        if self.enabled:
+            try:
+                v = self.r.get(LEASE_KEY)
+                holder = v.decode() if isinstance(v, bytes) else v
+            except Exception as e:
+                holder = f"error: {e}"
+        return {"mode": self.cfg().ha_mode, "instance": self.me, "leader": self.is_leader(), "epoch": self.epoch,
+                "holder": holder, "since": self.since, "stats": dict(self.stats), "last_error": self.last_error}
@@ -0,0 +1,324 @@
+# app/ledger.py
+import json, time, hashlib, threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .logging_utils import log as logf
+from .market import market_info, round_step, get_last_or_mark
+from .orders import poll_order_completion
+from .pnl import after_exit_update
+
+_EPS = 1e-12
+
+# 가상 포지션 체결 반영 (원자적). qty는 부호 있음(+롱/-숏), avg는 평균 진입가
+# KEYS[1]=vpos:{strategy}:{symbol}, KEYS[2]=vpos:syms:{symbol}, KEYS[3]=vpos:index
+# ARGV: 부호 있는 수량, 가격, 수수료, strategy, symbol, now
+_APPLY_LUA = """
+local q = tonumber(redis.call('HGET', KEYS[1], 'qty') or '0')
+local avg = tonumber(redis.call('HGET', KEYS[1], 'avg') or '0')
+local d = tonumber(ARGV[1]); local px = tonumber(ARGV[2]); local fee = tonumber(ARGV[3])
+local closed = 0; local pnl = 0
+if q == 0 or (q > 0) == (d > 0) then
+  local aq = math.abs(q); local ad = math.abs(d)
+  avg = (avg * aq + px * ad) / (aq + ad)
+  q = q + d
+else
+  closed = math.min(math.abs(d), math.abs(q))
+  if q > 0 then pnl = (px - avg) * closed else pnl = (avg - px) * closed end
+  local nq = q + d
+  if math.abs(nq) < 1e-12 then nq = 0; avg = 0
+  elseif (nq > 0) ~= (q > 0) then avg = px end
+  q = nq
+end
+q = math.floor(q * 1e9 + 0.5) / 1e9      -- 배분 비율 계산의 부동소수 잔차 제거
+pnl = pnl - fee
+redis.call('HSET', KEYS[1], 'qty', string.format('%.17g', q), 'avg', string.format('%.17g', avg), 'ts', ARGV[6])
+redis.call('HINCRBYFLOAT', KEYS[1], 'realized', string.format('%.17g', pnl))
+redis.call('HINCRBYFLOAT', KEYS[1], 'fees', string.format('%.17g', fee))
+redis.call('HINCRBY', KEYS[1], 'fills', 1)
+redis.call('SADD', KEYS[2], ARGV[4]); redis.call('SADD', KEYS[3], ARGV[5])
+return {string.format('%.17g', q), string.format('%.17g', avg), string.format('%.17g', pnl), string.format('%.17g', closed)}
+"""
+
+
+def _f(v) -> float:
+    try:
+        return float(v.decode() if isinstance(v, bytes) else v)
+    except Exception:
+        return 0.0
+
+
+def _s(v) -> str:
+    return v.decode() if isinstance(v, bytes) else str(v)
+
+
+class Ledger:
+    """
+    (전략, 심볼)별 가상 포지션 — Redis hash vpos:{strategy}:{symbol} (qty 부호 있음, avg, realized, fees, fills).
+    원웨이 모드에서 bull/bear가 거래소 포지션 하나를 공유해도 전략별 수량/평단/실현손익이 따로 남는다.
+    거래소 순포지션 = 전략 qty 합 (차이는 info()의 drift로 확인).
+    """
+    def __init__(self, r):
+        self.r = r
+        self._apply = r.register_script(_APPLY_LUA)
+
+    @staticmethod
+    def key(strategy: str, symbol: str) -> str:
+        return f"vpos:{strategy}:{symbol}"
+
+    def get(self, strategy: str, symbol: str) -> Dict[str, float]:
+        h = self.r.hgetall(self.key(strategy, symbol))
+        return {_s(k): _f(v) for k, v in h.items()}
+
+    def qty(self, strategy: str, symbol: str) -> float:
+        return _f(self.r.hget(self.key(strategy, symbol), "qty"))
+
+    def strategies(self, symbol: str) -> List[str]:
+        return sorted(_s(x) for x in self.r.smembers(f"vpos:syms:{symbol}"))
+
+    def tracked(self, symbol: str) -> bool:
+        """이 심볼에 가상 포지션 기록이 있는지 (없으면 예전처럼 거래소 포지션 기준)."""
+        return bool(self.r.exists(f"vpos:syms:{symbol}"))
+
+    def net(self, symbol: str) -> float:
+        return sum(self.qty(s, symbol) for s in self.strategies(symbol))
+
+    def apply(self, strategy: str, symbol: str, qty: float, px: float, fee: float = 0.0) -> Dict[str, float]:
+        """체결 반영. 반환: 새 qty/avg, 이번 체결 실현손익(pnl, 수수료 차감), 청산 수량(closed)."""
+        q, avg, pnl, closed = self._apply(
+            keys=[self.key(strategy, symbol), f"vpos:syms:{symbol}", "vpos:index"],
+            args=[repr(float(qty)), repr(float(px)), repr(float(fee)), strategy, symbol, repr(time.time())])
+        return {"qty": _f(q), "avg": _f(avg), "pnl": _f(pnl), "closed": _f(closed)}
+
+    def info(self, exchange_net: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        out = {}
+        for sym in sorted(_s(x) for x in self.r.smembers("vpos:index")):
+            rows = {s: self.get(s, sym) for s in self.strategies(sym)}
+            rec: Dict[str, Any] = {"strategies": rows, "net": sum(v.get("qty", 0.0) for v in rows.values())}
+            if exchange_net is not None and sym in exchange_net:
+                rec["exchange"] = exchange_net[sym]
+                rec["drift"] = exchange_net[sym] - rec["net"]
+            out[sym] = rec
+        return out
+
+
+class Leg(NamedTuple):
+    strategy: str
+    tv_id: str
+    qty: float                   # 부호 있음 (+매수/-매도)
+    reduce_only: bool
+    limit_px: Optional[float]
+
+
+def net_legs(legs: List[Leg]) -> Tuple[float, List[Tuple[float, float]]]:
+    """
+    순주문 수량(부호)과 레그별 (내부 상계분, 거래소분). 반대 방향 레그끼리는 거래소를 거치지 않고 상계,
+    남는 순수량만 주문하고 그 방향 레그들이 비율대로 나눠 가진다.
+    """
+    b = sum(l.qty for l in legs if l.qty > 0)
+    s = -sum(l.qty for l in legs if l.qty < 0)
+    net = b - s
+    split = []
+    for l in legs:
+        if l.qty > 0:
+            internal = l.qty * (min(b, s) / b)
+        elif l.qty < 0:
+            internal = l.qty * (min(b, s) / s)
+        else:
+            internal = 0.0
+        split.append((internal, l.qty - internal))
+    return net, split
+
+
+def allocate(legs: List[Leg], split: List[Tuple[float, float]], net: float, filled: float, avg_px: float,
+             fee: float, cross_px: float) -> List[Dict[str, float]]:
+    """거래소 체결(filled, avg_px, fee)과 상계 가격(cross_px)을 레그별 체결로 배분 (부분 체결은 비율대로)."""
+    ratio = min(1.0, filled / abs(net)) if abs(net) > _EPS else 0.0
+    out = []
+    for (internal, external) in split:
+        ext = external * ratio
+        q = internal + ext
+        px = (abs(internal) * cross_px + abs(ext) * avg_px) / abs(q) if abs(q) > _EPS else cross_px
+        out.append({"qty": q, "px": px, "fee": fee * abs(ext) / filled if filled > _EPS else 0.0,
+                    "internal": internal, "external": ext})
+    return out
+
+
+def order_fill(order: Optional[Dict[str, Any]], ack: Optional[Dict[str, Any]], amount: float,
+               ref_px: float, taker_fee: float) -> Tuple[float, float, float]:
+    """최종(없으면 접수) 주문에서 (체결 수량, 평균가, 수수료). 모르면 시장가 전량 체결로 가정."""
+    o = order or ack or {}
+    filled = o.get("filled")
+    filled = float(filled) if filled is not None else float(amount)
+    px = float(o.get("average") or o.get("price") or ref_px or 0.0)
+    fee = (o.get("fee") or {}).get("cost")
+    fee = float(fee) if fee is not None else filled * px * taker_fee
+    return filled, px, fee
+
+
+class _Round:
+    def __init__(self, symbol: str, expect: Optional[int], deadline: float):
+        self.symbol = symbol
+        self.expect = expect
+        self.deadline = deadline
+        self.legs: List[Leg] = []
+        self.left = 0
+        self.closed = False
+        self.done = threading.Event()
+        self.results: Optional[List[Dict[str, Any]]] = None
+        self.error: Optional[BaseException] = None
+
+    def complete(self) -> bool:
+        return self.expect is not None and len(self.legs) + self.left >= self.expect
+
+
+class NettingDesk:
+    """
+    같은 심볼에 동시에 들어온 전략 레그를 순수량 주문 하나로 실행하고 체결을 전략별 가상 포지션에 배분.
+    - 배치: 심볼별 라운드(expect=항목 수) — 모든 항목이 참여(execute)하거나 빠질(leave) 때까지 모음
+    - 단건: NETTING_WINDOW_MS 동안 같은 심볼 레그를 모음 (0이면 즉시 단독 실행 = 기존과 같은 주문)
+    - 첫 참여 스레드가 실행, 나머지는 결과를 기다림 (예외도 같이 받음)
+    - 단독 레그의 clientOrderId는 기존과 같음 (신호 id), 묶인 주문은 참여 id들의 해시
+    헤지 모드/NETTING_ENABLED=false 면 상계 없이 항상 단독 실행 (가상 포지션 기록은 동일).
+    """
+    def __init__(self, outbox, ledger: Ledger, ex, snaps, cfg_getter, logger=None):
+        self.outbox = outbox
+        self.ledger = ledger
+        self.ex = ex
+        self.snaps = snaps
+        self.cfg = cfg_getter
+        self.logger = logger
+        self._lock = threading.Condition()
+        self._open: Dict[str, _Round] = {}
+        self.stats = {"rounds": 0, "netted_rounds": 0, "legs": 0, "orders": 0, "saved_orders": 0, "crossed_qty": 0.0}
+
+    def _log(self, event: str, **kw):
+        if self.logger is not None:
+            logf(self.logger, self.cfg().log_json, event, **kw)
+
+    def enabled(self, cfg) -> bool:
+        return bool(cfg.netting_enabled) and not cfg.phemex_hedged
+
+    # --- 배치 라운드 ---
+    def open_round(self, symbol: str, expect: int) -> _Round:
+        return _Round(symbol, expect, time.time() + self.cfg().netting_max_wait_ms / 1000.0)
+
+    def leave(self, rnd: Optional[_Round]):
+        """라운드 항목이 주문 없이 끝남 (게이트 차단/중복/오류) → 나머지 항목을 기다리지 않게."""
+        if rnd is None:
+            return
+        with self._lock:
+            rnd.left += 1
+            self._lock.notify_all()
+
+    # --- 실행 ---
+    def execute(self, cfg, symbol: str, leg: Leg, rnd: Optional[_Round] = None) -> Dict[str, Any]:
+        """레그 실행 → 이 레그 몫의 결과 (주문, 배분된 체결, 갱신된 가상 포지션)."""
+        window = cfg.netting_window_ms / 1000.0
+        with self._lock:
+            if not self.enabled(cfg) or (rnd is None and window <= 0) or (rnd is not None and rnd.closed):
+                rnd = _Round(symbol, 1, time.time())
+            elif rnd is None:
+                rnd = self._open.get(symbol)
+                if rnd is None or rnd.closed:
+                    rnd = self._open[symbol] = _Round(symbol, None, time.time() + window)
+            idx = len(rnd.legs)
+            rnd.legs.append(leg)
+            self._lock.notify_all()
+            runner = idx == 0
+            if runner:
+                while not rnd.complete() and time.time() < rnd.deadline:
+                    self._lock.wait(max(0.001, rnd.deadline - time.time()))
+                rnd.closed = True
+                if self._open.get(symbol) is rnd:
+                    del self._open[symbol]
+        if runner:
+            try:
+                rnd.results = self._run(cfg, symbol, list(rnd.legs))
+            except BaseException as e:
+                rnd.error = e
+            finally:
+                rnd.done.set()
+        else:
+            rnd.done.wait()
+        if rnd.error is not None:
+            raise rnd.error
+        return rnd.results[idx]
+
+    def _run(self, cfg, symbol: str, legs: List[Leg]) -> List[Dict[str, Any]]:
+        net, split = net_legs(legs)
+        mi = market_info(self.ex, symbol, cfg.symbol_fallback)
+        amount = round_step(abs(net), mi["amount_step"])
+        side = "buy" if net > 0 else "sell"
+        if len(legs) == 1:
+            tv_id = legs[0].tv_id
+        else:
+            tv_id = "net:" + hashlib.sha1("|".join(sorted(l.tv_id for l in legs)).encode()).hexdigest()[:24]
+        # 순주문 방향 레그들의 제약: 모두 reduce-only 일 때만 reduce-only, 한도가는 가장 보수적인 값
+        same = [l for l in legs if l.qty and (l.qty > 0) == (net > 0)]
+        reduce_only = bool(same) and all(l.reduce_only for l in same)
+        lims = [l.limit_px for l in same if l.limit_px]
+        limit_px = (min(lims) if side == "buy" else max(lims)) if lims and len(lims) == len(same) else None
+
+        out: Dict[str, Any] = {"order": None, "order_final": None, "submit_ts": None, "ack_ts": None, "fill_at": None,
+                               "net": {"legs": len(legs), "net_qty": net, "amount": amount, "side": side, "tv_id": tv_id}}
+        rec = None
+        try:
+            filled = avg = fee = 0.0
+            if amount > 0:
+                rec = self.outbox.persist(tv_id, symbol, side, amount, reduce_only=reduce_only, limit_px=limit_px,
+                                          strategy=legs[0].strategy if len(legs) == 1 else "net",
+                                          legs=[[l.strategy, l.tv_id, l.qty] for l in legs])
+                out["submit_ts"] = time.time()
+                order = self.outbox.submit(rec)
+                out["ack_ts"] = time.time()
+                out["order"] = order
+                if order.get("id"):
+                    out["order_final"] = poll_order_completion(self.ex, symbol, order["id"], cfg.recon_retries, cfg.recon_wait)
+                    out["fill_at"] = time.time()
+                filled, avg, fee = order_fill(out["order_final"], order, amount, 0.0, cfg.taker_fee)
+                self.stats["orders"] += 1
+            cross = avg
+            if cross <= 0:
+                cross = get_last_or_mark(self.ex, symbol, cfg.use_mark_price, self.snaps, cfg.snapshot_price_max_age_s)
+            fills = allocate(legs, split, net if amount > 0 else 0.0, filled, avg or cross, fee, cross)
+            results = []
+            for l, f in zip(legs, fills):
+                pos = self.ledger.apply(l.strategy, symbol, f["qty"], f["px"], f["fee"]) if abs(f["qty"]) > _EPS else None
+                results.append({**out, "fill": f, "position": pos})
+        except Exception as e:
+            if rec is not None:
+                e.outbox_rec = rec          # 호출자: 202(재시도 대기)/멱등 키 유지 여부 판단
+            raise
+        crossed = sum(abs(i) for i, _ in split) / 2.0
+        self.stats["rounds"] += 1
+        self.stats["legs"] += len(legs)
+        self.stats["crossed_qty"] += crossed
+        if len(legs) > 1:
+            self.stats["netted_rounds"] += 1
+            self.stats["saved_orders"] += len(legs) - (1 if amount > 0 else 0)
+            self._log("netting_round", symbol=symbol, legs=[[l.strategy, l.tv_id, l.qty] for l in legs], net=net,
+                      amount=amount, crossed=crossed, filled=filled, avg=avg, cross_px=cross)
+        return results
+
+    def recover(self, rec: Dict[str, str], order: Dict[str, Any]):
+        """아웃박스 스윕이 이어서 제출한 주문: 기록된 레그대로 가상 포지션에 배분."""
+        meta = json.loads(rec.get("meta") or "{}")
+        if not meta.get("legs"):
+            return
+        cfg = self.cfg()
+        legs = [Leg(s, t, float(q), False, None) for s, t, q in meta["legs"]]
+        net, split = net_legs(legs)
+        filled, avg, fee = order_fill(None, order, float(rec["amount"]), float(meta.get("entry_px") or 0.0), cfg.taker_fee)
+        if avg <= 0:
+            avg = get_last_or_mark(self.ex, rec["symbol"], cfg.use_mark_price, self.snaps, cfg.snapshot_price_max_age_s)
+        for l, f in zip(legs, allocate(legs, split, net, filled, avg, fee, avg)):
+            if abs(f["qty"]) > _EPS:
+                pos = self.ledger.apply(l.strategy, rec["symbol"], f["qty"], f["px"], f["fee"])
+                if pos["closed"] > 0:
+                    # 요청 경로(_execute_leg)와 같게: 청산분 실현손익 → 일일 손익/연패 쿨다운
+                    after_exit_update(self.ledger.r, cfg, l.strategy, pos["pnl"])
+
+    def info(self) -> Dict[str, Any]:
+        cfg = self.cfg()
+        return {"enabled": self.enabled(cfg), "window_ms": cfg.netting_window_ms,
+                "max_wait_ms": cfg.netting_max_wait_ms, "stats": dict(self.stats)}
@@ -32,3 +32,7 @@ def log(logger: logging.Logger, json_mode: bool, event: str, **kwargs):
     rec.update(kwargs)
     if json_mode: logger.info(json.dumps(rec, ensure_ascii=False))
     else:         logger.info(f"{rec}")
+
+def log_decision(logger: logging.Logger, cfg, event: str, **kwargs):
+    """결정 로그: 적용된 설정 버전(cfg_version)을 항상 함께 기록."""
+    log(logger, cfg.log_json, event, cfg_version=getattr(cfg, "config_version", 0), **kwargs)
@@ -3,23 +3,47 @@ import time
 from fastapi import FastAPI
 from dotenv import load_dotenv
 
-from .config import Config
 from .logging_utils import setup_logger
 from .redis_utils import connect as redis_connect
 from .exchanges import build_exchanges
+from .transport import Transport
 from .webhook import router as api_router
+from .status import router as status_router, StatusRefresher
+from .admin import router as admin_router
+from .config_reload import ConfigReloader, startup_config
+from .regime_engine import RegimeEngine
+from .funding import FundingCache
+from .external import ExternalPoller, register_default_feeds
+from .ratelimit import RateBudget, BudgetedExchange, budget_name
+from .admission import AdmissionController
+from .snapshots import SnapshotStore
+from .prewarm import PrewarmScheduler, prewarm_symbols
+from .sizing_table import SizingTable
+from .outbox import Outbox
+from .symbols import SymbolResolver
+from .orderbook import OrderBookFeed
+from .indicators import IndicatorEngine
+from .candles import CandleStore
+from .latency import ClockSkew, LatencyRecorder
+from .killswitch import KillSwitch
+from .leader import LeaderLease
+from .ledger import Ledger, NettingDesk
+from .profiling import RequestProfiler, StackSampler
 from .orders import ensure_position_mode   # ← 상대 import를 권장
 
 load_dotenv()
 
 def create_app() -> FastAPI:
-    cfg = Config.from_env()
+    # env < CONFIG_FILE 로 Redis 접속 → Redis hash 까지 병합한 설정으로 로거/클라이언트 생성
+    cfg = startup_config()
+    r = redis_connect(cfg.redis_url)
+    cfg = startup_config(r)
 
     logger = setup_logger(cfg.log_json, cfg.log_level, cfg.log_to_file, cfg.log_file)
-    r = redis_connect(cfg.redis_url)
 
-    # 1) 거래소 클라이언트 생성
-    ex, ex_regime = build_exchanges(cfg)
+    # 1) 거래소 클라이언트 생성 (공유 HTTP 전송: 호스트별 풀, keep-alive, DNS 캐시, 분류별 타임아웃)
+    transport = Transport(cfg)
+    ex, ex_regime = build_exchanges(cfg, transport)
 
     # 2) 포지션 모드(원웨이/헤지) 보정 + hedged 플래그 세팅
     ensure_position_mode(ex, cfg)
@@ -27,13 +51,108 @@ def create_app() -> FastAPI:
     # 3) FastAPI 앱 구성
     app = FastAPI(title="Phemex Relay (Modular)", version="1.3.0")
     app.state.cfg = cfg
+    app.state.transport = transport
+
+    # 3-1) 클러스터 공유 레이트리밋 예산 (Redis 토큰 버킷) 프록시
+    cfg_now = lambda: app.state.cfg
+    trade_budget = RateBudget(r, budget_name(ex, cfg.trade_testnet), cfg_now)
+    if ex_regime is ex:
+        ex = ex_regime = BudgetedExchange(ex, trade_budget)
+    else:
+        reg_name = budget_name(ex_regime, cfg.regime_testnet)
+        reg_budget = trade_budget if reg_name == trade_budget.name else RateBudget(r, reg_name, cfg_now)
+        ex, ex_regime = BudgetedExchange(ex, trade_budget), BudgetedExchange(ex_regime, reg_budget)
+    app.state.budgets = {b.name: b for b in {trade_budget, ex_regime.budget}}
+
     app.state.logger = logger
     app.state.r = r
     app.state.ex = ex
     app.state.ex_regime = ex_regime
+    # TradingView 심볼 → ccxt 심볼 (로드된 마켓 기준, 모르는 심볼은 거절)
+    app.state.symbols = SymbolResolver.from_exchange(ex)
+    app.state.funding = FundingCache(ex, int(cfg.funding_interval_h * 3600), cfg.funding_settle_s, cfg.funding_max_age_s,
+                                     logger, cfg.log_json)
+    app.state.external = ExternalPoller(cfg.external_timeout_s, transport.session)
+    # 워커 공유 캔들 저장소 (memmap): 레짐/지표/분석이 같은 파일을 복사 없이 읽음
+    app.state.candles = CandleStore(cfg.candle_store_dir, cfg.candle_store_max_rows) if cfg.candle_store_enabled else None
+    app.state.regime_engine = RegimeEngine(ex, ex_regime, app.state.funding, app.state.external, app.state.candles)
+    app.state.admission = AdmissionController(cfg_now)
+    app.state.snapshots = SnapshotStore()
+    app.state.sizing_table = SizingTable(ex, app.state.snapshots)
+    # active/standby 리더 임대 (HA_MODE=lease): 주문 제출은 펜싱 토큰 확인 후
+    app.state.leader = LeaderLease(r, cfg_now, logger)
+    app.state.outbox = Outbox(r, ex, cfg_now, logger, app.state.leader)
+    # 전략별 가상 포지션 + 같은 심볼 동시 신호 상계 (스윕이 이어 제출한 주문도 레그대로 배분)
+    app.state.ledger = Ledger(r)
+    app.state.netting = NettingDesk(app.state.outbox, app.state.ledger, ex, app.state.snapshots, cfg_now, logger)
+    app.state.outbox.on_recovered = app.state.netting.recover
+    app.state.clock = ClockSkew(ex)
+    app.state.latency = LatencyRecorder(r)
+    app.state.orderbook = OrderBookFeed(ex, cfg_now, logger, cfg.trade_testnet)
+    app.state.indicators = IndicatorEngine(ex, cfg_now, logger, app.state.candles, budget_name(ex, cfg.trade_testnet))
+    # 비상 청산: 계정 이름 → 클라이언트 (현재는 거래 계정 하나)
+    app.state.killswitch = KillSwitch(r, {"trade": ex}, cfg_now, logger, app.state.outbox, transport)
+    # 온디맨드 요청 프로파일 (관리 엔드포인트로 무장) + 상시 저빈도 스택 샘플링
+    app.state.profiler = RequestProfiler(r, cfg_now, logger)
+    app.state.sampler = StackSampler(cfg_now, logger)
     app.state.app_start = time.time()
+    app.state.on_config_change = []
+
+    # 4) 설정 핫리로드 (CONFIG_FILE / Redis hash → app.state.cfg 원자 교체)
+    app.state.config_reloader = ConfigReloader(app, r, logger)
+    app.state.config_reloader.reload(force=True)
+    app.state.config_reloader.start()
+
+    # 5) 펀딩비 캐시 선적재 → 정산 주기 기반 백그라운드 갱신
+    cfg = app.state.cfg
+    app.state.funding.track([cfg.symbol_fallback, cfg.regime_funding_symbol] + [u[0] for u in app.state.regime_engine.universe(cfg, app.state.regime_engine.source_symbols)])
+    app.state.funding.refresh_due()
+    app.state.funding.start()
+
+    # 6) 외부 지표(VIX 등) 폴러: stale-while-revalidate + 서킷 브레이커
+    register_default_feeds(app.state.external, cfg)
+    app.state.external.poll_due()
+    app.state.on_config_change.append(lambda old, new: register_default_feeds(app.state.external, new))
+    app.state.on_config_change.append(lambda old, new: transport.configure(new))
+    app.state.external.start()
+
+    # 7) 봉 마감 프리웜: 마감 직전 스냅샷 갱신 + 거래소 커넥션 워밍
+    app.state.prewarm = PrewarmScheduler(app, app.state.snapshots)
+    app.state.prewarm.start()
+
+    # 8) 사이징 테이블: 설정이 바뀌면 재계산 (잔고/레짐 갱신은 프리웜이 담당)
+    app.state.on_config_change.append(lambda old, new: app.state.sizing_table.rebuild(new))
+
+    # 9) /status 는 스냅샷만 읽음 → 포지션/잔고는 고정 주기로 갱신
+    app.state.status_refresher = StatusRefresher(app)
+    app.state.status_refresher.start()
+
+    # 10) 주문 아웃박스: 이전 프로세스가 남긴 pending 주문 복구 후 주기 스윕
+    app.state.outbox.start()
+
+    # 11) 지연 계측: 거래소 서버 시각 스큐 측정 (체결 시각 → 로컬 시각 환산)
+    app.state.clock.measure()
+    app.state.clock.start(cfg.clock_skew_refresh_s)
+
+    # 12) L2 호가 (WebSocket): 깊이 기반 슬리피지 가드/IOC 한도가
+    app.state.orderbook.start(prewarm_symbols(cfg))
+
+    # 13) 전략 타임프레임 지표 (Donchian/ATR/EMA): 봉 마감마다 O(1) 갱신
+    app.state.indicators.start()
+
+    # 14) 킬 스위치 전용 클라이언트 (스로틀 없음) 미리 생성
+    app.state.killswitch.prepare()
+
+    # 15) 리더 임대: 워밍이 끝난 뒤 경쟁 시작 (대기 인스턴스도 위 상태를 모두 유지), 정상 종료 시 즉시 반납
+    app.state.leader.start()
+    app.add_event_handler("shutdown", app.state.leader.stop)
+
+    # 16) 상시 스택 샘플러 (PROFILE_SAMPLE_HZ=0 이면 설정 확인만)
+    app.state.sampler.start()
 
     app.include_router(api_router)
+    app.include_router(status_router)
+    app.include_router(admin_router)
     return app
 
 app = create_app()
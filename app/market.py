@@ -1,4 +1,5 @@
 import math
+import ccxt
 from typing import Optional, Dict, Any, Tuple
 
 def market_info(ex, symbol: str, fallback: str):
@@ -19,8 +20,13 @@ def round_step(val: float, step: Optional[float]) -> float:
     if not step or step <= 0: return val
     return math.floor(val / step) * step
 
-def get_last_or_mark(ex, symbol: str, use_mark: bool) -> float:
-    t = ex.fetch_ticker(symbol)
+def get_last_or_mark(ex, symbol: str, use_mark: bool, snaps=None, max_age: float = 0.0) -> float:
+    """snaps(SnapshotStore)가 주어지면 max_age 이내 티커를 재사용하고, 조회 결과는 다시 저장."""
+    t = snaps.get("ticker", symbol, max_age) if snaps is not None else None
+    if t is None:
+        t = ex.fetch_ticker(symbol)
+        if snaps is not None:
+            snaps.put("ticker", symbol, t)
     if use_mark:
         return float(t.get("info",{}).get("markPrice", t["last"]))
     return float(t["last"])
@@ -30,6 +36,9 @@ def fetch_positions(ex, symbol: str) -> Dict[str, Any]:
         poss = ex.fetch_positions([symbol])
         if poss:
             return poss[0]
+    except ccxt.NetworkError:
+        # 429/타임아웃/서킷 오픈을 "포지션 없음"으로 삼키지 않는다
+        raise
     except Exception:
         pass
     return {}
@@ -0,0 +1,254 @@
+# app/orderbook.py
+import json, time, asyncio, threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# websockets는 선택 의존성 (uvicorn[standard]에 포함). 없으면 호가 피드 비활성 → 가격 밴드 가드만 사용
+try:
+    import websockets
+except Exception:
+    websockets = None
+
+from .logging_utils import log as logf
+
+_PING_S = 15.0
+_RECV_TIMEOUT_S = 5.0
+_BACKOFF_MAX_S = 30.0
+
+
+class L2Book:
+    """
+    심볼 하나의 L2 호가 (가격 → 수량). 정렬 리스트는 변경 후 첫 조회 때만 다시 만든다 (Phemex 30레벨).
+    시퀀스: 스냅샷 이전 델타 무시, sequence가 증가하지 않는 델타는 버림, 교차 호가는 재동기화 요청.
+    """
+    __slots__ = ("symbol", "bids", "asks", "seq", "ts", "synced", "_b", "_a")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.seq = 0
+        self.ts = 0.0
+        self.synced = False
+        self._b: Optional[List[Tuple[float, float]]] = None
+        self._a: Optional[List[Tuple[float, float]]] = None
+
+    @staticmethod
+    def _apply(side: Dict[float, float], rows):
+        for row in rows or ():
+            p, q = float(row[0]), float(row[1])
+            if q > 0:
+                side[p] = q
+            else:
+                side.pop(p, None)
+
+    def snapshot(self, bids, asks, seq: int):
+        self.bids, self.asks = {}, {}
+        self._apply(self.bids, bids)
+        self._apply(self.asks, asks)
+        self.seq, self.ts, self.synced = int(seq or 0), time.time(), True
+        self._b = self._a = None
+
+    def delta(self, bids, asks, seq: int) -> bool:
+        """적용하면 True. 스냅샷 전/오래된 시퀀스는 False (무시). 교차되면 synced=False."""
+        seq = int(seq or 0)
+        if not self.synced or seq <= self.seq:
+            return False
+        self._apply(self.bids, bids)
+        self._apply(self.asks, asks)
+        self.seq, self.ts = seq, time.time()
+        self._b = self._a = None
+        bid, ask = self.best()
+        if bid is not None and ask is not None and bid >= ask:
+            self.synced = False
+        return True
+
+    def levels(self, side: str) -> List[Tuple[float, float]]:
+        """side='asks'는 오름차순, 'bids'는 내림차순."""
+        if side == "asks":
+            if self._a is None:
+                self._a = sorted(self.asks.items())
+            return self._a
+        if self._b is None:
+            self._b = sorted(self.bids.items(), reverse=True)
+        return self._b
+
+    def best(self) -> Tuple[Optional[float], Optional[float]]:
+        b, a = self.levels("bids"), self.levels("asks")
+        return (b[0][0] if b else None), (a[0][0] if a else None)
+
+    def sweep(self, side: str, amount: float) -> Optional[Dict[str, Any]]:
+        """
+        amount를 시장가로 체결할 때의 예상치. buy는 asks, sell은 bids를 소진.
+        impact = VWAP의 mid 대비 불리한 방향 괴리 (비율), filled < amount 면 보이는 호가로는 부족.
+        """
+        bid, ask = self.best()
+        if bid is None or ask is None or amount <= 0:
+            return None
+        mid = (bid + ask) / 2.0
+        rows = self.levels("asks" if side == "buy" else "bids")
+        left, cost, worst, n = amount, 0.0, rows[0][0], 0
+        for p, q in rows:
+            take = q if q < left else left
+            cost += take * p
+            left -= take
+            worst = p
+            n += 1
+            if left <= 0:
+                break
+        filled = amount - max(left, 0.0)
+        vwap = cost / filled
+        impact = (vwap - mid) / mid if side == "buy" else (mid - vwap) / mid
+        return {"vwap": vwap, "worst": worst, "mid": mid, "impact": impact, "filled": filled,
+                "amount": amount, "levels": n, "seq": self.seq, "age_s": round(time.time() - self.ts, 3)}
+
+
+class OrderBookFeed:
+    """
+    Phemex USDT 무기한 orderbook_p WebSocket → 심볼별 L2Book.
+    - 전용 스레드의 asyncio 루프에서 구독/수신, 15초마다 server.ping
+    - 스냅샷 후 델타 적용, 교차/역순이 감지되면 연결을 끊고 재구독 (새 스냅샷)
+    - 웹훅 경로는 estimate()만 호출 (I/O 없음). 동기화 안 됐거나 ORDERBOOK_MAX_AGE_S보다 오래되면 None
+    """
+    def __init__(self, ex, cfg_getter, logger=None, testnet: bool = False):
+        self.ex = ex
+        self.cfg = cfg_getter
+        self.logger = logger
+        self.testnet = testnet
+        self.books: Dict[str, L2Book] = {}
+        self._by_id: Dict[str, str] = {}
+        self._pending: List[str] = []
+        self._resync = False
+        self.stats = {"msgs": 0, "snapshots": 0, "deltas": 0, "stale_deltas": 0, "resyncs": 0, "reconnects": 0}
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _log(self, event: str, **kw):
+        if self.logger is not None:
+            logf(self.logger, self.cfg().log_json, event, **kw)
+
+    def url(self) -> str:
+        cfg = self.cfg()
+        if cfg.orderbook_ws_url:
+            return cfg.orderbook_ws_url
+        return "wss://testnet-api.phemex.com/ws" if self.testnet else "wss://ws.phemex.com"
+
+    # --- read path ---
+    def book(self, symbol: str) -> Optional[L2Book]:
+        b = self.books.get(symbol)
+        if b is None or not b.synced:
+            return None
+        max_age = self.cfg().orderbook_max_age_s
+        if max_age > 0 and time.time() - b.ts > max_age:
+            return None
+        return b
+
+    def estimate(self, symbol: str, side: str, amount: float) -> Optional[Dict[str, Any]]:
+        b = self.book(symbol)
+        if b is None:
+            if symbol not in self.books:
+                self.track([symbol])
+            return None
+        return b.sweep(side, amount)
+
+    # --- subscriptions ---
+    def track(self, symbols: Iterable[str]):
+        for s in symbols:
+            if not s or s in self.books:
+                continue
+            try:
+                m = self.ex.market(s)
+            except Exception:
+                continue
+            if not (m.get("swap") and m.get("settle") == "USDT"):
+                continue                    # orderbook_p(문자열 가격)만 지원
+            self.books[s] = L2Book(s)
+            self._by_id[m["id"]] = s
+            self._pending.append(m["id"])
+
+    def on_message(self, msg: Dict[str, Any]):
+        data = msg.get("orderbook_p")
+        if data is None:
+            return
+        sym = self._by_id.get(msg.get("symbol"))
+        b = self.books.get(sym) if sym else None
+        if b is None:
+            return
+        self.stats["msgs"] += 1
+        if msg.get("type") == "snapshot":
+            b.snapshot(data.get("bids"), data.get("asks"), msg.get("sequence"))
+            self.stats["snapshots"] += 1
+            return
+        if b.delta(data.get("bids"), data.get("asks"), msg.get("sequence")):
+            self.stats["deltas"] += 1
+            if not b.synced:
+                self._resync = True
+        else:
+            self.stats["stale_deltas"] += 1
+
+    async def _session(self):
+        async with websockets.connect(self.url(), ping_interval=None, max_size=2 ** 22) as ws:
+            self._pending = list(self._by_id)
+            last_ping = time.monotonic()
+            rid = 0
+            while not self._stop.is_set() and not self._resync:
+                while self._pending:
+                    rid += 1
+                    await ws.send(json.dumps({"id": rid, "method": "orderbook_p.subscribe",
+                                              "params": [self._pending.pop(0)]}))
+                if time.monotonic() - last_ping >= _PING_S:
+                    rid += 1
+                    await ws.send(json.dumps({"id": rid, "method": "server.ping", "params": []}))
+                    last_ping = time.monotonic()
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=_RECV_TIMEOUT_S)
+                except asyncio.TimeoutError:
+                    continue
+                self.on_message(json.loads(raw))
+            if self._resync:
+                self.stats["resyncs"] += 1
+                self._log("orderbook_resync", books=[s for s, b in self.books.items() if not b.synced])
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            self._resync = False
+            t0 = time.monotonic()
+            try:
+                asyncio.run(self._session())
+            except Exception as e:
+                self.last_error = str(e)[:200]
+                self._log("orderbook_ws_error", error=self.last_error)
+            for b in self.books.values():
+                b.synced = False
+            if self._stop.is_set():
+                break
+            self.stats["reconnects"] += 1
+            backoff = 1.0 if time.monotonic() - t0 > 60 else min(_BACKOFF_MAX_S, backoff * 2)
+            if self._resync:
+                continue
+            if self._stop.wait(backoff):
+                break
+
+    def start(self, symbols: Iterable[str] = ()):
+        self.track(symbols)
+        if self._thread or not self.cfg().orderbook_enabled:
+            return
+        if websockets is None:
+            self._log("orderbook_disabled", reason="websockets not installed")
+            return
+        self._thread = threading.Thread(target=self._run, name="orderbook-ws", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def info(self) -> Dict[str, Any]:
+        now = time.time()
+        books = {}
+        for s, b in self.books.items():
+            bid, ask = b.best() if b.synced else (None, None)
+            books[s] = {"synced": b.synced, "seq": b.seq, "age_s": round(now - b.ts, 3) if b.ts else None,
+                        "bid": bid, "ask": ask, "bid_levels": len(b.bids), "ask_levels": len(b.asks)}
+        return {"enabled": self._thread is not None, "url": self.url(), "books": books,
+                "stats": dict(self.stats), "last_error": self.last_error}
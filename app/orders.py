@@ -1,17 +1,35 @@
 # app/orders.py
 import time
-from typing import Optional, Dict, Any
-from fastapi import HTTPException
-from .market import fetch_positions, current_position_side_qty
+import ccxt
+from typing import Optional, Dict, Any, List, Tuple
+from .market import market_info, round_step
 
-def set_leverage_if_needed(ex, sym: str, leverage: int | None, cfg=None):
+_LEV_UNCHANGED = ("not modified", "unchanged", "no change", "same leverage", "leverage not changed")
+
+def _leverage_unchanged(e: Exception) -> bool:
+    """동일 레버리지 재설정 거절 (거래소별 문구)."""
+    msg = str(e).lower()
+    return any(k in msg for k in _LEV_UNCHANGED)
+
+def set_leverage_if_needed(ex, sym: str, leverage: int | None, cfg=None, snaps=None):
     lev = int(leverage or (getattr(cfg, "lev_default", 5)))
+    # 마지막으로 설정/관측한 레버리지와 같으면 호출 생략 (snaps: SnapshotStore)
+    ttl = float(getattr(cfg, "leverage_cache_ttl_s", 0) or 0)
+    if snaps is not None and snaps.get("leverage", sym, ttl) == lev:
+        return
     params = {"marginMode": "cross"}
     # 참고: set_position_mode는 main에서 ensure_position_mode가 처리
     try:
         ex.set_leverage(lev, sym, params=params)
-    except Exception:
-        pass
+    except ccxt.NetworkError:
+        raise
+    except Exception as e:
+        # 거래소 측 거절은 무시하되, 캐시는 "이미 그 레버리지"일 때만
+        # (리스크 한도 초과/미체결 주문 충돌로 거절됐는데 캐시하면 TTL 동안 재시도를 안 함)
+        if not _leverage_unchanged(e):
+            return
+    if snaps is not None:
+        snaps.put("leverage", sym, lev)
 
 def _infer_pos_side_for_phemex(side: str, reduce_only: bool) -> Optional[str]:
     """
@@ -31,18 +49,22 @@ def create_market_order(
     amount: float,
     reduce_only: bool = False,
     limit_px: float | None = None,
-    cfg=None                   # ← 여기 추가
+    cfg=None,                  # ← 여기 추가
+    client_id: str | None = None,
 ):
     """
     Phemex hedge 모드면 posSide를 자동으로 부여.
+    client_id: clientOrderId(Phemex clOrdID) — 재시도 시 중복 접수 확인용
     """
     params = {"reduceOnly": bool(reduce_only)}
+    if client_id:
+        params["clientOrderId"] = client_id
 
     # hedge 모드면 posSide 필수 (Phemex)
     hedged = bool(getattr(cfg, "phemex_hedged", False)) if cfg is not None else False
     if hedged:
-        # buy → Long, sell → Short
-        params["posSide"] = "Long" if side.lower() == "buy" else "Short"
+        # 진입: buy → Long, sell → Short / 청산(reduceOnly): sell → Long, buy → Short
+        params["posSide"] = _infer_pos_side_for_phemex(side, reduce_only)
 
     if limit_px is None:
         return ex.create_order(sym, "market", side, amount, None, params)
@@ -65,42 +87,162 @@ def poll_order_completion(ex, sym: str, order_id: str, retries: int, wait_s: flo
         time.sleep(delay)
     return last_order
 
-def reconcile_target(ex, sym: str, desired: Dict[str, Any]):
+_TERMINAL = ("closed", "canceled", "cancelled", "rejected", "expired")
+
+
+def track_fills(ex, sym: str, orders: List[Dict[str, Any]], deadline: float, poll_s: float) -> List[Optional[Dict[str, Any]]]:
+    """
+    여러 주문의 최종 상태를 함께 기다림 (체결/취소될 때까지, 최대 deadline). 접수 응답이 이미 최종이면 조회 없음.
+    반환: 입력 순서대로 마지막으로 본 주문 (조회 실패면 접수 응답).
     """
-    target 모드: marketPosition/size로 포지션을 맞춤.
-    hedged 여부는 create_market_order가 해결.
+    last: List[Optional[Dict[str, Any]]] = list(orders)
+    pending = [i for i, o in enumerate(orders)
+               if o and o.get("id") and str(o.get("status") or "").lower() not in _TERMINAL]
+    while pending and time.time() < deadline:
+        time.sleep(poll_s)
+        for i in list(pending):
+            try:
+                o = ex.fetch_order(orders[i]["id"], sym)
+            except ccxt.NetworkError:
+                continue
+            except Exception:
+                o = None
+            if o:
+                last[i] = o
+                if str(o.get("status") or "").lower() in _TERMINAL:
+                    pending.remove(i)
+    return last
+
+
+def _filled(order: Optional[Dict[str, Any]], amount: float) -> float:
+    f = (order or {}).get("filled")
+    return float(f) if f is not None else float(amount)
+
+
+def position_legs(ex, sym: str) -> Dict[str, float]:
+    """심볼 포지션 1회 조회 → {"long": q, "short": q} (헤지 모드면 둘 다 있을 수 있음)."""
+    out = {"long": 0.0, "short": 0.0}
+    for p in ex.fetch_positions([sym]) or []:
+        if p and p.get("symbol", sym) == sym and p.get("side") in out:
+            out[p["side"]] += float(p.get("contracts") or 0.0)
+    return out
+
+
+def plan_target(legs: Dict[str, float], want: float, hedged: bool, step: Optional[float],
+                min_qty: Optional[float]) -> List[Tuple[str, float, bool]]:
     """
-    pos = fetch_positions(ex, sym)
-    cur_side, cur_qty = current_position_side_qty(pos)
-
-    want_mp = desired["marketPosition"]  # 'long' | 'short' | 'flat'
-    want_sz = float(desired["size"])
-
-    if want_mp == "flat":
-        if cur_qty and cur_qty > 0:
-            side = "sell" if cur_side == "long" else "buy"
-            create_market_order(ex, sym, side, cur_qty, reduce_only=True)
-        pos2 = fetch_positions(ex, sym)
-        s2, q2 = current_position_side_qty(pos2)
-        return {"current": {"side": s2, "qty": q2}, "target": {"side": "flat", "qty": 0}}
-
-    target_side = "long" if want_mp == "long" else "short"
-    if cur_side == target_side:
-        diff = want_sz - cur_qty
-        if abs(diff) > 0:
-            side = "buy" if target_side == "long" else "sell"
-            create_market_order(ex, sym, side, abs(diff), reduce_only=False)
+    스냅샷 1개 → 목표(want: +롱/-숏/0)까지의 주문 (side, amount, reduce_only), 청산이 먼저.
+    수량은 스텝으로 내림, 최소 수량 미만 잔차는 주문하지 않음 (= 수렴으로 봄).
+    """
+    def ok(q: float) -> float:
+        q = round_step(q, step)
+        return q if q > 0 and not (min_qty and q < min_qty) else 0.0
+
+    plan: List[Tuple[str, float, bool]] = []
+    if hedged:
+        tl, ts = max(want, 0.0), max(-want, 0.0)
+        for side, cur, tgt in (("long", legs["long"], tl), ("short", legs["short"], ts)):
+            if cur > tgt and ok(cur - tgt):
+                plan.append(("sell" if side == "long" else "buy", ok(cur - tgt), True))
+        for side, cur, tgt in (("long", legs["long"], tl), ("short", legs["short"], ts)):
+            if tgt > cur and ok(tgt - cur):
+                plan.append(("buy" if side == "long" else "sell", ok(tgt - cur), False))
+        return plan
+    cur = legs["long"] - legs["short"]
+    if cur and (want == 0 or (want > 0) != (cur > 0)):
+        # 청산(reduce-only) + 반대 방향 진입 — 파이프라인으로 연달아 제출
+        plan.append(("sell" if cur > 0 else "buy", abs(cur), True))
+        if ok(abs(want)):
+            plan.append(("buy" if want > 0 else "sell", ok(abs(want)), False))
+        return plan
+    d = want - cur
+    q = ok(abs(d))
+    if q:
+        grow = abs(want) > abs(cur)
+        plan.append(("buy" if d > 0 else "sell", q, not grow))
+    return plan
+
+
+def _signed(legs: Dict[str, float]) -> Dict[str, float]:
+    return {"long": round(legs["long"], 12), "short": round(legs["short"], 12)}
+
+
+def reconcile_target(ex, sym: str, desired: Dict[str, Any], cfg, outbox=None, tv_id: str = ""):
+    """
+    target 모드: marketPosition/size로 포지션을 맞춤 (체결 확인 + 수렴 검증).
+    - 반복마다 포지션 스냅샷 1회 → 스텝/최소수량 반올림한 차이로 주문 계획 (plan_target)
+    - 뒤집기는 청산 → 진입을 접수만 확인하며 연달아 제출, 두 주문의 체결을 함께 기다림 (track_fills)
+    - 체결 후 포지션이 체결 반영값과 같아질 때까지 재조회 (거래소 포지션 반영 지연에 과주문 방지)
+    - 목표에 도달하거나 RECONCILE_DEADLINE_S/RECONCILE_MAX_ITER 에 걸릴 때까지 반복, 반복마다 기록
+    outbox가 있으면 주문은 아웃박스 경유 (clientOrderId = 신호 id + 반복/순번 → 재전송 시 중복 없음, 펜싱/중지 확인).
+    제출 실패 예외에는 outbox_rec가 붙음 (NetworkError면 기록은 스윕 대기).
+    """
+    t0 = time.time()
+    deadline = t0 + cfg.reconcile_deadline_s
+    hedged = bool(cfg.phemex_hedged)
+    mi = market_info(ex, sym, cfg.symbol_fallback)
+    mp = desired["marketPosition"]      # 'long' | 'short' | 'flat'
+    size = round_step(float(desired["size"] or 0.0), mi["amount_step"]) if mp != "flat" else 0.0
+    want = size if mp == "long" else (-size if mp == "short" else 0.0)
+
+    iterations: List[Dict[str, Any]] = []
+    legs = position_legs(ex, sym)
+    converged = False
+    for i in range(max(1, cfg.reconcile_max_iter)):
+        plan = plan_target(legs, want, hedged, mi["amount_step"], mi["min_qty"])
+        if not plan:
+            converged = True
+            break
+        it: Dict[str, Any] = {"i": i, "before": _signed(legs), "orders": [], "t_ms": round((time.time() - t0) * 1000, 1)}
+        iterations.append(it)
+        acks = []
+        for j, (side, amount, ro) in enumerate(plan):
+            if outbox is not None and tv_id:
+                rec = outbox.persist(tv_id, sym, side, amount, reduce_only=ro, leg=f"t{i}.{j}", mode="target")
+                try:
+                    o = outbox.submit(rec)
+                except Exception as e:
+                    e.outbox_rec = rec      # 호출자: 202(스윕이 이어서 제출)/멱등 키 유지 여부 판단
+                    raise
+            else:
+                o = create_market_order(ex, sym, side, amount, reduce_only=ro, cfg=cfg)
+            acks.append(o or {})
+        finals = track_fills(ex, sym, acks, deadline, cfg.reconcile_poll_s)
+        expect = dict(legs)
+        for (side, amount, ro), ack, fin in zip(plan, acks, finals):
+            f = _filled(fin, amount)
+            it["orders"].append({"side": side, "amount": amount, "reduce_only": ro, "id": ack.get("id"),
+                                 "status": (fin or {}).get("status"), "filled": f, "average": (fin or {}).get("average")})
+            if hedged:
+                leg = ("short" if side == "buy" else "long") if ro else ("long" if side == "buy" else "short")
+                expect[leg] = max(0.0, expect[leg] + (-f if ro else f))
+            else:
+                net = expect["long"] - expect["short"] + (f if side == "buy" else -f)
+                expect = {"long": max(net, 0.0), "short": max(-net, 0.0)}
+        it["expected"] = _signed(expect)
+        # 체결 반영값과 같아질 때까지 재조회 (반영 지연으로 다음 반복이 중복 주문하지 않게)
+        tol = (mi["amount_step"] or 1e-9) / 2
+        while True:
+            try:
+                legs = position_legs(ex, sym)
+            except ccxt.NetworkError:
+                if time.time() >= deadline:
+                    raise
+            if all(abs(legs[k] - expect[k]) <= tol for k in legs) or time.time() >= deadline:
+                break
+            time.sleep(cfg.reconcile_poll_s)
+        it["after"] = _signed(legs)
+        it["lagged"] = any(abs(legs[k] - expect[k]) > tol for k in legs)
+        if time.time() >= deadline:
+            converged = not plan_target(legs, want, hedged, mi["amount_step"], mi["min_qty"])
+            break
     else:
-        if cur_qty and cur_qty > 0:
-            side_close = "sell" if cur_side == "long" else "buy"
-            create_market_order(ex, sym, side_close, cur_qty, reduce_only=True)
-        side_open = "buy" if target_side == "long" else "sell"
-        if want_sz > 0:
-            create_market_order(ex, sym, side_open, want_sz, reduce_only=False)
-
-    pos3 = fetch_positions(ex, sym)
-    s3, q3 = current_position_side_qty(pos3)
-    return {"current": {"side": s3, "qty": q3}, "target": {"side": target_side, "qty": want_sz}}
+        converged = not plan_target(legs, want, hedged, mi["amount_step"], mi["min_qty"])
+
+    cur_side = "long" if legs["long"] > legs["short"] else ("short" if legs["short"] > legs["long"] else "flat")
+    return {"current": {"side": cur_side, "qty": abs(legs["long"] - legs["short"]), "legs": _signed(legs)},
+            "target": {"side": mp if mp != "flat" else "flat", "qty": size}, "converged": converged,
+            "iterations": iterations, "elapsed_ms": round((time.time() - t0) * 1000, 1)}
 
 
 # app/orders.py (발췌/추가)
@@ -0,0 +1,243 @@
+# app/outbox.py
+import time, json, hashlib, threading
+from typing import Any, Callable, Dict, List, Optional
+
+import ccxt
+
+from .killswitch import Halted, is_halted
+from .leader import NotLeader
+from .logging_utils import log as logf
+from .orders import create_market_order
+
+PENDING_KEY = "outbox:pending"        # zset: cid → 다음 시도 시각(초)
+_REC_TTL_S = 7 * 24 * 3600
+_LOCK_MS = 30000
+
+PENDING, ACKED, FAILED = "pending", "acked", "failed"
+
+
+class OutboxExpired(Exception):
+    pass
+
+
+def client_order_id(tv_id: str, leg: str = "0") -> str:
+    """신호 id(+레그)로 결정되는 clientOrderId → 재시도/재기동 후에도 같은 주문을 식별 (Phemex clOrdID ≤ 40자)."""
+    return "tv" + hashlib.sha1(f"{tv_id}:{leg}".encode()).hexdigest()[:30]
+
+
+def _decode(h: Dict) -> Dict[str, str]:
+    return {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v) for k, v in h.items()}
+
+
+class Outbox:
+    """
+    게이트/사이징이 끝난 주문을 Redis에 먼저 기록(clientOrderId 포함)한 뒤 제출한다.
+    - 일시 오류(ccxt.NetworkError: 5xx/타임아웃/429/서킷)는 지수 백오프로 재시도
+    - 재시도 전에는 clientOrderId로 조회해 이미 접수됐는지 확인 → 중복 제출 없음
+    - 요청 안에서 OUTBOX_INLINE_ATTEMPTS 회 실패하면 202로 응답하고 스윕 스레드가 이어받음
+    - 거래소 거절(ExchangeError: 잔고 부족/잘못된 주문 등)은 재시도하지 않고 failed
+    - 신호가 OUTBOX_MAX_AGE_S 보다 오래되면 더 이상 제출하지 않음 (오래된 진입 방지)
+    - leader(LeaderLease)가 있으면 매 제출 직전 펜싱 토큰 확인, 대기 인스턴스는 스윕하지 않음
+    - 스윕이 이어서 접수시킨 주문은 on_recovered(rec, order)로 넘김 (가상 포지션 배분)
+    """
+    def __init__(self, r, ex, cfg_getter: Callable[[], Any], logger=None, leader=None):
+        self.r = r
+        self.ex = ex
+        self.cfg = cfg_getter
+        self.logger = logger
+        self.leader = leader
+        self.on_recovered: Optional[Callable[[Dict[str, str], Dict[str, Any]], None]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def key(cid: str) -> str:
+        return f"outbox:{cid}"
+
+    def _log(self, event: str, **kw):
+        if self.logger is not None:
+            logf(self.logger, self.cfg().log_json, event, **kw)
+
+    # --- records ---
+    def persist(self, tv_id: str, sym: str, side: str, amount: float, reduce_only: bool = False,
+                limit_px: Optional[float] = None, leg: str = "0", **meta) -> Dict[str, str]:
+        """기록 생성 (이미 있으면 기존 기록 반환 → 같은 신호가 두 번 들어와도 주문은 하나)."""
+        cid = client_order_id(tv_id, leg)
+        k = self.key(cid)
+        rec = {
+            "cid": cid, "tv_id": tv_id, "leg": leg, "symbol": sym, "side": side, "amount": repr(float(amount)),
+            "reduce_only": "1" if reduce_only else "0", "limit_px": repr(float(limit_px)) if limit_px else "",
+            "state": PENDING, "attempts": "0", "created_ts": repr(time.time()), "order_id": "", "last_error": "",
+            "meta": json.dumps(meta, default=str),
+        }
+        if not self.r.hsetnx(k, "cid", cid):
+            return self.load(cid) or rec
+        pipe = self.r.pipeline()
+        pipe.hset(k, mapping=rec)
+        pipe.expire(k, _REC_TTL_S)
+        # 요청 경로가 곧바로 제출하므로 스윕은 락 만료 이후에만 집어간다 (워커 중단 대비)
+        pipe.zadd(PENDING_KEY, {cid: time.time() + _LOCK_MS / 1000.0})
+        pipe.execute()
+        return rec
+
+    def load(self, cid: str) -> Optional[Dict[str, str]]:
+        h = self.r.hgetall(self.key(cid))
+        return _decode(h) if h else None
+
+    def _update(self, cid: str, **fields):
+        self.r.hset(self.key(cid), mapping={k: str(v) for k, v in fields.items()})
+
+    def _finish(self, rec: Dict[str, str], state: str, **fields):
+        self._update(rec["cid"], state=state, **fields)
+        self.r.zrem(PENDING_KEY, rec["cid"])
+        rec.update({"state": state, **{k: str(v) for k, v in fields.items()}})
+
+    def drop_entries(self, reason: str) -> List[str]:
+        """pending 진입(reduce-only 아님) 기록을 failed 처리 — 킬 스위치 후 스윕이 진입을 다시 내지 않게."""
+        out = []
+        for rec in self.pending():
+            if rec.get("state") == PENDING and rec.get("reduce_only") != "1":
+                self._finish(rec, FAILED, last_error=reason)
+                out.append(rec["cid"])
+        return out
+
+    def forget(self, cid: str):
+        self.r.delete(self.key(cid))
+        self.r.zrem(PENDING_KEY, cid)
+
+    def _lock(self, cid: str) -> bool:
+        return bool(self.r.set(f"outbox:lock:{cid}", "1", nx=True, px=_LOCK_MS))
+
+    def _unlock(self, cid: str):
+        self.r.delete(f"outbox:lock:{cid}")
+
+    # --- exchange ---
+    def lookup(self, sym: str, cid: str) -> Optional[Dict[str, Any]]:
+        """clientOrderId로 접수 여부 확인. 없으면 None, 조회 자체의 일시 오류는 예외."""
+        try:
+            return self.ex.fetch_order(None, sym, {"clientOrderId": cid})
+        except ccxt.NetworkError:
+            raise
+        except Exception:
+            return None
+
+    def _attempt(self, rec: Dict[str, str]) -> Dict[str, Any]:
+        cid, sym = rec["cid"], rec["symbol"]
+        n = int(rec.get("attempts") or 0)
+        if n > 0:
+            found = self.lookup(sym, cid)
+            if found:
+                return found
+        self._update(cid, attempts=n + 1)
+        rec["attempts"] = str(n + 1)
+        return create_market_order(
+            self.ex, sym, rec["side"], float(rec["amount"]), reduce_only=rec["reduce_only"] == "1",
+            limit_px=float(rec["limit_px"]) if rec.get("limit_px") else None, cfg=self.cfg(), client_id=cid)
+
+    def _expired(self, rec: Dict[str, str], cfg) -> bool:
+        return cfg.outbox_max_age_s > 0 and time.time() - float(rec["created_ts"]) > cfg.outbox_max_age_s
+
+    def submit(self, rec: Dict[str, str], attempts: Optional[int] = None) -> Dict[str, Any]:
+        """
+        최대 attempts 회 (기본 OUTBOX_INLINE_ATTEMPTS) 제출 시도. 성공 시 acked + 주문 반환.
+        재시도 가능한 오류로 끝나면 pending 으로 남기고 마지막 예외를 다시 던진다.
+        """
+        cfg = self.cfg()
+        cid = rec["cid"]
+        if rec.get("state") == ACKED and rec.get("order_id"):
+            return {"id": rec["order_id"], "clientOrderId": cid, "status": "acked"}
+        if rec.get("reduce_only") != "1":
+            halt = is_halted(self.r)
+            if halt is not None:
+                # 게이트 통과 후 중지된 요청/스윕 → 진입 주문 내지 않음 (청산은 허용)
+                self._finish(rec, FAILED, last_error="halted")
+                raise Halted(halt.get("reason") or "")
+        if not self._lock(cid):
+            raise ccxt.NetworkError(f"outbox {cid} busy (another worker is submitting)")
+        try:
+            tries = max(1, attempts if attempts is not None else cfg.outbox_inline_attempts)
+            last_exc: Optional[Exception] = None
+            for i in range(tries):
+                if self._expired(rec, cfg):
+                    self._finish(rec, FAILED, last_error="expired")
+                    raise OutboxExpired(f"outbox {cid} expired before submission")
+                if self.leader is not None and not self.leader.fence(self.key(cid)):
+                    # 리더가 바뀜 → pending 그대로 두고 새 리더의 스윕이 같은 clientOrderId로 이어감
+                    raise NotLeader("fenced: leadership lost before submission")
+                try:
+                    order = self._attempt(rec)
+                except ccxt.NetworkError as e:
+                    last_exc = e
+                    self._update(cid, last_error=str(e)[:300])
+                    if int(rec["attempts"]) >= cfg.outbox_max_attempts:
+                        self._finish(rec, FAILED, last_error=str(e)[:300])
+                        raise
+                    delay = min(cfg.outbox_backoff_max_s, cfg.outbox_backoff_s * (2 ** (int(rec["attempts"]) - 1)))
+                    self.r.zadd(PENDING_KEY, {cid: time.time() + delay})
+                    if i + 1 < tries:
+                        time.sleep(delay)
+                    continue
+                except Exception as e:
+                    self._finish(rec, FAILED, last_error=str(e)[:300])
+                    raise
+                self._finish(rec, ACKED, order_id=order.get("id") or "", acked_ts=time.time())
+                return order
+            raise last_exc
+        finally:
+            self._unlock(cid)
+
+    # --- recovery ---
+    def pending(self) -> List[Dict[str, str]]:
+        out = []
+        for cid in self.r.zrange(PENDING_KEY, 0, -1):
+            rec = self.load(cid.decode() if isinstance(cid, bytes) else cid)
+            if rec:
+                out.append(rec)
+        return out
+
+    def sweep(self) -> List[Dict[str, str]]:
+        """만기된 pending 기록마다 1회 시도. 기동 시 + OUTBOX_SWEEP_S 주기."""
+        done = []
+        if self.leader is not None and not self.leader.is_leader():
+            return done
+        for cid in self.r.zrangebyscore(PENDING_KEY, 0, time.time()):
+            cid = cid.decode() if isinstance(cid, bytes) else cid
+            rec = self.load(cid)
+            if rec is None or rec.get("state") != PENDING:
+                self.r.zrem(PENDING_KEY, cid)
+                continue
+            if self.r.exists(f"outbox:lock:{cid}"):
+                continue
+            try:
+                order = self.submit(rec, attempts=1)
+            except Exception as e:
+                self._log("outbox_retry_failed", cid=cid, tv_id=rec.get("tv_id"), attempts=rec.get("attempts"),
+                          state=rec.get("state"), error=str(e)[:200])
+                done.append(rec)
+                continue
+            self._log("outbox_recovered", cid=cid, tv_id=rec.get("tv_id"), order_id=order.get("id"))
+            if self.on_recovered is not None:
+                try:
+                    self.on_recovered(rec, order)
+                except Exception as e:
+                    self._log("outbox_recover_hook_error", cid=cid, error=str(e)[:200])
+            done.append(rec)
+        return done
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                self._log("outbox_sweep_error", error=str(e)[:200])
+            if self._stop.wait(max(1.0, float(self.cfg().outbox_sweep_s or 15))):
+                break
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="outbox-sweep", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
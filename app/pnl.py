@@ -1,12 +1,6 @@
-from typing import Optional
 from .redis_utils import update_daily_pnl, get_loss_streak, set_loss_streak, start_cooldown
 from .config import Config
 
-def realized_pnl_simple(side: str, entry_px: float, exit_px: float, amount: float, taker_fee: float) -> float:
-    pnl = (exit_px - entry_px) * amount if side == "buy" else (entry_px - exit_px) * amount
-    pnl -= (entry_px*amount + exit_px*amount) * taker_fee
-    return pnl
-
 def after_exit_update(r, cfg: Config, strategy_name: str, pnl: float):
     cur, peak, dd = update_daily_pnl(r, pnl)
     if pnl < 0:
@@ -0,0 +1,120 @@
+# app/prewarm.py
+import time, threading
+from typing import Any, Dict, List, Optional
+
+from .balance import fetch_equity_generic
+from .logging_utils import log as logf
+from .regime_engine import timeframe_seconds
+from .snapshots import SnapshotStore
+
+
+def prewarm_symbols(cfg) -> List[str]:
+    syms = [s.strip() for s in (cfg.prewarm_symbols or "").split(",") if s.strip()]
+    return syms or [cfg.symbol_fallback]
+
+
+def next_prewarm_at(now: float, timeframes: List[str], lead_s: float) -> float:
+    """가장 가까운 (봉 마감 - lead_s) 시각. 봉 경계는 UTC epoch 기준 (TradingView와 동일)."""
+    best = None
+    for tf in timeframes:
+        step = timeframe_seconds(tf)
+        t = (now // step + 1) * step - lead_s
+        if t <= now:
+            t += step
+        best = t if best is None else min(best, t)
+    return best if best is not None else now + 60.0
+
+
+class PrewarmScheduler:
+    """
+    봉 마감 PREWARM_LEAD_S 초 전에 깨어나 거래 심볼의 가격/포지션/잔고/펀딩/레버리지와
+    레짐 스냅샷, 사이징 테이블을 갱신한다. 같은 호출들이 거래소 HTTPS keep-alive 커넥션도 살려둔다.
+    → 마감 직후 몰리는 알림은 캐시 적중 + 기존 커넥션 재사용 (TLS 핸드셰이크 없음)
+    """
+    def __init__(self, app, snaps: SnapshotStore):
+        self.app = app
+        self.snaps = snaps
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.next_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Dict[str, Any]:
+        st = self.app.state
+        cfg = st.cfg
+        ex = st.ex
+        t0 = time.perf_counter()
+        timings: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+
+        def step(name, fn):
+            t = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                errors[name] = str(e)[:200]
+            timings[name] = round((time.perf_counter() - t) * 1000, 2)
+
+        for sym in prewarm_symbols(cfg):
+            step(f"ticker:{sym}", lambda: self.snaps.put("ticker", sym, ex.fetch_ticker(sym)))
+            step(f"position:{sym}", lambda: self._position(ex, sym))
+            step(f"funding:{sym}", lambda: st.funding.refresh(sym))
+
+        def _equity():
+            v = fetch_equity_generic(ex, cfg)()
+            if v > 0:
+                self.snaps.put("equity", cfg.equity_code, v)
+                st.sizing_table.rebuild(cfg, v)
+        step("equity", _equity)
+
+        # 레짐: 마감 시점까지 TTL이 남지 않으면 미리 재계산 (레짐 거래소 커넥션도 함께 워밍)
+        def _regime():
+            reg = st.regime_engine.state
+            if reg is None or time.time() - reg["ts"] + cfg.prewarm_lead_s + 5 > cfg.regime_ttl_s \
+                    or reg.get("cfg_version") != cfg.config_version:
+                st.regime_engine.refresh(cfg)
+        step("regime", _regime)
+
+        self.last_run = {"ts": time.time(), "total_ms": round((time.perf_counter() - t0) * 1000, 2),
+                         "timings_ms": timings, "errors": errors}
+        return self.last_run
+
+    def _position(self, ex, sym: str):
+        poss = ex.fetch_positions([sym])
+        pos = poss[0] if poss else {}
+        self.snaps.put("position", sym, pos)
+        lev = pos.get("leverage") if isinstance(pos, dict) else None
+        if lev:
+            # 거래소에 실제 설정된 값으로 레버리지 캐시를 맞춤 (수동 변경도 반영)
+            self.snaps.put("leverage", sym, int(float(lev)))
+
+    def _timeframes(self, cfg) -> List[str]:
+        return [t.strip() for t in (cfg.prewarm_timeframes or "").split(",") if t.strip()]
+
+    def _run(self):
+        while not self._stop.is_set():
+            cfg = self.app.state.cfg
+            tfs = self._timeframes(cfg)
+            if not cfg.prewarm_enabled or not tfs:
+                self.next_at = None
+                if self._stop.wait(30.0):
+                    break
+                continue
+            self.next_at = next_prewarm_at(time.time(), tfs, cfg.prewarm_lead_s)
+            if self._stop.wait(max(0.0, self.next_at - time.time())):
+                break
+            res = self.run_once()
+            logf(self.app.state.logger, cfg.log_json, "prewarm_done",
+                 total_ms=res["total_ms"], errors=res["errors"] or None)
+
+    def info(self) -> Dict[str, Any]:
+        return {"next_at": self.next_at, "last_run": self.last_run}
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,270 @@
+# app/profiling.py
+"""
+운영 중 느린 웹훅 분석용 프로파일러.
+
+- 요청 프로파일: /admin/profile/arm 으로 다음 N개(또는 id 정규식에 맞는) 웹훅을 cProfile/샘플링으로 기록.
+  무장 상태는 Redis(prof:arm)에 있어 모든 워커가 같은 N을 나눠 씀. 꺼져 있으면 요청당 시각 비교 1회.
+- 상시 샘플링: PROFILE_SAMPLE_HZ > 0 이면 모든 스레드 스택을 저빈도로 수집 → collapsed stack
+  ("a;b;c count", flamegraph.pl / speedscope / inferno 입력 형식).
+결과: .prof(pstats, snakeviz로 열람) / .folded 파일은 PROFILE_DIR, 요약은 Redis prof:runs.
+"""
+import io, os, re, sys, json, time, pstats, cProfile, threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from .logging_utils import log as logf
+
+ARM_KEY = "prof:arm"
+RUNS_KEY = "prof:runs"
+_CHECK_S = 1.0            # 무장 상태 Redis 확인 주기 (그 사이에는 로컬 캐시)
+_REQ_SAMPLE_HZ = 1000.0   # 요청 단위 샘플링 주기
+
+
+def _frame_name(f) -> str:
+    co = f.f_code
+    return f"{os.path.basename(co.co_filename)}:{co.co_name}"
+
+
+def collapse(frame, limit: int = 128) -> str:
+    """프레임 → 루트부터 잎까지 ';'로 이은 스택 문자열."""
+    names: List[str] = []
+    while frame is not None and len(names) < limit:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def folded(counts: Dict[str, int]) -> str:
+    return "".join(f"{k} {v}\n" for k, v in sorted(counts.items(), key=lambda kv: -kv[1]))
+
+
+class _ThreadSampler:
+    """요청을 처리 중인 스레드 하나의 스택을 hz로 샘플링."""
+    def __init__(self, tid: int, hz: float):
+        self.tid = tid
+        self.interval = 1.0 / hz
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="prof-req-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            f = sys._current_frames().get(self.tid)
+            if f is not None:
+                self.counts[collapse(f)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(1.0)
+
+
+class RequestProfiler:
+    """
+    arm(count, pattern, mode) 후 claim()에 걸린 요청만 wrap()한 함수 안에서 프로파일.
+    mode: cprofile (함수별 호출/누적 시간, 결정적이라 느려짐) | sample (1kHz 스택 샘플링, 오버헤드 작음)
+    """
+    def __init__(self, r, cfg_getter, logger=None):
+        self.r = r
+        self.cfg = cfg_getter
+        self.logger = logger
+        self._state: Optional[Dict[str, str]] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _log(self, event: str, **kw):
+        if self.logger is not None:
+            logf(self.logger, self.cfg().log_json, event, **kw)
+
+    # --- 무장 ---
+    def arm(self, count: int, pattern: str = "", mode: str = "cprofile", ttl_s: float = 3600.0) -> Dict[str, Any]:
+        if mode not in ("cprofile", "sample"):
+            raise ValueError("mode must be cprofile|sample")
+        if pattern:
+            re.compile(pattern)
+        pipe = self.r.pipeline()
+        pipe.delete(ARM_KEY)
+        pipe.hset(ARM_KEY, mapping={"left": int(count), "pattern": pattern, "mode": mode, "ts": repr(time.time())})
+        pipe.expire(ARM_KEY, max(1, int(ttl_s)))
+        pipe.execute()
+        self._checked = 0.0
+        return self.armed() or {}
+
+    def disarm(self) -> bool:
+        self._checked = 0.0
+        return bool(self.r.delete(ARM_KEY))
+
+    def armed(self) -> Optional[Dict[str, str]]:
+        h = self.r.hgetall(ARM_KEY)
+        return {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                for k, v in h.items()} or None
+
+    def claim(self, rid: Optional[str]) -> Optional[str]:
+        """이 요청을 프로파일할지 → mode 또는 None. 꺼져 있으면 (캐시된) 로컬 판단만."""
+        now = time.monotonic()
+        if now - self._checked >= _CHECK_S:
+            with self._lock:
+                if now - self._checked >= _CHECK_S:
+                    try:
+                        self._state = self.armed()
+                    except Exception:
+                        self._state = None
+                    self._checked = now
+        st = self._state
+        if st is None:
+            return None
+        if st.get("pattern") and not re.search(st["pattern"], str(rid or "")):
+            return None
+        if self.r.hincrby(ARM_KEY, "left", -1) < 0:
+            self.disarm()
+            return None
+        return st.get("mode") or "cprofile"
+
+    # --- 실행/저장 ---
+    def wrap(self, fn: Callable, rid: Optional[str], label: str = "tv-webhook") -> Callable:
+        """프로파일 대상이면 fn을 감싼 함수, 아니면 fn 그대로."""
+        mode = self.claim(rid)
+        if mode is None:
+            return fn
+
+        def run(*a, **kw):
+            t0 = time.perf_counter()
+            err = None
+            if mode == "sample":
+                with _ThreadSampler(threading.get_ident(), _REQ_SAMPLE_HZ) as smp:
+                    try:
+                        return fn(*a, **kw)
+                    except BaseException as e:
+                        err = e
+                        raise
+                    finally:
+                        self._save(rid, label, mode, time.perf_counter() - t0, err, counts=smp.counts)
+            prof = cProfile.Profile()
+            try:
+                return prof.runcall(fn, *a, **kw)
+            except BaseException as e:
+                err = e
+                raise
+            finally:
+                self._save(rid, label, mode, time.perf_counter() - t0, err, prof=prof)
+        return run
+
+    def _save(self, rid, label: str, mode: str, wall_s: float, err, prof=None, counts=None):
+        cfg = self.cfg()
+        try:
+            os.makedirs(cfg.profile_dir, exist_ok=True)
+            name = f"{int(time.time() * 1000)}_{re.sub(r'[^A-Za-z0-9_.-]', '_', str(rid or 'na'))[:60]}"
+            rec: Dict[str, Any] = {"name": name, "id": rid, "label": label, "mode": mode, "ts": time.time(),
+                                   "wall_ms": round(wall_s * 1000, 2), "error": str(err)[:200] if err else None}
+            if prof is not None:
+                path = os.path.join(cfg.profile_dir, name + ".prof")
+                prof.dump_stats(path)
+                buf = io.StringIO()
+                pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(cfg.profile_top)
+                rec["top"] = buf.getvalue()[-8000:]
+            else:
+                path = os.path.join(cfg.profile_dir, name + ".folded")
+                with open(path, "w") as f:
+                    f.write(folded(counts))
+                rec["samples"] = sum(counts.values())
+            rec["path"] = path
+            pipe = self.r.pipeline()
+            pipe.lpush(RUNS_KEY, json.dumps(rec))
+            pipe.ltrim(RUNS_KEY, 0, max(1, cfg.profile_keep) - 1)
+            pipe.execute()
+            self._prune(cfg)
+            self._log("profile_saved", id=rid, mode=mode, wall_ms=rec["wall_ms"], path=path)
+        except Exception as e:
+            self._log("profile_save_error", id=rid, error=str(e)[:200])
+
+    def _prune(self, cfg):
+        """PROFILE_KEEP 개만 디스크에 남김 (오래된 순 삭제)."""
+        files = sorted(f for f in os.listdir(cfg.profile_dir) if f.endswith((".prof", ".folded")))
+        for f in files[:-max(1, cfg.profile_keep)]:
+            try:
+                os.remove(os.path.join(cfg.profile_dir, f))
+            except OSError:
+                pass
+
+    def runs(self) -> List[Dict[str, Any]]:
+        out = []
+        for v in self.r.lrange(RUNS_KEY, 0, -1):
+            rec = json.loads(v)
+            rec.pop("top", None)
+            out.append(rec)
+        return out
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        for v in self.r.lrange(RUNS_KEY, 0, -1):
+            rec = json.loads(v)
+            if rec.get("name") == name:
+                return rec
+        return None
+
+    def info(self) -> Dict[str, Any]:
+        return {"armed": self.armed(), "runs": self.runs()}
+
+
+class StackSampler:
+    """
+    상시 저빈도 샘플링 (PROFILE_SAMPLE_HZ): 모든 스레드 스택을 collapsed 형식으로 누적.
+    서로 다른 스택이 PROFILE_SAMPLE_MAX_STACKS 를 넘으면 새 스택은 [other]로 합산 (메모리 상한).
+    """
+    def __init__(self, cfg_getter, logger=None):
+        self.cfg = cfg_getter
+        self.logger = logger
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.since = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        cap = self.cfg().profile_sample_max_stacks
+        with self._lock:
+            for tid, f in sys._current_frames().items():
+                if tid == me:
+                    continue
+                k = f"{names.get(tid, tid)};{collapse(f)}"
+                if k not in self.counts and len(self.counts) >= cap:
+                    k = "[other]"
+                self.counts[k] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        with self._lock:
+            return folded(self.counts)
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+            self.samples, self.since = 0, time.time()
+
+    def _run(self):
+        while True:
+            hz = self.cfg().profile_sample_hz
+            if self._stop.wait(1.0 / hz if hz > 0 else 5.0):
+                break
+            if hz > 0:
+                self.sample()
+
+    def start(self):
+        """0 Hz 여도 스레드는 띄움 (5초마다 설정만 확인) → 핫리로드로 켜고 끌 수 있음."""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"enabled": self._thread is not None and self.cfg().profile_sample_hz > 0, "hz": self.cfg().profile_sample_hz, "samples": self.samples,
+                    "stacks": len(self.counts), "since": self.since}
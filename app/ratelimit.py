@@ -0,0 +1,204 @@
+# app/ratelimit.py
+import time
+from typing import Any, Callable, Dict
+
+import ccxt
+
+from .breaker import CircuitBreaker
+from .transport import calling, classify
+
+ORDER, INFO = "order", "info"
+
+# 주문/계정 변경 계열 → ORDER 우선순위, 나머지 네트워크 호출 → INFO
+_ORDER_METHODS = frozenset((
+    "create_order", "cancel_order", "cancel_all_orders", "edit_order",
+    "set_leverage", "set_position_mode", "set_margin_mode",
+))
+_NETWORK_PREFIXES = ("fetch_", "create_", "cancel_", "edit_", "set_")
+_LOCAL_METHODS = frozenset(("set_sandbox_mode",))
+
+# 토큰 버킷 (Redis 서버 시계 기준 → 워커/호스트 간 시계 차이 무관)
+# KEYS[1]=bucket, KEYS[2]=metrics  ARGV: capacity, refill/s, cost, floor, class
+_BUCKET_LUA = """
+local cap = tonumber(ARGV[1]); local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3]); local floor = tonumber(ARGV[4])
+local t = redis.call('TIME'); local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local h = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(h[1]); local ts = tonumber(h[2])
+if tokens == nil then tokens = cap; ts = now end
+if now > ts then
+  local nt = tokens + (now - ts) / 1000 * rate
+  if nt > cap then
+    redis.call('HINCRBYFLOAT', KEYS[2], 'wasted', tostring(nt - cap))
+    nt = cap
+  end
+  tokens = nt; ts = now
+end
+local wait_ms = 0
+if tokens - cost >= floor then
+  tokens = tokens - cost
+  redis.call('HINCRBY', KEYS[2], 'granted:' .. ARGV[5], 1)
+  redis.call('HINCRBYFLOAT', KEYS[2], 'used', tostring(cost))
+else
+  wait_ms = math.ceil((floor + cost - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(ts))
+redis.call('PEXPIRE', KEYS[1], 3600000)
+return {wait_ms, tostring(tokens)}
+"""
+
+
+class BudgetExhausted(ccxt.RateLimitExceeded):
+    pass
+
+
+class CircuitOpen(ccxt.ExchangeNotAvailable):
+    pass
+
+
+class RateBudget:
+    """
+    거래소(계정)별 공유 토큰 버킷. 모든 워커가 같은 Redis 키를 쓰므로 합산 요청률이 제한된다.
+    - ORDER: 버킷을 0까지 사용 가능, INFO: RL_ORDER_RESERVE 토큰은 남겨둠 (주문 우선)
+    - 429/DDoSProtection 응답 시 버킷을 비워 전 워커가 함께 물러남
+    - 네트워크 계열 연속 실패 → 서킷 오픈: INFO 호출은 즉시 실패, ORDER는 계속 시도(프로브 겸용)
+    - Redis 장애 시에는 fail-open (로컬 ccxt enableRateLimit만 적용)
+    """
+    def __init__(self, r, name: str, cfg_getter: Callable[[], Any]):
+        self.r = r
+        self.name = name
+        self.key = f"rl:{name}"
+        self.metrics_key = f"rl:metrics:{name}"
+        self.cfg = cfg_getter
+        cfg = cfg_getter()
+        self.breaker = CircuitBreaker(cfg.rl_breaker_fails, cfg.rl_breaker_reset_s)
+        self._script = r.register_script(_BUCKET_LUA)
+
+    def _take(self, klass: str, cost: float) -> float:
+        cfg = self.cfg()
+        floor = 0 if klass == ORDER else cfg.rl_order_reserve
+        wait_ms, _ = self._script(keys=[self.key, self.metrics_key],
+                                  args=[cfg.rl_capacity, cfg.rl_refill_per_s, cost, floor, klass])
+        return int(wait_ms) / 1000.0
+
+    def acquire(self, klass: str, cost: float = 1.0) -> float:
+        """토큰 확보까지 대기. 대기한 초를 반환, 한도 초과 시 BudgetExhausted."""
+        cfg = self.cfg()
+        if not cfg.rl_enabled:
+            return 0.0
+        max_wait = cfg.rl_order_max_wait_s if klass == ORDER else cfg.rl_info_max_wait_s
+        t0 = time.monotonic()
+        slept = False
+        while True:
+            try:
+                wait = self._take(klass, cost)
+            except Exception:
+                self._incr("redis_errors")
+                return 0.0
+            waited = time.monotonic() - t0
+            if wait <= 0:
+                if slept:
+                    self._incr(f"wait_ms:{klass}", int(waited * 1000))
+                return waited
+            if waited + wait > max_wait:
+                self._incr(f"denied:{klass}")
+                raise BudgetExhausted(f"{self.name}: {klass} budget exhausted (retry in {wait:.2f}s)")
+            time.sleep(wait)
+            slept = True
+
+    def drain(self):
+        try:
+            self.r.hset(self.key, "tokens", "0")
+        except Exception:
+            pass
+
+    def _incr(self, field: str, n: int = 1):
+        try:
+            self.r.hincrby(self.metrics_key, field, n)
+        except Exception:
+            pass
+
+    def call(self, klass: str, method: str, fn: Callable, *args, **kwargs):
+        if klass == INFO and not self.breaker.allow():
+            self._incr("short_circuited")
+            raise CircuitOpen(f"{self.name}: circuit open ({method})")
+        # allow()가 half-open 시험 호출을 넘겨줬을 수 있음 → 어떤 결과로 끝나든 시험 호출 반납
+        try:
+            self.acquire(klass)
+            res = fn(*args, **kwargs)
+        except (ccxt.DDoSProtection, ccxt.RateLimitExceeded) as e:
+            if isinstance(e, BudgetExhausted):
+                # 로컬 예산 소진: 거래소 상태와 무관
+                self.breaker.release()
+                raise
+            self._incr("exchange_429")
+            self.drain()
+            self.breaker.record_failure()
+            raise
+        except ccxt.NetworkError:
+            self._incr(f"errors:{klass}")
+            self.breaker.record_failure()
+            raise
+        except ccxt.ExchangeError:
+            # 주문 없음/잘못된 심볼/잔고 부족 등: 거래소는 응답함 → 회로 기준으로는 성공
+            self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return res
+
+    def metrics(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"name": self.name, "breaker": self.breaker.info()}
+        try:
+            raw = self.r.hgetall(self.metrics_key) or {}
+            m = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in raw.items()}
+            tokens = self.r.hget(self.key, "tokens")
+            cfg = self.cfg()
+            out.update({
+                "capacity": cfg.rl_capacity, "refill_per_s": cfg.rl_refill_per_s, "order_reserve": cfg.rl_order_reserve,
+                "tokens": float(tokens) if tokens is not None else None,
+                "counters": m,
+            })
+        except Exception as e:
+            out["error"] = str(e)
+        return out
+
+
+class BudgetedExchange:
+    """
+    ccxt 인스턴스 프록시: 네트워크 메서드 호출마다 RateBudget을 통과시킨다.
+    속성/로컬 메서드(markets, market(), options ...)는 그대로 위임.
+    """
+    def __init__(self, ex, budget: RateBudget):
+        object.__setattr__(self, "_ex", ex)
+        object.__setattr__(self, "_budget", budget)
+
+    @property
+    def budget(self) -> RateBudget:
+        return self._budget
+
+    @property
+    def raw(self):
+        return self._ex
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._ex, name)
+        if not callable(attr) or name in _LOCAL_METHODS or not name.startswith(_NETWORK_PREFIXES):
+            return attr
+        klass = ORDER if name in _ORDER_METHODS else INFO
+        budget = self._budget
+        tk = classify(klass, name)   # 전송 계층 타임아웃 분류
+
+        def _call(*args, **kwargs):
+            with calling(tk):
+                return budget.call(klass, name, attr, *args, **kwargs)
+        return _call
+
+    def __setattr__(self, name: str, value):
+        setattr(self._ex, name, value)
+
+
+def budget_name(ex, testnet: bool) -> str:
+    return f"{getattr(ex, 'id', 'ex')}:{'test' if testnet else 'main'}"
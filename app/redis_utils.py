@@ -1,5 +1,5 @@
-import time, json, redis
-from typing import Tuple, Optional, Dict
+import time, redis
+from typing import Tuple, Optional
 
 def connect(url: str) -> redis.Redis:
     r = redis.Redis.from_url(url)
@@ -61,16 +61,3 @@ def daily_dd_blocked(r: redis.Redis, limit_usdt: float):
     dd = cur - peak
     return (dd <= -abs(limit_usdt), {"day_pnl":cur, "day_peak":peak, "day_dd":dd})
 
-# open entry snapshot (for simple realized pnl)
-def save_open_entry(r: redis.Redis, strategy: str, side: str, entry_px: float, amount: float):
-    rec = {"strategy": strategy, "side": side, "entry": float(entry_px), "amount": float(amount)}
-    r.set(f"pos:{strategy}", json.dumps(rec), ex=7*24*3600)
-
-def pop_open_entry(r: redis.Redis, strategy: str):
-    k = f"pos:{strategy}"
-    v = r.get(k)
-    if not v: return None
-    try: rec = json.loads(v)
-    except: rec = None
-    r.delete(k)
-    return rec
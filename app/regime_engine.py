@@ -0,0 +1,234 @@
+# app/regime_engine.py
+import time, threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .config import Config
+from .symbols import normalize_symbol_for_exchange, SymbolResolver
+from .regime import fetch_ohlcv
+from .ratelimit import budget_name
+
+_TF_UNIT_S = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def timeframe_seconds(tf: str) -> int:
+    return int(tf[:-1]) * _TF_UNIT_S[tf[-1]]
+
+
+# ---------- 벡터 지표 (행=심볼, 열=시간, 왼쪽 NaN 패딩 허용) ----------
+
+def ema_last(closes: np.ndarray, length: int) -> np.ndarray:
+    """
+    각 행의 마지막 EMA를 한 번의 행렬곱으로 계산.
+    첫 유효 값으로 시드하는 ema_from_closes와 동일한 결과 (길이 T 창 기준).
+    """
+    n, T = closes.shape
+    a = 2.0 / (length + 1)
+    w = a * (1.0 - a) ** np.arange(T - 1, -1, -1, dtype=np.float64)
+    w[0] = (1.0 - a) ** (T - 1)
+    out = closes @ w
+    out[np.isnan(closes).any(axis=1)] = np.nan
+    return out
+
+
+def atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    """Wilder ATR(RMA) 마지막 값. TR 첫 값으로 시드."""
+    prev = close[:, :-1]
+    h, l = high[:, 1:], low[:, 1:]
+    tr = np.maximum(h - l, np.maximum(np.abs(h - prev), np.abs(l - prev)))
+    T = tr.shape[1]
+    if T == 0:
+        return np.full(close.shape[0], np.nan)
+    a = 1.0 / length
+    w = a * (1.0 - a) ** np.arange(T - 1, -1, -1, dtype=np.float64)
+    w[0] = (1.0 - a) ** (T - 1)
+    return tr @ w
+
+
+def realized_vol(close: np.ndarray, window: int, periods_per_year: float) -> np.ndarray:
+    """최근 window 봉 로그수익률 표준편차(연율화)."""
+    lr = np.diff(np.log(close[:, -(window + 1):]), axis=1)
+    return lr.std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+
+
+class RegimeEngine:
+    """
+    유니버스 전체의 OHLCV를 (심볼 × 시간) 행렬로 받아 EMA/ATR/실현변동성을 한 번에 계산하고
+    심볼별/바스켓 레짐을 스냅샷으로 보관한다.
+    - regime_for(cfg, symbol): 스냅샷이 REGIME_TTL_S 이내면 네트워크 없이 응답
+    - REGIME_SCOPE: basket(기존 ETH&BTC 동작) | symbol(거래 심볼 자체) | both(둘이 일치해야 함)
+    """
+    def __init__(self, ex_trade, ex_regime, funding, external, candles=None):
+        self.ex_trade = ex_trade
+        self.ex_regime = ex_regime
+        self.funding = funding
+        self.external = external
+        self.candles = candles          # CandleStore (없으면 매번 fetch_ohlcv)
+        self.source_symbols = SymbolResolver.from_exchange(ex_regime)
+        self.state: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    # --- universe ---
+    @staticmethod
+    def universe(cfg: Config, resolver: Optional[SymbolResolver] = None) -> List[Tuple[str, str]]:
+        """[(trade_symbol, source_symbol)] — 소스 거래소에 없는 심볼은 제외 (다른 심볼로 대체하지 않음)"""
+        norm = lambda s: normalize_symbol_for_exchange(s, cfg.regime_exchange, resolver)
+        if cfg.regime_universe.strip():
+            syms = [s.strip() for s in cfg.regime_universe.split(",") if s.strip()]
+            pairs = [(s, norm(s)) for s in syms]
+        else:
+            # 기본: SYMBOL(ETH) + BTC, 소스 심볼은 REGIME_SYMBOL_* 강제값 우선
+            pairs = [
+                (cfg.symbol_fallback, norm(cfg.regime_symbol_eth or cfg.symbol_fallback)),
+                ("BTC/USDT:USDT", norm(cfg.regime_symbol_btc or "BTC/USDT:USDT")),
+            ]
+        return [p for p in pairs if p[1]]
+
+    # --- data ---
+    def _load_matrix(self, cfg: Config, sources: List[str], T: int) -> np.ndarray:
+        """(n, 4, T) = high, low, close, ts. 부족분은 왼쪽 NaN."""
+        m = np.full((len(sources), 4, T), np.nan)
+        if self.candles is not None:
+            # 공유 캔들 저장소: 새로 닫힌 봉만 받아 붙이고 memmap에서 바로 읽음 (닫힌 봉 기준)
+            name = budget_name(self.ex_regime, cfg.regime_testnet)
+            for i, src in enumerate(sources):
+                try:
+                    self.candles.sync(self.ex_regime, name, src, cfg.regime_timeframe, T)
+                except Exception:
+                    pass
+                a = self.candles.read(name, src, cfg.regime_timeframe, T)
+                k = len(a)
+                if k:
+                    m[i, 0, T - k:] = a["h"]
+                    m[i, 1, T - k:] = a["l"]
+                    m[i, 2, T - k:] = a["c"]
+                    m[i, 3, T - k:] = a["ts"]
+            return m
+        for i, src in enumerate(sources):
+            try:
+                rows = [c for c in fetch_ohlcv(self.ex_regime, src, cfg.regime_timeframe, T) if c and len(c) > 4]
+            except Exception:
+                continue
+            if not rows:
+                continue
+            a = np.asarray(rows[-T:], dtype=np.float64)
+            k = a.shape[0]
+            m[i, 0, T - k:] = a[:, 2]
+            m[i, 1, T - k:] = a[:, 3]
+            m[i, 2, T - k:] = a[:, 4]
+            m[i, 3, T - k:] = a[:, 0]
+        return m
+
+    def evaluate(self, cfg: Config, m: np.ndarray, symbols: List[str], sources: List[str]) -> Dict[str, Any]:
+        """행렬 → 지표/레짐 (네트워크 없음)."""
+        t0 = time.perf_counter()
+        L = cfg.regime_ema_len
+        high, low, close = m[:, 0, :], m[:, 1, :], m[:, 2, :]
+        T = close.shape[1]
+        win = close[:, T - L:]
+        ema = ema_last(win, L)
+        px = close[:, -1]
+        atr = atr_last(high[:, T - L:], low[:, T - L:], win, cfg.regime_atr_len)
+        rv = realized_vol(close, cfg.regime_rv_window, 365 * 86400 / timeframe_seconds(cfg.regime_timeframe))
+
+        valid = ~(np.isnan(ema) | np.isnan(px))
+        trend = np.where(valid, np.sign(px - ema), 0).astype(np.int8)   # +1 bull, -1 bear, 0 n/a
+        names = np.array(["neutral", "bull", "bear"])
+        sym_regime = names[np.where(trend > 0, 1, np.where(trend < 0, 2, 0))]
+
+        basket_set = [s.strip() for s in cfg.regime_basket.split(",") if s.strip()] or symbols
+        bidx = np.array([i for i, s in enumerate(symbols) if s in basket_set], dtype=np.intp)
+        basket = "neutral"
+        if bidx.size:
+            q = cfg.regime_basket_quorum
+            if (trend[bidx] > 0).mean() >= q: basket = "bull"
+            elif (trend[bidx] < 0).mean() >= q: basket = "bear"
+
+        def f(x):
+            return None if not np.isfinite(x) else float(x)
+
+        per_symbol = {
+            s: {"source": sources[i], "regime": str(sym_regime[i]), "px": f(px[i]), "ema": f(ema[i]),
+                "atr": f(atr[i]), "rv": f(rv[i])}
+            for i, s in enumerate(symbols)
+        }
+        return {
+            "ts": time.time(),
+            "eval_ms": (time.perf_counter() - t0) * 1000.0,
+            "timeframe": cfg.regime_timeframe,
+            "basket": basket,
+            "basket_members": [symbols[i] for i in bidx],
+            "symbols": per_symbol,
+            "cfg_version": cfg.config_version,
+        }
+
+    def refresh(self, cfg: Config) -> Dict[str, Any]:
+        uni = self.universe(cfg, self.source_symbols)
+        symbols = [u[0] for u in uni]; sources = [u[1] for u in uni]
+        T = max(cfg.regime_ema_len, cfg.regime_rv_window + 1)
+        m = self._load_matrix(cfg, sources, T)
+        st = self.evaluate(cfg, m, symbols, sources)
+        self.state = st
+        return st
+
+    def snapshot(self, cfg: Config, max_age: Optional[float] = None) -> Dict[str, Any]:
+        ttl = cfg.regime_ttl_s if max_age is None else max_age
+        st = self.state
+        if st is not None and (time.time() - st["ts"]) <= ttl and st.get("cfg_version") == cfg.config_version:
+            return st
+        with self._lock:
+            st = self.state
+            if st is not None and (time.time() - st["ts"]) <= ttl and st.get("cfg_version") == cfg.config_version:
+                return st
+            return self.refresh(cfg)
+
+    # --- query ---
+    def regime_for(self, cfg: Config, symbol: str) -> Tuple[str, Dict[str, Any]]:
+        return self.regime_from_state(cfg, self.snapshot(cfg), symbol)
+
+    def peek_regime_for(self, cfg: Config, symbol: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """TTL과 무관하게 마지막 스냅샷으로만 판정 (조회 전용 경로, 네트워크 없음)."""
+        st = self.state
+        if st is None:
+            return None, None
+        return self.regime_from_state(cfg, st, symbol)
+
+    def regime_from_state(self, cfg: Config, st: Dict[str, Any], symbol: str) -> Tuple[str, Dict[str, Any]]:
+        rec = st["symbols"].get(symbol)
+        basket = st["basket"]
+        scope = cfg.regime_scope
+        if scope == "symbol" and rec is not None:
+            base = rec["regime"]
+        elif scope == "both" and rec is not None:
+            base = rec["regime"] if rec["regime"] == basket else "neutral"
+        else:
+            base = basket
+
+        fund_sym = symbol if (scope != "basket" and rec is not None) else cfg.regime_funding_symbol
+        fr = self.funding.get(fund_sym)
+        vix_val, vix_age = self.external.get("vix")
+
+        gated = False; gate_reason = None
+        if fr is not None and abs(fr) > cfg.funding_abs_max:
+            gated = True; gate_reason = f"funding_abs>{cfg.funding_abs_max}"
+        if not gated and vix_val is not None and vix_val > cfg.vix_max:
+            gated = True; gate_reason = f"vix>{cfg.vix_max}"
+        if not gated and cfg.regime_rv_max > 0 and rec is not None and rec["rv"] is not None and rec["rv"] > cfg.regime_rv_max:
+            gated = True; gate_reason = f"rv>{cfg.regime_rv_max}"
+
+        meta = {
+            "base": base,
+            "scope": scope,
+            "symbol": symbol,
+            "symbol_regime": rec["regime"] if rec else None,
+            "basket": basket,
+            "px": rec["px"] if rec else None, "ema": rec["ema"] if rec else None,
+            "atr": rec["atr"] if rec else None, "rv": rec["rv"] if rec else None,
+            "funding": fr, "funding_symbol": fund_sym,
+            "vix": vix_val, "vix_age_s": round(vix_age, 3) if vix_age is not None else None,
+            "gated": gated, "reason": gate_reason,
+            "age_s": round(time.time() - st["ts"], 3), "eval_ms": round(st["eval_ms"], 3),
+            "source": {"exchange": cfg.regime_exchange, "testnet": cfg.regime_testnet, "timeframe": st["timeframe"]},
+        }
+        return ("neutral" if gated else base), meta
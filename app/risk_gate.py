@@ -1,16 +1,31 @@
 from fastapi import HTTPException
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 from .config import Config
 from .market import get_last_or_mark
 
-def slippage_guard(cfg: Config, ex, ref_price: float, sym: str):
+def slippage_guard(cfg: Config, ex, ref_price: float, sym: str, snaps=None):
     if ref_price is None or ref_price <= 0:
         return
-    px = get_last_or_mark(ex, sym, cfg.use_mark_price)
+    px = get_last_or_mark(ex, sym, cfg.use_mark_price, snaps, cfg.snapshot_price_max_age_s)
     slip = abs(px - ref_price) / ref_price
     if slip > cfg.max_slippage:
         raise HTTPException(409, f"slippage {slip:.4f} > MAX_SLIPPAGE")
 
+def depth_limit_px(cfg: Config, side: str, est: Dict[str, Any], drifted: bool = False) -> Optional[float]:
+    """
+    호가 sweep 결과로 IOC 한도가 결정. 한도 밴드 = mid × (1 ± MAX_SLIPPAGE).
+    - 예상 최악가가 밴드 안이고 가격 가드도 통과 → None (시장가)
+    - 가격 가드가 걸렸으면 필요한 만큼만 호가를 먹는 최악가 (밴드로 상한)
+    - 호가를 밴드 밖까지 먹거나 보이는 호가로 부족하면 밴드 경계 (넘는 만큼은 IOC로 취소)
+    """
+    s = cfg.max_slippage
+    cap = est["mid"] * (1.0 + s if side == "buy" else 1.0 - s)
+    worst = est["worst"]
+    beyond = (worst > cap if side == "buy" else worst < cap) or est["filled"] < est["amount"]
+    if beyond:
+        return cap
+    return worst if drifted else None
+
 def regime_alloc_and_lev(cfg: Config, strategy: str, regime: str) -> Tuple[float,int]:
     s = (strategy or "").lower()
     if s not in ("bull","bear"):
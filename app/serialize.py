@@ -0,0 +1,100 @@
+# app/serialize.py
+import math
+from typing import Any, Dict, Optional
+
+import orjson        # NaN/Inf → null 을 인코더가 직접 처리 (requirements.txt 고정)
+from fastapi.responses import Response
+
+_ORDER_FIELDS = ("id", "clientOrderId", "symbol", "type", "side", "amount", "filled", "remaining",
+                 "price", "average", "status", "timestamp")
+_POSITION_FIELDS = (("side", "side"), ("qty", "contracts"), ("entry", "entryPrice"),
+                    ("unrealizedPnl", "unrealizedPnl"), ("leverage", "leverage"))
+_REGIME_META_FIELDS = ("base", "scope", "symbol_regime", "basket", "funding", "vix", "gated", "reason", "age_s")
+
+
+def _num(x):
+    """float NaN/Inf → None, 나머지 그대로."""
+    if isinstance(x, float) and not math.isfinite(x):
+        return None
+    return x
+
+
+def clean(x):
+    """한 번 순회로 NaN/Inf 제거 (투영하지 않는 중첩 값용)."""
+    if isinstance(x, float):
+        return x if math.isfinite(x) else None
+    if isinstance(x, dict):
+        return {k: clean(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [clean(v) for v in x]
+    return x
+
+
+def project_order(o: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not isinstance(o, dict):
+        return None
+    out = {k: _num(o.get(k)) for k in _ORDER_FIELDS if o.get(k) is not None}
+    fee = o.get("fee")
+    if isinstance(fee, dict) and fee.get("cost") is not None:
+        out["fee"] = {"cost": _num(fee.get("cost")), "currency": fee.get("currency")}
+    return out
+
+
+def project_position(p: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not isinstance(p, dict):
+        return None
+    if "qty" in p and "contracts" not in p:          # 이미 축약된 형태
+        return {k: _num(v) for k, v in p.items()}
+    return {k: _num(p.get(src)) for k, src in _POSITION_FIELDS}
+
+
+def project_regime_meta(m: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not isinstance(m, dict):
+        return None
+    return {k: _num(m.get(k)) for k in _REGIME_META_FIELDS}
+
+
+_PROJECTORS = {
+    "order": project_order,
+    "order_final": project_order,
+    "pre_position": project_position,
+    "final_position": project_position,
+    "regime_meta": project_regime_meta,
+}
+
+
+def compact(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    웹훅 결과 → 응답 스키마. 알려진 키는 필드 투영(ccxt raw info 제외), 나머지 스칼라/작은 dict는 정리만.
+    투영하면서 NaN/Inf를 같이 치환하므로 결과 전체를 다시 순회하지 않는다.
+    """
+    out: Dict[str, Any] = {}
+    for k, v in result.items():
+        proj = _PROJECTORS.get(k)
+        if proj is not None:
+            out[k] = proj(v)
+        elif isinstance(v, float):
+            out[k] = _num(v)
+        elif isinstance(v, (dict, list, tuple)):
+            out[k] = clean(v)
+        else:
+            out[k] = v
+    return out
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class CompactJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def respond(result: Dict[str, Any], verbose: bool = False) -> CompactJSONResponse:
+    """verbose=True면 ccxt 원본 객체 그대로(디버깅용, NaN만 정리)."""
+    if verbose:
+        return CompactJSONResponse(result)
+    return CompactJSONResponse(compact(result))
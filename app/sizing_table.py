@@ -0,0 +1,79 @@
+# app/sizing_table.py
+import time, threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .balance import fetch_equity_generic
+from .market import market_info
+from .prewarm import prewarm_symbols
+from .risk_gate import regime_alloc_and_lev
+from .sizing import build_row
+
+REGIMES = ("bull", "neutral", "bear")
+DEFAULT_STRATEGY = "*"      # bull/bear 외 전략 → 기본 alloc/lev
+
+
+def sizing_strategies(cfg) -> List[str]:
+    return [s.strip().lower() for s in (cfg.sizing_strategies or "").split(",") if s.strip()] + [DEFAULT_STRATEGY]
+
+
+class SizingTable:
+    """
+    (전략, 심볼, 레짐) → 사이징 행(build_row): 예산/상한/리스크 금액/버퍼/스텝을 미리 계산.
+    웹훅은 가격만 구해 amount_from_row로 수량을 낸다 (잔고/마켓 조회 없음).
+    - 재계산: 프리웜(잔고/레짐 갱신 직후), 설정 변경, rebuild() 직접 호출
+    - 주문 체결 후 invalidate() → 다음 재계산 전까지는 기존 경로(compute_amount_server)
+    - 레짐은 세 가지를 모두 담아 두므로 레짐 전환만으로는 재계산하지 않는다
+    """
+    def __init__(self, ex, snaps):
+        self.ex = ex
+        self.snaps = snaps
+        self.rows: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self.built_at: Optional[float] = None
+        self.cfg_version: Optional[int] = None
+        self.equity: Optional[float] = None
+        self.valid = False
+        self._lock = threading.Lock()
+
+    def rebuild(self, cfg, equity: Optional[float] = None) -> Dict[str, Any]:
+        if equity is None:
+            equity, _ = self.snaps.peek("equity", cfg.equity_code)
+        if equity is None:
+            equity = fetch_equity_generic(self.ex, cfg)()
+        rows = {}
+        for sym in prewarm_symbols(cfg):
+            mi = market_info(self.ex, sym, cfg.symbol_fallback)
+            for strat in sizing_strategies(cfg):
+                for reg in REGIMES:
+                    alloc, lev = regime_alloc_and_lev(cfg, "" if strat == DEFAULT_STRATEGY else strat, reg)
+                    rows[(strat, sym, reg)] = build_row(cfg, float(equity), alloc, lev, mi)
+        with self._lock:
+            self.rows = rows
+            self.equity = float(equity)
+            self.built_at = time.time()
+            self.cfg_version = cfg.config_version
+            self.valid = float(equity) > 0
+        return self.info()
+
+    def invalidate(self):
+        self.valid = False
+
+    def row(self, cfg, strategy: str, symbol: str, regime: str, alloc_pct: float, leverage: int) -> Optional[Dict[str, Any]]:
+        """유효한 행이 있고 요청의 alloc/leverage와 일치하면 행, 아니면 None(기존 경로)."""
+        if not self.valid or self.cfg_version != cfg.config_version:
+            return None
+        if time.time() - (self.built_at or 0) > cfg.sizing_table_max_age_s:
+            return None
+        s = (strategy or "").lower()
+        rec = self.rows.get((s, symbol, regime)) or self.rows.get((DEFAULT_STRATEGY, symbol, regime))
+        if rec is None or rec["alloc_pct"] != alloc_pct or rec["leverage"] != int(leverage):
+            return None
+        return rec
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "valid": self.valid,
+            "cfg_version": self.cfg_version,
+            "equity": self.equity,
+            "age_s": round(time.time() - self.built_at, 3) if self.built_at else None,
+            "rows": [{"strategy": k[0], "symbol": k[1], "regime": k[2], **v} for k, v in sorted(self.rows.items())],
+        }
@@ -0,0 +1,51 @@
+# app/snapshots.py
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class SnapshotStore:
+    """
+    (종류, 키) → (값, 저장 시각). 프리웜/백그라운드가 쓰고 요청 경로는 max_age 이내 값만 읽는다.
+    dict 항목 교체만 하므로 스레드 간 락 없이 안전 (CPython 원자 대입).
+    종류: ticker(심볼) / position(심볼) / equity(코드) / leverage(심볼)
+    """
+    def __init__(self):
+        self._d: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def put(self, kind: str, key: str, value: Any, ts: Optional[float] = None):
+        self._d[(kind, key)] = (value, ts if ts is not None else time.time())
+
+    def get(self, kind: str, key: str, max_age: float) -> Optional[Any]:
+        """max_age 이내면 값, 아니면 None (max_age <= 0 → 항상 None)."""
+        rec = self._d.get((kind, key))
+        if rec is not None and max_age > 0 and time.time() - rec[1] <= max_age:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            return rec[0]
+        self.misses[kind] = self.misses.get(kind, 0) + 1
+        return None
+
+    def peek(self, kind: str, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """나이와 무관하게 (값, 나이초)."""
+        rec = self._d.get((kind, key))
+        if rec is None:
+            return None, None
+        return rec[0], time.time() - rec[1]
+
+    def stamped(self, kind: str, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """나이와 무관하게 (값, 저장 시각)."""
+        return self._d.get((kind, key), (None, None))
+
+    def drop(self, kind: str, key: str):
+        self._d.pop((kind, key), None)
+
+    def ages(self) -> Dict[str, Dict[str, float]]:
+        now = time.time()
+        out: Dict[str, Dict[str, float]] = {}
+        for (kind, key), (_, ts) in list(self._d.items()):
+            out.setdefault(kind, {})[key] = round(now - ts, 3)
+        return out
+
+    def info(self) -> Dict[str, Any]:
+        return {"ages_s": self.ages(), "hits": dict(self.hits), "misses": dict(self.misses)}
@@ -0,0 +1,227 @@
+# app/status.py
+import time, math, json, asyncio, hashlib, threading
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+
+from .balance import fetch_equity_generic
+from .jsonsafe import jnum
+from .prewarm import prewarm_symbols
+
+router = APIRouter()
+
+_MAX_WAIT_S = 30.0
+_POLL_S = 0.25
+_SSE_HEARTBEAT_S = 15.0
+
+
+def _age(ts: Optional[float], now: float) -> Optional[float]:
+    return round(now - ts, 3) if ts else None
+
+
+def _clean(x):
+    if isinstance(x, float):
+        return x if math.isfinite(x) else None
+    if isinstance(x, dict):
+        return {k: _clean(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [_clean(v) for v in x]
+    return x
+
+
+def build_status(app, symbols: List[str]) -> Dict[str, Any]:
+    """
+    스냅샷만으로 상태 문서 구성 (거래소 호출 없음).
+    각 구성요소는 *_ts(저장 시각)를 가지며, 나이(age_s)는 응답 직전에 붙인다 → ETag는 내용이 바뀔 때만 변함.
+    """
+    st = app.state
+    cfg = st.cfg
+    snaps = st.snapshots
+
+    per: Dict[str, Any] = {}
+    for sym in symbols:
+        pos, pos_ts = snaps.stamped("position", sym)
+        tick, tick_ts = snaps.stamped("ticker", sym)
+        regime, meta = st.regime_engine.peek_regime_for(cfg, sym)
+        if meta is not None:
+            meta = {k: v for k, v in meta.items() if k not in ("age_s", "vix_age_s")}
+        fund = st.funding.info(sym)
+        pos = pos or {}
+        per[sym] = {
+            "position": {
+                "side": pos.get("side"),
+                "qty": pos.get("contracts"),
+                "entry": pos.get("entryPrice"),
+                "unrealizedPnl": pos.get("unrealizedPnl"),
+                "ts": pos_ts,
+            },
+            "price": {
+                "last": (tick or {}).get("last"),
+                "mark": ((tick or {}).get("info") or {}).get("markPrice"),
+                "ts": tick_ts,
+            },
+            "funding": {"rate": fund["rate"], "next_ts": fund["next_ts"], "ts": fund["fetched_at"]} if fund else None,
+            "regime": regime,
+            "regime_meta": meta,
+        }
+
+    eq, eq_ts = snaps.stamped("equity", cfg.equity_code)
+    reg_state = st.regime_engine.state
+    vix, _ = st.external.get("vix")
+    vix_feed = st.external.feeds.get("vix")
+    primary = symbols[0] if symbols else cfg.symbol_fallback
+    p = per.get(primary) or {}
+    return _clean({
+        # 기존 단일 심볼 응답 형태 유지 (첫 번째 심볼)
+        "trade": {"exchange": "phemex", "testnet": cfg.trade_testnet, "symbol": primary},
+        "regime_source": {"exchange": cfg.regime_exchange, "testnet": cfg.regime_testnet},
+        "position": p.get("position"),
+        "regime": p.get("regime"),
+        "regime_meta": p.get("regime_meta"),
+        "equity": {
+            "code": cfg.equity_code,
+            "source": cfg.equity_source,
+            "amount": jnum(eq),
+            "ts": eq_ts,
+        },
+        "symbols": per,
+        "regime_ts": reg_state["ts"] if reg_state else None,
+        "vix": {"value": vix, "ts": vix_feed.fetched_at if vix_feed and vix_feed.fetched_at else None},
+        "cfg_version": cfg.config_version,
+    })
+
+
+def _strip_ts(x):
+    if isinstance(x, dict):
+        return {k: _strip_ts(v) for k, v in x.items() if k not in ("ts", "regime_ts")}
+    return x
+
+
+def etag_of(doc: Dict[str, Any]) -> str:
+    """저장 시각은 제외한 내용 기준 → 같은 값으로 재갱신된 스냅샷은 304."""
+    return '"' + hashlib.sha1(json.dumps(_strip_ts(doc), sort_keys=True, default=str).encode()).hexdigest()[:20] + '"'
+
+
+def with_ages(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """*_ts → age_s 추가 (ETag 계산 이후에만)."""
+    now = time.time()
+    out = dict(doc)
+    ages = {"equity": _age((doc.get("equity") or {}).get("ts"), now),
+            "regime": _age(doc.get("regime_ts"), now),
+            "vix": _age((doc.get("vix") or {}).get("ts"), now)}
+    for sym, rec in (doc.get("symbols") or {}).items():
+        ages[sym] = {
+            "position": _age(rec["position"]["ts"], now),
+            "price": _age(rec["price"]["ts"], now),
+            "funding": _age((rec.get("funding") or {}).get("ts"), now),
+        }
+    out["ages_s"] = ages
+    out["as_of"] = now
+    return out
+
+
+def _symbols_arg(cfg, symbols: Optional[str]) -> List[str]:
+    if symbols:
+        return [s.strip() for s in symbols.split(",") if s.strip()]
+    return prewarm_symbols(cfg)
+
+
+@router.get("/status")
+async def status(request: Request, symbols: Optional[str] = None, wait: float = 0.0):
+    """
+    스냅샷 기반 상태. If-None-Match가 현재 ETag와 같으면 304.
+    ?wait=N: 변경될 때까지 최대 N초(≤30) 대기하는 롱폴 (변화 없으면 304).
+    """
+    app = request.app
+    syms = _symbols_arg(app.state.cfg, symbols)
+    inm = request.headers.get("if-none-match")
+    doc = build_status(app, syms)
+    tag = etag_of(doc)
+    deadline = time.monotonic() + min(max(wait, 0.0), _MAX_WAIT_S)
+    while inm == tag and time.monotonic() < deadline:
+        await asyncio.sleep(_POLL_S)
+        doc = build_status(app, syms)
+        tag = etag_of(doc)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if inm == tag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=json.dumps(with_ages(doc), default=str), media_type="application/json", headers=headers)
+
+
+@router.get("/status/stream")
+async def status_stream(request: Request, symbols: Optional[str] = None):
+    """SSE: 상태가 바뀔 때마다 event: status (id=ETag), 15초마다 하트비트."""
+    app = request.app
+    syms = _symbols_arg(app.state.cfg, symbols)
+
+    async def gen():
+        last = request.headers.get("last-event-id")
+        beat = time.monotonic()
+        while not await request.is_disconnected():
+            doc = build_status(app, syms)
+            tag = etag_of(doc)
+            if tag != last:
+                last = tag
+                beat = time.monotonic()
+                yield f"event: status\nid: {tag}\ndata: {json.dumps(with_ages(doc), default=str)}\n\n"
+            elif time.monotonic() - beat >= _SSE_HEARTBEAT_S:
+                beat = time.monotonic()
+                yield ": keepalive\n\n"
+            await asyncio.sleep(_POLL_S)
+
+    return StreamingResponse(gen(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class StatusRefresher:
+    """
+    포지션/잔고(+만료된 레짐) 스냅샷 주기 갱신 (STATUS_REFRESH_S). /status 요청 수와 무관하게 호출량이 고정된다.
+    주문 직후 갱신은 웹훅이, 봉 마감 직전 갱신은 프리웜이 담당.
+    """
+    def __init__(self, app):
+        self.app = app
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self):
+        st = self.app.state
+        cfg = st.cfg
+        for sym in prewarm_symbols(cfg):
+            try:
+                poss = st.ex.fetch_positions([sym])
+                st.snapshots.put("position", sym, poss[0] if poss else {})
+            except Exception:
+                pass
+        try:
+            v = fetch_equity_generic(st.ex, cfg)()
+            if v > 0:
+                st.snapshots.put("equity", cfg.equity_code, v)
+        except Exception:
+            pass
+        reg = st.regime_engine.state
+        if reg is None or time.time() - reg["ts"] > cfg.regime_ttl_s or reg.get("cfg_version") != cfg.config_version:
+            try:
+                st.regime_engine.refresh(cfg)
+            except Exception:
+                pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            interval = float(self.app.state.cfg.status_refresh_s or 0)
+            if interval <= 0:
+                if self._stop.wait(30.0):
+                    break
+                continue
+            self.refresh()
+            if self._stop.wait(interval):
+                break
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="status-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -1,6 +1,96 @@
 import re
+import string
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_DROP = str.maketrans("", "", string.punctuation + string.whitespace)
+
+
+class UnknownSymbol(ValueError):
+    pass
+
+
+def _compact(s: str) -> str:
+    """'ETH/USDT', 'ETH-USDT', 'eth_usdt' → 'ETHUSDT'."""
+    return s.translate(_DROP).upper()
+
+
+def _type_rank(m: Dict[str, Any], prefer: Tuple[str, ...]) -> int:
+    t = m.get("type") or ("swap" if m.get("swap") else "future" if m.get("future") else "spot" if m.get("spot") else "")
+    return prefer.index(t) if t in prefer else len(prefer)
+
+
+class SymbolResolver:
+    """
+    로드된 마켓으로 만든 TradingView/거래소 표기 → ccxt 심볼 테이블. 조회는 dict 1~2회 (정규식 없음).
+    - 키: ccxt 심볼 그대로, base+quote, baseId+quoteId, 마켓 id (Phemex 's'/'u' 접두 제거)
+    - 입력: 'PHEMEX:ETHUSDT.P', 'BINANCE:ETHUSDT', 'ETHUSD', '1000PEPEUSDT', 'ETHUSDTPERP', 'ETH/USDT'
+    - 같은 키가 여러 마켓에 걸리면 prefer 순서(기본 swap > future > spot), 활성 마켓 우선
+    - 1000PEPE ↔ PEPE 처럼 승수가 다른 표기는 연결하지 않음 (수량 단위가 달라짐) → 미지원 심볼로 거절
+    """
+    def __init__(self, markets: Dict[str, Dict[str, Any]], prefer: Iterable[str] = ("swap", "future", "spot")):
+        self.prefer = tuple(prefer)
+        self._exact: Dict[str, str] = {}
+        self._alias: Dict[str, str] = {}
+        ranked: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        for sym, m in (markets or {}).items():
+            sym = m.get("symbol") or sym
+            self._exact[sym.upper()] = sym
+            rank = (_type_rank(m, self.prefer), 0 if m.get("active", True) is not False else 1)
+            mid = str(m.get("id") or "")
+            keys = {
+                _compact(f"{m.get('base') or ''}{m.get('quote') or ''}"),
+                _compact(f"{m.get('baseId') or ''}{m.get('quoteId') or ''}"),
+                _compact(mid[1:] if mid[:1].islower() and mid[1:2].isupper() else mid),
+            }
+            for k in keys:
+                if not k:
+                    continue
+                cur = ranked.get(k)
+                if cur is None or rank < cur[0]:
+                    ranked[k] = (rank, sym)
+        self._alias = {k: v[1] for k, v in ranked.items()}
+
+    @classmethod
+    def from_exchange(cls, ex, prefer: Optional[Iterable[str]] = None) -> "SymbolResolver":
+        """거래소 기본 타입이 spot이면 spot 우선, 아니면 무기한(swap) 우선."""
+        if prefer is None:
+            spot = (getattr(ex, "options", None) or {}).get("defaultType") == "spot"
+            prefer = ("spot", "swap", "future") if spot else ("swap", "future", "spot")
+        return cls(getattr(ex, "markets", None) or ex.load_markets(), prefer)
+
+    def resolve(self, s: Optional[str]) -> Optional[str]:
+        if not s:
+            return None
+        s = s.strip().upper()
+        hit = self._exact.get(s)
+        if hit is not None:
+            return hit
+        if ":" in s:                         # 'PHEMEX:ETHUSDT.P' → 'ETHUSDT.P', 'ETH/USDT:USDT' → 'ETH/USDT'
+            head, tail = s.rsplit(":", 1)
+            s = head if "/" in head else tail
+        if s.endswith(".P"):
+            s = s[:-2]
+        k = _compact(s)
+        hit = self._alias.get(k)
+        if hit is None and k.endswith("PERP"):
+            hit = self._alias.get(k[:-4])
+        return hit
+
+    def require(self, s: str) -> str:
+        hit = self.resolve(s)
+        if hit is None:
+            raise UnknownSymbol(f"unknown symbol: {s}")
+        return hit
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def info(self) -> Dict[str, Any]:
+        return {"markets": len(self._exact), "aliases": len(self._alias), "prefer": list(self.prefer)}
+
 
 def tv_to_ccxt_symbol(tv_symbol: str):
+    """마켓 정보 없이 쓰는 정규식 변환 (BASEUSDT/BASEUSD만). 가능하면 SymbolResolver 사용."""
     if not tv_symbol: return None
     s = tv_symbol.strip().upper()
     if ":" in s:
@@ -15,11 +105,14 @@ def tv_to_ccxt_symbol(tv_symbol: str):
     base, quote = m.group(1), m.group(2)
     return f"{base}/USDT:USDT" if quote=="USDT" else f"{base}/USD:USD"
 
-def normalize_symbol_for_exchange(sym: str, exchange_id: str):
+def normalize_symbol_for_exchange(sym: str, exchange_id: str, resolver: Optional[SymbolResolver] = None):
+    """resolver가 있으면 그 거래소 마켓 테이블로, 없으면 정규식 변환. 모르는 심볼은 None (대체 심볼 없음)."""
     if not sym: return None
+    if resolver is not None:
+        return resolver.resolve(sym)
     s = sym.strip()
     if exchange_id == "phemex":
-        return tv_to_ccxt_symbol(s) or "ETH/USDT:USDT"
+        return tv_to_ccxt_symbol(s)
     elif exchange_id == "binance":
         if ":" in s: s = s.split(":")[0]
         m = re.match(r"^([A-Za-z]+)(USDT)$", s, re.I)
@@ -0,0 +1,207 @@
+# app/tca.py
+"""
+사후 거래 비용 분석 (TCA).
+
+체결마다 Redis 스트림(tca:trades)에 한 줄: 알림가(alert) / 도착가(arrival, 게이트 시점 티커) /
+IOC 한도가 / 체결 평균가 / 수수료 / 펀딩비율 / 알림→체결 지연. 분석은 numpy로 전 건을 한 번에:
+  - shortfall_bps : 알림가 대비 체결가 (implementation shortfall, +면 비용)
+  - delay_bps     : 알림가 → 도착가 (지연 동안 움직인 가격)
+  - exec_bps      : 도착가 → 체결가 (호가/임팩트)
+  - fee_bps, funding_bps(1회 정산분, 롱이 양수 비율을 냄), limit_use(IOC 한도 밴드 사용률), fill_ratio
+  - 그룹별 delay_bps ~ latency_ms 기울기 = 지연 100ms당 슬리피지 (latency_bps_per_100ms)
+
+    python -m app.tca [--since-h 24] [--by strategy,symbol,regime] [--json]
+"""
+import json, time, argparse
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+TRADES_KEY = "tca:trades"
+
+TRADE_DTYPE = np.dtype([
+    ("ts", "f8"), ("strategy", "U16"), ("symbol", "U32"), ("regime", "U16"), ("sign", "f8"),
+    ("qty", "f8"), ("filled", "f8"), ("alert_px", "f8"), ("arrival_px", "f8"), ("limit_px", "f8"),
+    ("fill_px", "f8"), ("fee", "f8"), ("funding_rate", "f8"), ("latency_ms", "f8"), ("reduce_only", "?"),
+])
+GROUP_KEYS = ("strategy", "symbol", "regime")
+METRICS = ("shortfall_bps", "delay_bps", "exec_bps", "fee_bps", "total_bps", "funding_bps", "limit_use",
+           "fill_ratio", "latency_ms")
+
+
+def arrival_price(snaps, symbol: str, use_mark: bool) -> float:
+    """게이트가 방금 본 티커 스냅샷 (네트워크 없음). 없으면 0."""
+    t, _ = snaps.peek("ticker", symbol)
+    if not t:
+        return 0.0
+    try:
+        return float(t.get("info", {}).get("markPrice", t["last"]) if use_mark else t["last"])
+    except Exception:
+        return 0.0
+
+
+def record_trade(r, maxlen: int, **row):
+    """체결 1건 기록 (XADD, 대략 maxlen 건 유지). 실패해도 주문 경로에는 영향 없음."""
+    try:
+        r.xadd(TRADES_KEY, {k: str(v if v is not None else "") for k, v in row.items()},
+               maxlen=maxlen, approximate=True)
+    except Exception:
+        pass
+
+
+def _f(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _row(d: Dict[str, Any]) -> tuple:
+    out = []
+    for n in TRADE_DTYPE.names:
+        kind, v = TRADE_DTYPE[n].kind, d.get(n)
+        out.append(_f(v) if kind == "f" else (str(v) in ("1", "True", "true") if kind == "b" else str(v or "")))
+    return tuple(out)
+
+
+def to_array(rows: Iterable[Dict[str, Any]]) -> np.ndarray:
+    return np.array([_row(d) for d in rows], dtype=TRADE_DTYPE)
+
+
+def load(r, since_s: Optional[float] = None, count: Optional[int] = None) -> np.ndarray:
+    lo = f"{int(since_s * 1000)}-0" if since_s else "-"
+    out = []
+    for _, fields in r.xrange(TRADES_KEY, min=lo, max="+", count=count):
+        out.append({(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                    for k, v in fields.items()})
+    return to_array(out)
+
+
+def costs(a: np.ndarray) -> Dict[str, np.ndarray]:
+    """건별 비용 지표 (bps, +면 비용). 기준가가 없는 건은 nan."""
+    s, fill, alert, arr, lim = a["sign"], a["fill_px"], a["alert_px"], a["arrival_px"], a["limit_px"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shortfall = np.where(alert > 0, s * (fill - alert) / alert * 1e4, np.nan)
+        delay = np.where((alert > 0) & (arr > 0), s * (arr - alert) / alert * 1e4, np.nan)
+        execc = np.where(arr > 0, s * (fill - arr) / arr * 1e4, np.nan)
+        notional = a["filled"] * fill
+        fee = np.where(notional > 0, a["fee"] / notional * 1e4, np.nan)
+        band = s * (lim - arr)
+        limit_use = np.where((lim > 0) & (arr > 0) & (band > 0), s * (fill - arr) / band, np.nan)
+        fill_ratio = np.where(a["qty"] > 0, a["filled"] / a["qty"], np.nan)
+    base = np.where(np.isnan(shortfall), execc, shortfall)
+    return {"shortfall_bps": shortfall, "delay_bps": delay, "exec_bps": execc, "fee_bps": fee,
+            "total_bps": base + np.nan_to_num(fee), "funding_bps": s * a["funding_rate"] * 1e4,
+            "limit_use": limit_use, "fill_ratio": fill_ratio,
+            "latency_ms": np.where(a["latency_ms"] > 0, a["latency_ms"], np.nan), "notional": notional}
+
+
+def _stats(x: np.ndarray) -> Dict[str, Optional[float]]:
+    x = x[~np.isnan(x)]
+    if not x.size:
+        return {"n": 0, "mean": None, "p50": None, "p95": None}
+    p50, p95 = np.percentile(x, [50, 95])
+    return {"n": int(x.size), "mean": round(float(x.mean()), 3), "p50": round(float(p50), 3), "p95": round(float(p95), 3)}
+
+
+def _slope(lat: np.ndarray, delay: np.ndarray) -> Optional[float]:
+    """delay_bps = a + b·latency_ms 의 b × 100 (지연 100ms당 bps)."""
+    m = ~(np.isnan(lat) | np.isnan(delay))
+    if m.sum() < 3 or np.ptp(lat[m]) <= 0:
+        return None
+    return round(float(np.polyfit(lat[m], delay[m], 1)[0] * 100.0), 4)
+
+
+def summarize(a: np.ndarray, c: Dict[str, np.ndarray], idx: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    sel = slice(None) if idx is None else idx
+    notional = c["notional"][sel]
+    tot = c["total_bps"][sel]
+    m = ~np.isnan(tot) & (notional > 0)
+    out: Dict[str, Any] = {
+        "trades": int(len(a[sel])), "notional": round(float(notional.sum()), 2),
+        "fees": round(float(a["fee"][sel].sum()), 4),
+        # 금액 가중 평균 비용과 총 비용(USDT)
+        "total_bps_wavg": round(float(np.average(tot[m], weights=notional[m])), 3) if m.any() else None,
+        "cost_usdt": round(float((tot[m] * notional[m]).sum() / 1e4), 4),
+        "latency_bps_per_100ms": _slope(c["latency_ms"][sel], c["delay_bps"][sel]),
+    }
+    for k in METRICS:
+        out[k] = _stats(c[k][sel])
+    return out
+
+
+def analyze(a: np.ndarray, by: Sequence[str] = GROUP_KEYS, cfg=None) -> Dict[str, Any]:
+    """전체 + 그룹별 요약 (+cfg가 있으면 MAX_SLIPPAGE/FEE_BUFFER/엣지 필터 조정 근거)."""
+    by = [k for k in by if k in GROUP_KEYS]
+    c = costs(a)
+    out: Dict[str, Any] = {"trades": int(a.size), "by": by, "overall": summarize(a, c) if a.size else None, "groups": []}
+    if a.size and by:
+        keys = a[by[0]].astype(object)
+        for k in by[1:]:
+            keys = keys + "|" + a[k].astype(object)
+        uniq, inv = np.unique(keys.astype(str), return_inverse=True)
+        for gi, g in enumerate(uniq):
+            out["groups"].append({**dict(zip(by, g.split("|"))), **summarize(a, c, np.flatnonzero(inv == gi))})
+        out["groups"].sort(key=lambda g: -(g["notional"] or 0))
+    if cfg is not None and a.size:
+        out["tuning"] = tuning(a, c, cfg)
+    return out
+
+
+def tuning(a: np.ndarray, c: Dict[str, np.ndarray], cfg) -> Dict[str, Any]:
+    """현재 설정값 옆에 관측치를 나란히 (자동 반영은 하지 않음)."""
+    def q(x, p):
+        x = x[~np.isnan(x)]
+        return round(float(np.percentile(x, p)), 3) if x.size else None
+    drift = np.abs(c["delay_bps"])
+    entry = ~a["reduce_only"]
+    return {
+        # MAX_SLIPPAGE: 알림→도착 가격 이동이 이보다 크면 409/한도가. p99 이동과 한도 밴드 사용률을 비교
+        "max_slippage_bps": round(cfg.max_slippage * 1e4, 3), "delay_abs_p95_bps": q(drift, 95),
+        "delay_abs_p99_bps": q(drift, 99), "exec_p95_bps": q(c["exec_bps"], 95),
+        "limit_use_p95": q(c["limit_use"], 95),
+        # FEE_BUFFER: 요청 대비 체결 비율 (IOC 잔량 취소/라운딩) 과 실제 수수료율
+        "fee_buffer": cfg.fee_buffer, "fill_ratio_p5": q(c["fill_ratio"], 5),
+        "taker_fee_bps": round(cfg.taker_fee * 1e4, 3), "fee_bps_p50": q(c["fee_bps"], 50),
+        # 엣지 필터: 진입 1회 비용의 왕복 환산 (MIN_EDGE_USDT 하한 근거)
+        "min_edge_usdt": getattr(cfg, "min_edge_usdt", None),
+        "entry_roundtrip_cost_usdt_p50": q(2 * c["total_bps"][entry] * c["notional"][entry] / 1e4, 50),
+        "entry_roundtrip_cost_usdt_p90": q(2 * c["total_bps"][entry] * c["notional"][entry] / 1e4, 90),
+    }
+
+
+def _table(res: Dict[str, Any]) -> str:
+    cols = ("trades", "notional", "total_bps_wavg", "cost_usdt", "latency_bps_per_100ms")
+    head = res["by"] + list(cols) + ["shortfall_p50", "exec_p95", "fee_mean", "lat_p50_ms"]
+    lines = ["\t".join(head)]
+    for g in res["groups"]:
+        lines.append("\t".join([str(g[k]) for k in res["by"]] + [str(g[k]) for k in cols] + [
+            str(g["shortfall_bps"]["p50"]), str(g["exec_bps"]["p95"]), str(g["fee_bps"]["mean"]),
+            str(g["latency_ms"]["p50"])]))
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="post-trade transaction cost analysis")
+    ap.add_argument("--since-h", type=float, default=24.0, help="최근 N시간 (0=전체)")
+    ap.add_argument("--by", default="strategy,symbol,regime")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    from dotenv import load_dotenv
+    from .config import Config
+    from .redis_utils import connect as redis_connect
+    load_dotenv()
+    cfg = Config.from_env()
+    r = redis_connect(cfg.redis_url)
+    a = load(r, time.time() - args.since_h * 3600 if args.since_h > 0 else None)
+    res = analyze(a, [k.strip() for k in args.by.split(",") if k.strip()], cfg)
+    if args.json:
+        print(json.dumps(res, indent=2, default=str))
+        return
+    print(_table(res))
+    print(json.dumps({"overall": res["overall"], "tuning": res.get("tuning")}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
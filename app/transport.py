@@ -0,0 +1,272 @@
+# app/transport.py
+"""
+공유 HTTP 전송 계층: ccxt 동기 클라이언트(거래/레짐/킬 스위치)와 외부 지표 폴러가 같은 풀/설정을 쓴다.
+- 호스트별 커넥션 풀 크기 (HTTP_POOL_MAXSIZE 기본, HTTP_POOL_HOSTS="api.phemex.com=16,..." 개별)
+- TCP_NODELAY + SO_KEEPALIVE (유휴 HTTP_KEEPALIVE_IDLE_S 후 프로브 → NAT/LB가 조용히 끊은 커넥션 조기 감지)
+- DNS 캐시 (HTTP_DNS_TTL_S, 조회 실패 시 마지막 값으로 버팀)
+- 호출 분류별 (connect, read) 타임아웃: order / info / market / external (핫리로드)
+- 호스트별 요청 수 / 새 TCP 연결 수 / 연결(핸드셰이크) 시간 → 재사용률
+"""
+import time, socket, threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+ORDER, INFO, MARKET, EXTERNAL = "order", "info", "market", "external"
+
+# BudgetedExchange의 INFO 중 시세/공개 데이터 → MARKET (짧은 read 타임아웃, 실패해도 다음 주기에 갱신)
+_MARKET_METHODS = frozenset((
+    "fetch_ticker", "fetch_tickers", "fetch_ohlcv", "fetch_mark_ohlcv", "fetch_order_book", "fetch_trades",
+    "fetch_funding_rate", "fetch_funding_rates", "fetch_time", "fetch_markets",
+))
+
+_local = threading.local()
+
+
+def classify(klass: str, method: str) -> str:
+    return MARKET if klass == INFO and method in _MARKET_METHODS else klass
+
+
+@contextmanager
+def calling(klass: str) -> Iterator[None]:
+    """이 스레드의 다음 HTTP 요청들에 적용할 타임아웃 분류."""
+    prev = getattr(_local, "klass", None)
+    _local.klass = klass
+    try:
+        yield
+    finally:
+        _local.klass = prev
+
+
+def socket_options(keepalive_idle_s: int):
+    opts = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1), (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    idle = max(1, int(keepalive_idle_s))
+    if hasattr(socket, "TCP_KEEPIDLE"):          # Linux
+        opts += [(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle),
+                 (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle // 3)),
+                 (socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)]
+    elif hasattr(socket, "TCP_KEEPALIVE"):       # macOS
+        opts.append((socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, idle))
+    return opts
+
+
+def parse_pool_hosts(spec: str) -> Dict[str, int]:
+    """"host=16,host2=4" → {host: 16, ...} (형식이 틀린 항목은 무시)."""
+    out: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        host, _, n = part.strip().partition("=")
+        try:
+            if host and int(n) > 0:
+                out[host.strip().lower()] = int(n)
+        except ValueError:
+            continue
+    return out
+
+
+class HostStats:
+    """호스트별 요청/연결 카운터. 재사용률 = 1 - 새 연결 / 요청."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hosts: Dict[str, Dict[str, float]] = {}
+        self.since = time.time()
+
+    def _h(self, host: str) -> Dict[str, float]:
+        h = self.hosts.get(host)
+        if h is None:
+            h = self.hosts[host] = {"requests": 0, "connects": 0, "connect_ms": 0.0, "errors": 0}
+        return h
+
+    def incr(self, host: str, field: str, v: float = 1):
+        with self._lock:
+            self._h(host)[field] += v
+
+    def info(self) -> Dict[str, Any]:
+        out = {}
+        with self._lock:
+            for host, h in sorted(self.hosts.items()):
+                req, conn = int(h["requests"]), int(h["connects"])
+                out[host] = {"requests": req, "connects": conn, "errors": int(h["errors"]),
+                             "reuse_rate": round(1 - min(conn, req) / req, 4) if req else None,
+                             "connect_ms_avg": round(h["connect_ms"] / conn, 2) if conn else None}
+        return {"since": self.since, "hosts": out}
+
+    def reset(self):
+        with self._lock:
+            self.hosts.clear()
+            self.since = time.time()
+
+
+def _counting_pools(stats: HostStats) -> Dict[str, type]:
+    """connect() 마다 (= 새 TCP/TLS 연결) 호스트 카운터 +1. 끊긴 커넥션 재연결도 포함."""
+    def conn_cls(base):
+        class _Conn(base):
+            def connect(self):
+                t0 = time.perf_counter()
+                super().connect()
+                stats.incr(self.host, "connects")
+                stats.incr(self.host, "connect_ms", (time.perf_counter() - t0) * 1000)
+        return _Conn
+
+    class _Pool(HTTPConnectionPool):
+        ConnectionCls = conn_cls(HTTPConnection)
+
+    class _TLSPool(HTTPSConnectionPool):
+        ConnectionCls = conn_cls(HTTPSConnection)
+    return {"http": _Pool, "https": _TLSPool}
+
+
+class TunedAdapter(HTTPAdapter):
+    """
+    소켓 옵션/풀 크기 고정 + 요청마다 분류별 타임아웃. 분류가 없으면 어댑터 기본 분류
+    (거래소 호스트 info, 그 외 external). ccxt가 넘기는 단일 timeout 은 무시된다.
+    """
+    def __init__(self, transport: "Transport", pool_maxsize: int, default_class: str):
+        self.transport = transport
+        self.default_class = default_class
+        super().__init__(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs["socket_options"] = socket_options(self.transport.cfg.http_keepalive_idle_s)
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = _counting_pools(self.transport.stats)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        host = urlsplit(request.url).hostname or ""
+        self.transport.stats.incr(host, "requests")
+        timeout = self.transport.timeout(getattr(_local, "klass", None) or self.default_class)
+        try:
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        except Exception:
+            self.transport.stats.incr(host, "errors")
+            raise
+
+
+class DnsCache:
+    """
+    socket.getaddrinfo 를 감싸는 프로세스 전역 TTL 캐시 (requests/urllib3, httpx 모두 이걸 거침).
+    IP 리터럴은 통과. 만료 후 조회가 실패하면 마지막 결과를 그대로 씀 (DNS 장애가 주문 경로로 번지지 않게).
+    """
+    def __init__(self, ttl_s: float):
+        self.ttl_s = ttl_s
+        self._orig = None
+        self._cache: Dict[Tuple, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stale = 0
+
+    def install(self):
+        if self._orig is None:
+            self._orig = socket.getaddrinfo
+            socket.getaddrinfo = self._getaddrinfo
+
+    def uninstall(self):
+        if self._orig is not None and socket.getaddrinfo == self._getaddrinfo:
+            socket.getaddrinfo = self._orig
+        self._orig = None
+
+    def _getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        if self.ttl_s <= 0 or not isinstance(host, str) or not host or host[-1].isdigit() or ":" in host:
+            return self._orig(host, port, family, type, proto, flags)
+        key = (host.lower(), port, family, type, proto, flags)
+        hit = self._cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < self.ttl_s:
+            self.hits += 1
+            return hit[1]
+        try:
+            res = self._orig(host, port, family, type, proto, flags)
+        except socket.gaierror:
+            if hit is None:
+                raise
+            self.stale += 1
+            return hit[1]
+        self.misses += 1
+        with self._lock:
+            self._cache[key] = (time.monotonic(), res)
+        return res
+
+    def info(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {"ttl_s": self.ttl_s, "installed": self._orig is not None, "hits": self.hits, "misses": self.misses,
+                "stale_served": self.stale,
+                "entries": {k[0]: round(now - t, 1) for k, (t, _) in list(self._cache.items())}}
+
+
+class Transport:
+    """
+    session: 거래/레짐 ccxt 인스턴스와 외부 폴러가 함께 쓰는 requests.Session.
+    거래소 호스트는 attach() 시 전용 어댑터(호스트별 풀 크기)로 마운트, 나머지는 https:// 기본 어댑터.
+    """
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.stats = HostStats()
+        self.dns = DnsCache(cfg.http_dns_ttl_s)
+        if cfg.http_dns_ttl_s > 0:
+            self.dns.install()
+        self.hosts: Dict[str, int] = {}
+        self.session = self.new_session()
+
+    def configure(self, cfg):
+        """핫리로드: 타임아웃/DNS TTL 즉시 반영 (풀 크기·keep-alive 는 재시작)."""
+        self.cfg = cfg
+        self.dns.ttl_s = cfg.http_dns_ttl_s
+        if cfg.http_dns_ttl_s > 0:
+            self.dns.install()
+
+    def timeout(self, klass: str) -> Tuple[float, float]:
+        c = self.cfg
+        read = {ORDER: c.http_read_timeout_order_s, INFO: c.http_read_timeout_info_s,
+                MARKET: c.http_read_timeout_market_s}.get(klass, c.external_timeout_s)
+        return (c.http_connect_timeout_s, read)
+
+    def pool_size(self, host: str) -> int:
+        return parse_pool_hosts(self.cfg.http_pool_hosts).get(host, self.cfg.http_pool_maxsize)
+
+    def new_session(self, pool_maxsize: Optional[int] = None, default_class: str = EXTERNAL) -> requests.Session:
+        s = requests.Session()
+        s.mount("https://", TunedAdapter(self, pool_maxsize or self.cfg.http_pool_maxsize, default_class))
+        s.mount("http://", TunedAdapter(self, pool_maxsize or self.cfg.http_pool_maxsize, default_class))
+        return s
+
+    def mount_host(self, session: requests.Session, host: str, pool_maxsize: Optional[int] = None,
+                   default_class: str = INFO):
+        size = pool_maxsize or self.pool_size(host)
+        session.mount(f"https://{host}/", TunedAdapter(self, size, default_class))
+        if session is self.session:
+            self.hosts[host] = size
+
+    def attach(self, ex, session: Optional[requests.Session] = None, pool_maxsize: Optional[int] = None,
+               default_class: str = INFO):
+        """ccxt 동기 인스턴스에 세션 주입 (set_sandbox_mode 이후, load_markets 이전에 호출)."""
+        session = session or self.session
+        for host in exchange_hosts(ex):
+            self.mount_host(session, host, pool_maxsize, default_class)
+        session.trust_env = getattr(ex, "requests_trust_env", False)
+        ex.session = session
+        return ex
+
+    def info(self) -> Dict[str, Any]:
+        c = self.cfg
+        return {"pools": dict(self.hosts), "default_pool_maxsize": c.http_pool_maxsize,
+                "keepalive_idle_s": c.http_keepalive_idle_s,
+                "timeouts": {k: self.timeout(k) for k in (ORDER, INFO, MARKET, EXTERNAL)},
+                "dns": self.dns.info(), **self.stats.info()}
+
+
+def exchange_hosts(ex) -> set:
+    """ccxt urls['api'] (중첩 dict/문자열, {hostname} 치환) → 호스트 이름 집합."""
+    out: set = set()
+
+    def walk(v):
+        if isinstance(v, dict):
+            for x in v.values():
+                walk(x)
+        elif isinstance(v, str) and v.startswith(("http://", "https://")):
+            host = urlsplit(v.replace("{hostname}", str(getattr(ex, "hostname", "") or ""))).hostname
+            if host and "{" not in host:
+                out.add(host.lower())
+    walk((getattr(ex, "urls", None) or {}).get("api"))
+    return out
@@ -1,56 +1,32 @@
-import json, math
-from typing import Dict, Any, Optional
-from app.balance import fetch_equity_generic
-from app.jsonsafe import jnum
-from app.parsers import parse_comment_field
-from fastapi import APIRouter, Request, HTTPException
-from .models import TVPayload
+import json, time, asyncio, threading
+import ccxt
+from typing import Dict, Any, List, Optional, Tuple
+from app.balance import fetch_equity_cached
+from fastapi import APIRouter, Request, HTTPException, Body, Response
+from fastapi.concurrency import run_in_threadpool
 from .config import Config
-from .logging_utils import log as logf, redact
-from .symbols import tv_to_ccxt_symbol, normalize_symbol_for_exchange
+from .intent import normalize_payload
+from .symbols import UnknownSymbol
+from .logging_utils import log_decision as logd, redact
 from .market import fetch_positions, current_position_side_qty, market_info, round_step, get_last_or_mark
-from .redis_utils import idempotency_check, is_cooldown, daily_dd_blocked, save_open_entry
-from .sizing import compute_amount_server
-from .regime import get_regime, fetch_phemex_funding_rate
-from .risk_gate import slippage_guard, regime_alloc_and_lev, expected_edge_usdt
-from .orders import set_leverage_if_needed, create_market_order, poll_order_completion, reconcile_target
-from .pnl import realized_pnl_simple, after_exit_update
+from .redis_utils import idempotency_check, is_cooldown, daily_dd_blocked
+from .sizing import compute_amount_server, amount_from_row
+from .risk_gate import slippage_guard, depth_limit_px, regime_alloc_and_lev, expected_edge_usdt
+from .orders import set_leverage_if_needed, poll_order_completion, reconcile_target
+from .serialize import respond, CompactJSONResponse
+from .pnl import after_exit_update
+from .latency import segments, fill_ts
+from .indicators import derive_levels, validate_breakout
+from .regime_engine import timeframe_seconds
+from .killswitch import is_halted
+from .leader import NotLeader
+from .ledger import Leg, order_fill
+from .tca import arrival_price, record_trade
 
 router = APIRouter()
 
-def json_sanitize(obj):
-    try:
-        _ = json.dumps(obj); return obj
-    except Exception:
-        def clean(x):
-            if isinstance(x, float):
-                if math.isfinite(x): return x
-                return None
-            if isinstance(x, dict):
-                return {k: clean(v) for k,v in x.items()}
-            if isinstance(x, list):
-                return [clean(v) for v in x]
-            return x
-        return clean(obj)
-
-def _pick_num(*vals):
-    for v in vals:
-        if v is None: 
-            continue
-        try:
-            f = float(v)
-            if math.isfinite(f):
-                return f
-        except Exception:
-            pass
-    return None
-
-def _derive_tp_from_atr(side: str, entry: float, comm: dict, atr_mult: float|None):
+def _derive_tp_from_atr(side: str, entry: float, atr: Optional[float], atr_mult: float|None):
     # comment 에 atr가 있고, 추정 멀티플이 설정되었을 때만
-    try:
-        atr = float(comm.get("atr"))
-    except Exception:
-        return None
     if not atr or atr <= 0 or not atr_mult or atr_mult <= 0:
         return None
     if side == "buy":
@@ -59,223 +35,444 @@ def _derive_tp_from_atr(side: str, entry: float, comm: dict, atr_mult: float|Non
         return entry - atr * atr_mult
     return None
 
-
-def symbol_from_payload(cfg: Config, payload: Dict[str,Any]) -> str:
-    tv_sym = payload.get("symbol") or payload.get("ticker")
-    ccxt_sym = tv_to_ccxt_symbol(str(tv_sym)) if tv_sym else None
-    return ccxt_sym or cfg.symbol_fallback
-
-def side_from_payload(payload: Dict[str,Any]) -> Optional[str]:
-    action = (payload.get("side") or payload.get("action") or "").lower()
-    if action in ("buy","long"): return "buy"
-    if action in ("sell","short"): return "sell"
-    return None
-
-def desired_target_from_payload(payload: Dict[str,Any]) -> Dict[str,Any]:
-    mp  = (payload.get("marketPosition") or "").lower()
-    mps = payload.get("marketPositionSize")
-    qty = payload.get("qty") or payload.get("amount") or payload.get("contracts")
-    if mp in ("long","short","flat") and mps is not None:
-        return {"mode":"target", "marketPosition": mp, "size": float(mps)}
-    sd = side_from_payload(payload)
-    if sd and qty is not None:
-        return {"mode":"delta", "side": sd, "amount": float(qty)}
-    if sd and qty is None:
-        return {"mode":"delta", "side": sd, "amount": None}
-    return {"mode":"none"}
-
 @router.get("/health")
 def health(request: Request):
     app = request.app
     return {"ok": True, "uptime_s": __import__("time").time()-app.state.app_start}
 
-@router.get("/status")
-def status(request: Request):
-    app = request.app
-    cfg = app.state.cfg; ex = app.state.ex; ex_regime = app.state.ex_regime
-    sym = cfg.symbol_fallback
+def _queued(logger, cfg: Config, tv_id: str, rec: Dict[str, str], err: Exception):
+    """아웃박스 기록은 남았지만 요청 안에서 접수 확인을 못 함 → 202, 스윕이 이어서 제출."""
+    logd(logger, cfg, "order_queued_for_retry", id=tv_id, cid=rec["cid"], attempts=rec.get("attempts"), error=str(err)[:200])
+    return CompactJSONResponse({"status": "queued_for_retry", "id": tv_id, "client_order_id": rec["cid"],
+                                "attempts": int(rec.get("attempts") or 0), "error": str(err)[:200]}, status_code=202)
+
+def _latency(app, cfg: Config, intent, stamps: Dict[str, Optional[float]], result: Optional[Dict[str, Any]] = None):
+    """구간별 지연(ms) → 전략별 히스토그램 기록 + 로그 (+ 응답에 latency_ms)."""
+    segs = segments(stamps)
+    app.state.latency.record(intent.strategy, segs)
+    logd(app.state.logger, cfg, "latency", id=intent.id, strategy=intent.strategy, ms=segs)
+    if result is not None:
+        result["latency_ms"] = segs
+    return segs
+
+def _leg_round(shared: Optional[Dict[str, Any]]):
+    """배치 상계 라운드 (있으면 참여 표시 → _run_item이 leave 하지 않음)."""
+    if shared is None or shared.get("round") is None:
+        return None
+    shared["joined"] = True
+    return shared["round"]
+
+def _record_tca(app, cfg: Config, intent, result: Dict[str, Any], stamps: Dict[str, Optional[float]], sign: float,
+                qty: float, filled: float, px: float, fee: float, limit_px: Optional[float], arrival: float, ro: bool):
+    """체결 1건을 TCA 스트림에 (알림가/도착가/한도가/체결가/수수료/펀딩/알림→체결 지연)."""
+    if not cfg.tca_enabled or filled <= 0 or px <= 0:
+        return
+    t0 = stamps.get("alert") or stamps.get("recv")
+    t1 = stamps.get("fill") or stamps.get("ack")
+    record_trade(app.state.r, cfg.tca_max_trades, ts=time.time(), id=intent.id, strategy=intent.strategy,
+                 symbol=intent.symbol, regime=result.get("regime"), sign=sign, qty=qty, filled=filled,
+                 alert_px=intent.price or 0.0, arrival_px=arrival, limit_px=limit_px or 0.0, fill_px=px, fee=fee,
+                 funding_rate=app.state.funding.get(intent.symbol) or 0.0,
+                 latency_ms=round((t1 - t0) * 1000, 2) if t0 and t1 else 0.0, reduce_only=int(bool(ro)))
+
+def _execute_leg(app, cfg: Config, intent, leg: Leg, stamps: Dict[str, Optional[float]], result: Dict[str, Any],
+                 shared: Optional[Dict[str, Any]]):
+    """
+    상계 데스크로 레그 실행 → 응답/지연 구간 채움. 가상 포지션 청산분 실현손익은 일일 손익/연패에 반영.
+    제출 단계 NetworkError는 outbox_rec가 붙어 올라옴 (호출자가 202 처리).
+    """
+    arrival = arrival_price(app.state.snapshots, intent.symbol, cfg.use_mark_price)   # 게이트가 본 티커
+    res = app.state.netting.execute(cfg, intent.symbol, leg, _leg_round(shared))
+    stamps["submit"] = res["submit_ts"] or stamps["gate"]
+    if res["ack_ts"]:
+        stamps["ack"] = res["ack_ts"]
+    result["order"] = res["order"]
+    if res["fill_at"]:
+        stamps["fill"] = fill_ts(res["order_final"], app.state.clock, res["fill_at"])
+        result["order_final"] = res["order_final"]
+    if res["net"]["legs"] > 1:
+        result["netting"] = {**res["net"], "internal": res["fill"]["internal"], "external": res["fill"]["external"]}
+    pos = res["position"]
+    if pos is not None:
+        result["virtual_position"] = {"strategy": leg.strategy, "qty": pos["qty"], "avg": pos["avg"]}
+        if pos["closed"] > 0:
+            result["virtual_position"]["realized"] = pos["pnl"]
+            after_exit_update(app.state.r, cfg, leg.strategy, pos["pnl"])
+    f = res["fill"]
+    _record_tca(app, cfg, intent, result, stamps, 1.0 if leg.qty > 0 else -1.0, abs(leg.qty), abs(f["qty"]), f["px"],
+                f["fee"], leg.limit_px, arrival, leg.reduce_only)
+    return res
+
+async def _blocked(app, cfg: Config, logger, client_ip: str, rid):
+    """모든 수신 경로가 가장 먼저 호출: 중지 플래그/대기 인스턴스면 503 응답, 아니면 None."""
+    # 킬 스위치 중지 플래그: 파싱/인증/거래소 호출보다 먼저 (Redis GET 1회)
+    if is_halted(app.state.r) is not None:
+        logd(logger, cfg, "blocked_halted", ip=client_ip, id=rid)
+        return CompactJSONResponse({"status": "halted", "id": rid}, status_code=503)
+    # 대기(standby) 인스턴스: 활성 인스턴스가 죽어 넘어온 요청이면 승격을 잠깐 기다렸다 처리
+    # 421(Misdirected Request): nginx가 다른 인스턴스로 넘기는 유일한 응답 (중지/과부하 503은 그대로 클라이언트로)
+    leader = app.state.leader
+    if not leader.is_leader() and not await leader.wait(cfg.ha_takeover_wait_s):
+        logd(logger, cfg, "blocked_standby", ip=client_ip, id=rid, instance=leader.me)
+        return CompactJSONResponse({"status": "standby", "id": rid, "instance": leader.me}, status_code=421)
+    return None
+
+def _intent(app, cfg: Config, data: Dict[str, Any], client_ip: str, secret: Optional[str] = None):
+    """정규화 + 인증. secret: 배치 상위의 relaySecret (항목에 없을 때 사용)."""
+    logger = app.state.logger
+    # 인증이 먼저: 미인증 요청이 심볼 해석 결과(400 unknown symbol)로 거래 가능 마켓을 떠보지 못하게
+    if cfg.relay_shared_secret and (data.get("relaySecret") or secret) != cfg.relay_shared_secret:
+        logd(logger, cfg, "auth_failed", ip=client_ip, body=redact(data))
+        raise HTTPException(status_code=401, detail="unauthorized")
     try:
-        pos = fetch_positions(ex, sym)
-    except Exception:
-        pos = {}
-        
-    equity_getter = fetch_equity_generic(ex, cfg)
-    equity_amt = equity_getter()
-    regime, meta = get_regime(cfg, app.state.ex, ex_regime, cfg.symbol_fallback, "BTC/USDT:USDT")
-    resp = {
-        "trade": {"exchange": "phemex", "testnet": cfg.trade_testnet, "symbol": sym},
-        "regime_source": {"exchange": cfg.regime_exchange, "testnet": cfg.regime_testnet},
-        "position": {
-            "side": pos.get("side"),
-            "qty": pos.get("contracts"),
-            "entry": pos.get("entryPrice"),
-            "unrealizedPnl": pos.get("unrealizedPnl"),
-        },
-        "regime": regime,
-        "regime_meta": meta,
-        "equity": {
-            "code": cfg.equity_code,        # 예: 'USDT'
-            "source": cfg.equity_source,    # 예: 'free','total'...
-            "amount": jnum(equity_amt)
-        }
-    }
-    return json_sanitize(resp)
+        return normalize_payload(data, cfg.symbol_fallback, app.state.symbols.resolve)
+    except UnknownSymbol as e:
+        logd(logger, cfg, "unknown_symbol", ip=client_ip, id=data.get("id"), symbol=data.get("symbol") or data.get("ticker"))
+        raise HTTPException(400, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
 @router.post("/tv-webhook")
-def tv_webhook(payload: TVPayload, request: Request):
+async def tv_webhook(request: Request, data: Dict[str, Any] = Body(...), verbose: bool = False):
     app = request.app
-    cfg = app.state.cfg; ex = app.state.ex; ex_regime = app.state.ex_regime
-    r   = app.state.r; logger = app.state.logger
+    recv_ts = time.time()
+    # cfg는 요청 시작 시점 스냅샷: 처리 중 핫리로드가 일어나도 이 요청은 같은 설정으로 끝난다
+    cfg = app.state.cfg; logger = app.state.logger
 
     client_ip = getattr(request.client, "host", "unknown")
-    if cfg.relay_shared_secret and payload.relaySecret != cfg.relay_shared_secret:
-        logf(logger, cfg.log_json, "auth_failed", ip=client_ip, body=redact(payload.model_dump(exclude_none=True)))
-        raise HTTPException(status_code=401, detail="unauthorized")
+    blocked = await _blocked(app, cfg, logger, client_ip, data.get("id"))
+    if blocked is not None:
+        return blocked
+
+    intent = _intent(app, cfg, data, client_ip)
+
+    # 어드미션은 멱등 키를 잡기 전에: 거절된 신호는 TradingView/상위 재시도로 다시 들어올 수 있어야 함
+    # 오래된 진입 신호(ADMISSION_MAX_SIGNAL_AGE_S)도 여기서 429 → 어떤 거래소 호출보다 먼저
+    try:
+        async with app.state.admission.slot(intent):
+            # 프로파일러가 무장돼 있고 이 요청이 대상이면 감싼 함수 (아니면 _process 그대로)
+            return await run_in_threadpool(app.state.profiler.wrap(_process, intent.id), app, cfg, intent, data, client_ip,
+                                           verbose or cfg.response_verbose, {"alert": intent.alert_ts, "recv": recv_ts})
+    except HTTPException as e:
+        if str(e.detail).startswith("admission:"):
+            logd(logger, cfg, "admission_rejected", id=intent.id, priority=intent.priority,
+                 status=e.status_code, reason=e.detail, alert_ts=intent.alert_ts)
+        raise
+
+
+def _shared_inputs(app, cfg: Config) -> Dict[str, Any]:
+    """배치 공통 입력: 레짐 스냅샷 1회, 잔고는 처음 필요한 항목에서 1회 (이후 항목은 같은 값). 펀딩은 캐시."""
+    live = fetch_equity_cached(app.state.ex, cfg, app.state.snapshots)
+    lock = threading.Lock()
+    box: List[float] = []
+
+    def equity() -> float:
+        with lock:
+            if not box:
+                box.append(live())
+            return box[0]
+    return {"regime": app.state.regime_engine.snapshot(cfg), "equity": equity}
 
-    data = payload.model_dump(exclude_none=True)
-    tv_id = data.get("id")
-    logf(logger, cfg.log_json, "webhook_received",
-         ip=client_ip, id=tv_id, symbol=data.get("symbol"), action=(data.get("action") or data.get("side")),
-         qty=(data.get("qty") or data.get("amount") or data.get("contracts")), price=data.get("price"))
+def _item_error(rid, e: HTTPException) -> Dict[str, Any]:
+    return {"id": rid, "status": "error", "code": e.status_code, "detail": e.detail}
+
+async def _run_item(app, cfg: Config, intent, data: Dict[str, Any], client_ip: str, verbose: bool,
+                    recv_ts: float, shared: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        async with app.state.admission.slot(intent):
+            res = await run_in_threadpool(app.state.profiler.wrap(_process, intent.id, "tv-webhook/batch"),
+                                          app, cfg, intent, data, client_ip, verbose,
+                                          {"alert": intent.alert_ts, "recv": recv_ts}, shared)
+    except HTTPException as e:
+        if str(e.detail).startswith("admission:"):
+            logd(app.state.logger, cfg, "admission_rejected", id=intent.id, priority=intent.priority,
+                 status=e.status_code, reason=e.detail, alert_ts=intent.alert_ts)
+        return _item_error(intent.id, e)
+    except Exception as e:
+        # _process가 error_processing 로그 + 멱등 키 정리를 이미 함
+        return {"id": intent.id, "status": "error", "code": 500, "detail": str(e)[:200]}
+    finally:
+        # 주문 없이 끝난 항목은 상계 라운드에서 빠짐 (나머지 항목이 기다리지 않게)
+        if not shared.get("joined"):
+            app.state.netting.leave(shared.get("round"))
+    if isinstance(res, Response):        # respond()/_queued() 응답 → 항목 결과로 풀기
+        return {"id": intent.id, "code": res.status_code, **json.loads(res.body)}
+    return {"id": intent.id, "code": 200, **res}
+
+def _rounds(rows: List[Tuple[int, Any, Dict[str, Any]]], netting: bool) -> List[List[Tuple[int, Any, Dict[str, Any]]]]:
+    """같은 심볼 항목을 상계 라운드로: 순서대로, 라운드마다 전략당 한 항목 (상계 꺼짐 → 항목마다 한 라운드)."""
+    out: List[List[Tuple[int, Any, Dict[str, Any]]]] = []
+    for row in rows:
+        if netting and out and all(row[1].strategy != x[1].strategy for x in out[-1]):
+            out[-1].append(row)
+        else:
+            out.append([row])
+    return out
+
+@router.post("/tv-webhook/batch")
+async def tv_webhook_batch(request: Request, body: Any = Body(...), verbose: bool = False):
+    """
+    같은 봉 마감의 여러 알림을 한 요청으로: [payload, ...] 또는 {"relaySecret": ..., "items": [...]}.
+    - 항목마다 id 필수, 멱등/어드미션/게이트는 단건과 동일 (항목별 결과와 code)
+    - 레짐 스냅샷/잔고는 배치당 1회
+    - 심볼이 다른 항목은 동시에, 같은 심볼은 들어온 순서대로 (포지션 의존)
+    - 같은 심볼의 서로 다른 전략 항목은 한 라운드로 동시에 → 상계 데스크가 순수량 주문 하나로 (NETTING_ENABLED)
+    """
+    app = request.app
+    recv_ts = time.time()
+    cfg = app.state.cfg; logger = app.state.logger
+    client_ip = getattr(request.client, "host", "unknown")
+    items = body.get("items") if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        raise HTTPException(400, "batch must be a non-empty array or {items: [...]}")
+    blocked = await _blocked(app, cfg, logger, client_ip, f"batch:{len(items)}")
+    if blocked is not None:
+        return blocked
+    if len(items) > cfg.batch_max_items:
+        raise HTTPException(413, f"batch too large: {len(items)} > {cfg.batch_max_items}")
+    secret = body.get("relaySecret") if isinstance(body, dict) else None
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    groups: Dict[str, List[Tuple[int, Any, Dict[str, Any]]]] = {}
+    for i, data in enumerate(items):
+        rid = data.get("id") if isinstance(data, dict) else None
+        try:
+            if not isinstance(data, dict):
+                raise HTTPException(400, "item must be an object")
+            intent = _intent(app, cfg, data, client_ip, secret)
+            if not intent.id:
+                raise HTTPException(400, "missing id")
+        except HTTPException as e:
+            results[i] = _item_error(rid, e)
+            continue
+        groups.setdefault(intent.symbol, []).append((i, intent, data))
+
+    t0 = time.perf_counter()
+    shared = await run_in_threadpool(_shared_inputs, app, cfg) if groups else None
+    shared_ms = round((time.perf_counter() - t0) * 1000, 2)
+    verbose = verbose or cfg.response_verbose
+
+    desk = app.state.netting
+
+    async def run_item(rnd, i, intent, data):
+        results[i] = await _run_item(app, cfg, intent, data, client_ip, verbose, recv_ts, {**shared, "round": rnd})
+
+    async def run_symbol(rows):
+        for rnd_rows in _rounds(rows, desk.enabled(cfg)):
+            rnd = desk.open_round(rnd_rows[0][1].symbol, len(rnd_rows)) if len(rnd_rows) > 1 else None
+            await asyncio.gather(*(run_item(rnd, *row) for row in rnd_rows))
+    await asyncio.gather(*(run_symbol(rows) for rows in groups.values()))
+
+    total_ms = round((time.time() - recv_ts) * 1000, 2)
+    logd(logger, cfg, "batch_processed", ip=client_ip, count=len(items), symbols=len(groups),
+         shared_ms=shared_ms, total_ms=total_ms, codes=[r["code"] for r in results])
+    return CompactJSONResponse({"count": len(items), "symbols": len(groups), "shared_ms": shared_ms,
+                                "total_ms": total_ms, "results": results})
+
+
+def _process(app, cfg: Config, intent, data: Dict[str, Any], client_ip: str, verbose: bool = False,
+             stamps: Optional[Dict[str, Optional[float]]] = None, shared: Optional[Dict[str, Any]] = None):
+    ex = app.state.ex; r = app.state.r; logger = app.state.logger
+    # alert → recv → start(어드미션 통과) → gate → submit → ack → fill
+    stamps = dict(stamps or {"alert": intent.alert_ts})
+    stamps.setdefault("recv", time.time())
+    stamps["start"] = time.time()
+    snaps = app.state.snapshots
+    tv_id = intent.id
+    logd(logger, cfg, "webhook_received",
+         ip=client_ip, id=tv_id, symbol=intent.tv_symbol, action=intent.side,
+         qty=intent.qty, price=intent.price)
 
     if not idempotency_check(r, tv_id, cfg.idempotency_ttl):
-        logf(logger, cfg.log_json, "ignored_duplicate", id=tv_id)
+        logd(logger, cfg, "ignored_duplicate", id=tv_id)
         return {"status": "duplicate_ignored", "id": tv_id}
 
     server_uid = __import__("uuid").uuid4().hex
-    sym = symbol_from_payload(cfg, data)
-    desired = desired_target_from_payload(data)
-    if desired["mode"] == "none":
-        r.delete(f"idemp:{tv_id}")
-        logf(logger, cfg.log_json, "invalid_payload", id=tv_id, reason="missing_target_or_delta", body=redact(data))
-        raise HTTPException(400, "payload must include action+qty or marketPosition+marketPositionSize")
-
-    # Strategy detection
-    strategy_name = (data.get("strategy") or "").lower()
-    if not strategy_name:
-        sd = side_from_payload(data)
-        strategy_name = "bull" if sd == "buy" else ("bear" if sd == "sell" else "unknown")
-
-    # Regime / global gates
-    regime, reg_meta = get_regime(cfg, app.state.ex, ex_regime, cfg.symbol_fallback, "BTC/USDT:USDT")
-    blocked, dd_meta = daily_dd_blocked(r, cfg.daily_max_dd_usdt)
-    if blocked:
-        r.delete(f"idemp:{tv_id}")
-        logf(logger, cfg.log_json, "blocked_daily_dd", id=tv_id, meta=dd_meta)
-        return {"status":"blocked_daily_dd", "meta": dd_meta}
-
-    cd, until = is_cooldown(r, strategy_name)
-    if cd:
-        r.delete(f"idemp:{tv_id}")
-        logf(logger, cfg.log_json, "blocked_cooldown", id=tv_id, strategy=strategy_name, until_ms=until)
-        return {"status":"blocked_cooldown", "strategy":strategy_name, "until_ms": until}
-
-    # Slippage guard
-    ref_price = float(data.get("price") or 0.0)
+    # 멱등 키를 잡은 뒤의 모든 예외는 아래에서 처리: 주문 기록(persist) 전이면 키를 지워 재전송 허용
+    # (레버리지/포지션 조회의 429·타임아웃·예산 소진·서킷 오픈이 재전송을 중복으로 막지 않게)
+    persisted = False
     try:
-        slippage_guard(cfg, ex, ref_price, sym)
-        limit_px = None
-    except HTTPException as e:
-        if e.status_code == 409:
-            px = get_last_or_mark(ex, sym, cfg.use_mark_price)
-            band = 1.0 + (cfg.max_slippage if (data.get("action","").lower() in ("buy","long")) else -cfg.max_slippage)
-            limit_px = px * band
+        sym = intent.symbol
+        desired = intent.desired()
+        if intent.mode == "none":
+            logd(logger, cfg, "invalid_payload", id=tv_id, reason="missing_target_or_delta", body=redact(data))
+            raise HTTPException(400, "payload must include action+qty or marketPosition+marketPositionSize")
+        if desired["mode"] == "target" and not intent.is_exit and app.state.ledger.tracked(sym):
+            # 목표 포지션은 거래소 순포지션 기준 → 전략별 가상 포지션이 있는 심볼에선 배분할 수 없음
+            logd(logger, cfg, "invalid_payload", id=tv_id, reason="target_on_virtual_symbol", symbol=sym)
+            raise HTTPException(400, f"target mode (marketPosition) not supported on {sym}: strategies hold virtual "
+                                     "positions there, send action+qty")
+
+        strategy_name = intent.strategy
+
+        # Regime / global gates
+        if shared is not None:       # 배치: 공통 레짐 스냅샷
+            regime, reg_meta = app.state.regime_engine.regime_from_state(cfg, shared["regime"], sym)
         else:
+            regime, reg_meta = app.state.regime_engine.regime_for(cfg, sym)
+        blocked, dd_meta = daily_dd_blocked(r, cfg.daily_max_dd_usdt)
+        if blocked:
             r.delete(f"idemp:{tv_id}")
-            raise
-
-    # Regime-based alloc / leverage
-    alloc_by_regime, lev_by_regime = regime_alloc_and_lev(cfg, strategy_name, regime)
-    if alloc_by_regime <= 0.0:
-        r.delete(f"idemp:{tv_id}")
-        logf(logger, cfg.log_json, "blocked_by_regime", id=tv_id, strategy=strategy_name, regime=regime, meta=reg_meta)
-        return {"status":"blocked_by_regime", "strategy":strategy_name, "regime":regime, "meta":reg_meta}
-
-    # leverage set
-    set_leverage_if_needed(ex, sym, data.get("leverage") or lev_by_regime)
+            logd(logger, cfg, "blocked_daily_dd", id=tv_id, meta=dd_meta)
+            return {"status":"blocked_daily_dd", "meta": dd_meta}
 
-    # comment JSON
-    comm = parse_comment_field(data.get("comment"))
-    if "comment" in data:
-        try: comm = json.loads(data["comment"])
-        except: comm = {}
-
-    # sizing
-    sizing   = data.get("sizing")
-    riskPct  = data.get("riskPct")
-    allocPct = alloc_by_regime if data.get("allocPct") is None else data.get("allocPct")
+        cd, until = is_cooldown(r, strategy_name)
+        if cd:
+            r.delete(f"idemp:{tv_id}")
+            logd(logger, cfg, "blocked_cooldown", id=tv_id, strategy=strategy_name, until_ms=until)
+            return {"status":"blocked_cooldown", "strategy":strategy_name, "until_ms": until}
 
-    result: Dict[str,Any] = {"mode": desired["mode"], "server_uid": server_uid, "regime": regime, "regime_meta": reg_meta}
-    order_id = None
+        # Slippage guard
+        ref_price = intent.price or 0.0
+        drifted = False
+        try:
+            slippage_guard(cfg, ex, ref_price, sym, snaps)
+            limit_px = None
+        except HTTPException as e:
+            if e.status_code == 409:
+                drifted = True
+                # 스냅샷 가격으로 409가 났을 수 있으니 한도 가격은 실시간 티커로
+                px = get_last_or_mark(ex, sym, cfg.use_mark_price, snaps)
+                band = 1.0 + (cfg.max_slippage if intent.side == "buy" else -cfg.max_slippage)
+                limit_px = px * band
+            else:
+                raise
 
-    # get current pos (exit detection)
-    pos = fetch_positions(ex, sym)
-    cur_side, cur_qty = current_position_side_qty(pos)
-
-    id_hint   = (data.get("id") or "").upper()
-    mp        = (data.get("marketPosition") or "").lower()
-    prev_mp   = (data.get("prevMarketPosition") or "").lower()
-    side      = desired.get("side")
-
-    looks_exit = (mp == "flat") or ("EXIT" in id_hint) or ((prev_mp == "long" and side == "sell") or (prev_mp == "short" and side == "buy"))
-    if looks_exit:
-        mi = market_info(ex, sym, cfg.symbol_fallback)
-        # 현재 포지션
-        amt_cur = float(cur_qty or 0.0)
-        if amt_cur <= 0:
-            logf(logger, cfg.log_json, "exit_no_position", symbol=sym, side=cur_side, qty=cur_qty)
-            return {"status": "no_position_to_exit", "symbol": sym, "side": cur_side, "qty": cur_qty}
-
-        # 🔹 부분청산 파라미터 해석: qtyPct(%) 또는 amount(절대수량)
-        comm = parse_comment_field(data.get("comment"))
-        pct  = _pick_num(data.get("qtyPct"), (comm or {}).get("qtyPct"), data.get("percent"))
-        amt  = _pick_num(data.get("amount"), data.get("qty"), data.get("contracts"), (comm or {}).get("amount"))
-
-        if pct is not None:
-            pct = max(1.0, min(100.0, float(pct)))
-            amt_for_exit = amt_cur * (pct / 100.0)
-        elif amt is not None:
-            amt_for_exit = min(amt_cur, float(amt))
-        else:
-            # 기본: 전량
-            amt_for_exit = amt_cur
+        # Regime-based alloc / leverage
+        alloc_by_regime, lev_by_regime = regime_alloc_and_lev(cfg, strategy_name, regime)
+        if alloc_by_regime <= 0.0:
+            r.delete(f"idemp:{tv_id}")
+            logd(logger, cfg, "blocked_by_regime", id=tv_id, strategy=strategy_name, regime=regime, meta=reg_meta)
+            return {"status":"blocked_by_regime", "strategy":strategy_name, "regime":regime, "meta":reg_meta}
 
-        # 거래소 스텝 라운딩
-        amt_for_exit = round_step(amt_for_exit, mi["amount_step"])
-        if amt_for_exit <= 0:
-            logf(logger, cfg.log_json, "exit_amount_too_small", symbol=sym, cur_qty=cur_qty, computed=amt_for_exit)
-            return {"status": "no_position_to_exit", "symbol": sym, "side": cur_side, "qty": cur_qty}
+        # leverage set
+        leverage = intent.leverage or lev_by_regime
+        set_leverage_if_needed(ex, sym, leverage, cfg, snaps)
 
-        # 방향 결정 (롱 청산=SELL, 숏 청산=BUY)
-        side_exec = "sell" if cur_side == "long" else "buy"
+        # sizing
+        allocPct = alloc_by_regime if intent.alloc_pct is None else intent.alloc_pct
 
-        logf(logger, cfg.log_json, "exit_reduce_only",
-            id=tv_id, symbol=sym, cur_side=cur_side, cur_qty=cur_qty,
-            exec_side=side_exec, amount=amt_for_exit, mode="partial" if amt_for_exit < amt_cur else "full")
+        result: Dict[str,Any] = {"mode": desired["mode"], "server_uid": server_uid, "cfg_version": cfg.config_version,
+                                 "regime": regime, "regime_meta": reg_meta}
+        order_id = None
 
-        order = create_market_order(ex, sym, side_exec, amt_for_exit, reduce_only=True)
-        order_id = order.get("id")
-        result["order"] = order
+        # get current pos (exit detection)
+        pos = fetch_positions(ex, sym)
+        cur_side, cur_qty = current_position_side_qty(pos)
+
+        if intent.is_exit:
+            mi = market_info(ex, sym, cfg.symbol_fallback)
+            # 현재 포지션
+            amt_cur = float(cur_qty or 0.0)
+            if app.state.ledger.tracked(sym):
+                if app.state.ledger.qty(strategy_name, sym) == 0:
+                    # 도입 전/수동 포지션(어느 전략에도 귀속 안 된 몫)은 이 전략에 먼저 귀속 → 가상 청산으로 기록
+                    _assign_unassigned(app, cfg, intent, cur_side, amt_cur, pos)
+                persisted = True
+                return _exit_virtual(app, cfg, intent, result, stamps, mi, cur_side, cur_qty, verbose, shared)
+            if amt_cur <= 0:
+                logd(logger, cfg, "exit_no_position", symbol=sym, side=cur_side, qty=cur_qty)
+                return {"status": "no_position_to_exit", "symbol": sym, "side": cur_side, "qty": cur_qty}
+
+            # 🔹 부분청산 파라미터 해석: qtyPct(%) 또는 amount(절대수량)
+            pct  = intent.qty_pct
+            amt  = intent.qty
+
+            if pct is not None:
+                pct = max(1.0, min(100.0, float(pct)))
+                amt_for_exit = amt_cur * (pct / 100.0)
+            elif amt is not None:
+                amt_for_exit = min(amt_cur, float(amt))
+            else:
+                # 기본: 전량
+                amt_for_exit = amt_cur
+
+            # 거래소 스텝 라운딩
+            amt_for_exit = round_step(amt_for_exit, mi["amount_step"])
+            if amt_for_exit <= 0:
+                logd(logger, cfg, "exit_amount_too_small", symbol=sym, cur_qty=cur_qty, computed=amt_for_exit)
+                return {"status": "no_position_to_exit", "symbol": sym, "side": cur_side, "qty": cur_qty}
+
+            # 방향 결정 (롱 청산=SELL, 숏 청산=BUY)
+            side_exec = "sell" if cur_side == "long" else "buy"
+
+            logd(logger, cfg, "exit_reduce_only",
+                id=tv_id, symbol=sym, cur_side=cur_side, cur_qty=cur_qty,
+                exec_side=side_exec, amount=amt_for_exit, mode="partial" if amt_for_exit < amt_cur else "full")
+
+            stamps["gate"] = time.time()
+            arrival = arrival_price(snaps, sym, cfg.use_mark_price)
+            persisted = True
+            rec = app.state.outbox.persist(tv_id, sym, side_exec, amt_for_exit, reduce_only=True, strategy=strategy_name)
+            stamps["submit"] = time.time()
+            try:
+                order = app.state.outbox.submit(rec)
+            except ccxt.NetworkError as e:
+                _latency(app, cfg, intent, stamps)
+                return _queued(logger, cfg, tv_id, rec, e)
+            except Exception as e:
+                e.outbox_rec = rec    # 거래소 거절(failed) → 아래에서 기록/키 정리, 재전송 허용
+                raise
+            stamps["ack"] = time.time()
+            order_id = order.get("id")
+            result["order"] = order
 
-        if order_id:
-            last = poll_order_completion(ex, sym, order_id, cfg.recon_retries, cfg.recon_wait)
-            result["order_final"] = last
+            if order_id:
+                last = poll_order_completion(ex, sym, order_id, cfg.recon_retries, cfg.recon_wait)
+                stamps["fill"] = fill_ts(last, app.state.clock, time.time())
+                result["order_final"] = last
+                filled, fill_px, fee = order_fill(last, order, amt_for_exit, 0.0, cfg.taker_fee)
+                _record_tca(app, cfg, intent, result, stamps, 1.0 if side_exec == "buy" else -1.0, amt_for_exit, filled,
+                            fill_px, fee, None, arrival, True)
 
-            # 포지션 스냅샷 갱신/정리
-            pos = fetch_positions(ex, sym)
-            result["final_position"] = {"side": pos.get("side"), "qty": pos.get("contracts"), "entry": pos.get("entryPrice")}
-            logf(logger, cfg.log_json, "webhook_processed_exit", id=tv_id, final_position=result["final_position"])
+                # 포지션 스냅샷 갱신/정리 (증거금이 바뀌었으니 잔고 스냅샷은 폐기)
+                pos = fetch_positions(ex, sym)
+                snaps.put("position", sym, pos); snaps.drop("equity", cfg.equity_code)
+                app.state.sizing_table.invalidate()
+                result["final_position"] = {"side": pos.get("side"), "qty": pos.get("contracts"), "entry": pos.get("entryPrice")}
+                logd(logger, cfg, "webhook_processed_exit", id=tv_id, final_position=result["final_position"])
 
-        return json_sanitize(result)
+            _latency(app, cfg, intent, stamps, result)
+            return respond(result, verbose)
 
-    # ENTRY/DELTA or TARGET flow
-    try:
+        # ENTRY/DELTA or TARGET flow
         if desired["mode"] == "delta":
             side = desired["side"]
+            # 서버 지표(Donchian/ATR): 진입 신호 검증 + SL/TP/ATR 보완 (알림 필드에 의존하지 않음)
+            stop, tp_px, atr = intent.sl, intent.tp, intent.atr
+            ind = app.state.indicators.get(sym)
+            if ind is not None:
+                ref_px = intent.entry or intent.price or ind["close"]
+                reason = None
+                if cfg.indicator_validate != "off" and not intent.reduce_only:
+                    reason = validate_breakout(side, ref_px, ind, cfg.indicator_validate_tol,
+                                               intent.alert_ts or stamps["recv"],
+                                               timeframe_seconds(cfg.indicator_timeframe))
+                if reason:
+                    logd(logger, cfg, "indicator_mismatch", id=tv_id, symbol=sym, side=side, price=ref_px,
+                         reason=reason, mode=cfg.indicator_validate, indicator=ind)
+                    if cfg.indicator_validate == "enforce":
+                        r.delete(f"idemp:{tv_id}")
+                        return {"status": "blocked_by_indicator", "reason": reason, "indicator": ind}
+                lv = derive_levels(side, ref_px, ind["atr"], cfg.indicator_sl_atr_x, cfg.indicator_tp_atr_x)
+                if cfg.indicator_levels == "override":
+                    stop, tp_px, atr = lv["sl"] or stop, lv["tp"] or tp_px, ind["atr"]
+                else:
+                    stop, tp_px, atr = stop or lv["sl"], tp_px or lv["tp"], atr or ind["atr"]
+                result["indicator"] = {"don_high": ind["don_high"], "don_low": ind["don_low"], "atr": ind["atr"],
+                                       "ema": ind["ema"], "bar_ts": ind["ts"], "sl": stop, "tp": tp_px,
+                                       "valid": reason is None}
+
             if cfg.server_sizing and desired.get("amount") is None:
-                entry_px = float(data.get("price") or comm.get("entry") or 0.0)
-                from .balance import fetch_equity_generic  # local import to avoid cycles
-                amt = compute_amount_server(cfg, ex, sym, side, entry_px, comm, sizing, riskPct, allocPct, data.get("leverage") or lev_by_regime, fetch_equity_generic(ex, cfg))
+                entry_px = intent.price or intent.entry or 0.0
+                row = app.state.sizing_table.row(cfg, strategy_name, sym, regime, allocPct, leverage)
+                result["sizing_source"] = "table" if row is not None else "live"
+                if row is not None:
+                    px = entry_px or get_last_or_mark(ex, sym, cfg.use_mark_price, snaps, cfg.snapshot_price_max_age_s)
+                    amt = amount_from_row(cfg, row, px, stop, intent.sizing, intent.risk_pct)
+                else:
+                    amt = compute_amount_server(cfg, ex, sym, side, entry_px, stop, intent.sizing, intent.risk_pct, allocPct, leverage,
+                                                shared["equity"] if shared is not None else fetch_equity_cached(ex, cfg, snaps), snaps)
             else:
                 # use explicit amount (with fee buffer + rounding)
                 mi = market_info(ex, sym, cfg.symbol_fallback)
@@ -286,14 +483,11 @@ def tv_webhook(payload: TVPayload, request: Request):
                 if amt <= 0:
                     raise HTTPException(400, "amount too small after buffer/rounding")
 
-            fr       = fetch_phemex_funding_rate(ex, sym)
+            fr       = app.state.funding.get(sym)     # 캐시 (네트워크 없음)
             # ---- ENTRY/SL/TP 픽 (없으면 보정) ----
-            entry_px = _pick_num(data.get("entry"), (comm or {}).get("entry"), data.get("price"))
+            entry_px = intent.entry if intent.entry is not None else intent.price
             if entry_px is None:
-                entry_px = get_last_or_mark(ex, sym, cfg.use_mark_price)
-
-            sl_px    = _pick_num(data.get("sl"),    (comm or {}).get("sl"))
-            tp_px    = _pick_num(data.get("tp"),    (comm or {}).get("tp"))
+                entry_px = get_last_or_mark(ex, sym, cfg.use_mark_price, snaps, cfg.snapshot_price_max_age_s)
 
             # ---- TP 정책 (env/Config로 제어) ----
             edge_require_tp   = bool(getattr(cfg, "edge_require_tp", False))
@@ -305,7 +499,7 @@ def tv_webhook(payload: TVPayload, request: Request):
             if tp_px is not None and tp_px > 0:
                 tp_arg = tp_px
             elif edge_allow_derive:
-                tp_arg = _derive_tp_from_atr(side, float(entry_px), comm, edge_atr_tp_x)
+                tp_arg = _derive_tp_from_atr(side, float(entry_px), atr, edge_atr_tp_x)
 
             # --- edge 계산/게이트 ---
             EDGE_FILTER   = bool(getattr(cfg, "edge_filter_enabled", False))
@@ -315,22 +509,22 @@ def tv_webhook(payload: TVPayload, request: Request):
                 if tp_arg is None:
                     if edge_require_tp:
                         app.state.r.delete(f"idemp:{tv_id}")
-                        logf(logger, cfg.log_json, "blocked_by_edge",
+                        logd(logger, cfg, "blocked_by_edge",
                              id=tv_id, reason="no_tp", entry=entry_px, amount=amt)
                         return {"status":"blocked_by_edge","reason":"no_tp",
                                 "entry":entry_px,"amount":amt}
                     else:
                         # TP 없이 스킵 허용 (로그만 남김)
-                        logf(logger, cfg.log_json, "edge_skip_no_tp",
+                        logd(logger, cfg, "edge_skip_no_tp",
                              id=tv_id, entry=entry_px, amount=amt)
                 else:
                     edge = expected_edge_usdt(
                         cfg, side, float(entry_px), float(tp_arg), amt,
-                        int(data.get("leverage") or lev_by_regime), fr
+                        int(leverage), fr
                     )
                     if edge is None or edge <= MIN_EDGE_USDT:
                         app.state.r.delete(f"idemp:{tv_id}")
-                        logf(logger, cfg.log_json, "blocked_by_edge",
+                        logd(logger, cfg, "blocked_by_edge",
                              id=tv_id, edge=edge, entry=entry_px, tp=tp_arg, amount=amt, fr=fr)
                         return {"status":"blocked_by_edge","edge":edge,
                                 "entry":entry_px,"tp":tp_arg,"amount":amt,"fr":fr}
@@ -338,34 +532,135 @@ def tv_webhook(payload: TVPayload, request: Request):
             # ✅ 중복 edge 계산 줄을 반드시 제거하세요.
             # edge = expected_edge_usdt(cfg, side, entry_px, tp_px if tp_px>0 else None, amt, int(data.get("leverage") or lev_by_regime), fr)
 
-            ro = bool(data.get("reduceOnly", False))
-            ps_hint = "long" if side == "buy" else "short"
-            order = create_market_order(
-                ex, sym, side, amt,
-                reduce_only=ro,
-                limit_px=limit_px,
-                cfg=cfg             # ← 이제 정상 동작
-            )
-            order_id = order.get("id")
-            result["order"] = order
-            if order_id:
-                last = poll_order_completion(ex, sym, order_id, cfg.recon_retries, cfg.recon_wait)
-                result["order_final"] = last
-                filled_avg = float((last or {}).get("average") or (last or {}).get("price") or 0.0) or entry_px
-                if not ro:  # open entry
-                    save_open_entry(app.state.r, strategy_name, side, filled_avg, float(amt))
+            # 호가 깊이: 실제 수량의 예상 VWAP/임팩트로 IOC 한도가 (호가 없으면 위의 가격 밴드 한도 유지)
+            est = app.state.orderbook.estimate(sym, side, float(amt))
+            if est is not None:
+                limit_px = depth_limit_px(cfg, side, est, drifted)
+                result["depth"] = {k: est[k] for k in ("vwap", "worst", "mid", "impact", "filled", "levels", "age_s")}
+                logd(logger, cfg, "depth_estimate", id=tv_id, symbol=sym, side=side, amount=amt,
+                     limit_px=limit_px, drifted=drifted, **result["depth"])
+
+            stamps["gate"] = time.time()
+            # 여기서부터는 아웃박스가 주문을 책임짐 → 실패해도 멱등 키 유지 (재전송이 게이트를 다시 돌지 않게)
+            # 상계 데스크: 같은 심볼 동시 신호와 묶여 순수량 주문 하나로 나갈 수 있음, 체결은 전략 가상 포지션에 배분
+            persisted = True
+            leg = Leg(strategy_name, tv_id, float(amt) if side == "buy" else -float(amt), intent.reduce_only, limit_px)
+            try:
+                _execute_leg(app, cfg, intent, leg, stamps, result, shared)
+            except ccxt.NetworkError as e:
+                if getattr(e, "outbox_rec", None) is None:
+                    raise
+                _latency(app, cfg, intent, stamps)
+                return _queued(logger, cfg, tv_id, e.outbox_rec, e)
 
         elif desired["mode"] == "target":
-            result["pre_position"] = fetch_positions(ex, sym)
-            recon = reconcile_target(ex, sym, desired)
+            if not app.state.leader.fence():
+                raise NotLeader("fenced: leadership lost before reconcile")
+            stamps["gate"] = stamps["submit"] = time.time()
+            # 스냅샷 1회 → 반올림 차이 주문 → 체결 확인 → 수렴 검증 (반복 기록은 reconcile.iterations)
+            # 주문은 아웃박스 경유 → 제출 대기 기록이 남으면 멱등 키 유지 (재전송이 스윕과 함께 다시 맞추지 않게)
+            persisted = True
+            try:
+                recon = reconcile_target(ex, sym, desired, cfg, app.state.outbox, tv_id)
+            except ccxt.NetworkError as e:
+                if getattr(e, "outbox_rec", None) is None:
+                    raise
+                _latency(app, cfg, intent, stamps)
+                return _queued(logger, cfg, tv_id, e.outbox_rec, e)
+            stamps["ack"] = stamps["fill"] = time.time()
+            result["pre_position"] = recon["iterations"][0]["before"] if recon["iterations"] else recon["current"]["legs"]
             result["reconcile"] = recon
+            if not recon["converged"]:
+                logd(logger, cfg, "reconcile_not_converged", id=tv_id, symbol=sym, target=recon["target"],
+                     current=recon["current"], iterations=len(recon["iterations"]))
 
         pos = fetch_positions(ex, sym)
+        snaps.put("position", sym, pos); snaps.drop("equity", cfg.equity_code)
+        app.state.sizing_table.invalidate()
         result["final_position"] = {"side": pos.get("side"), "qty": pos.get("contracts"), "entry": pos.get("entryPrice")}
-        logf(logger, cfg.log_json, "webhook_processed", id=tv_id, uid=server_uid, final_position=result["final_position"])
-        return json_sanitize(result)
+        logd(logger, cfg, "webhook_processed", id=tv_id, uid=server_uid, final_position=result["final_position"])
+        _latency(app, cfg, intent, stamps, result)
+        return respond(result, verbose)
 
     except Exception as e:
-        app.state.r.delete(f"idemp:{tv_id}")
-        logf(logger, cfg.log_json, "error_processing", id=tv_id, uid=server_uid, error=str(e))
+        # 접수됐거나(acked) 재시도 중(pending)인 주문이 있으면 멱등 키 유지 → 재전송이 중복 주문을 만들지 않음
+        # 거래소가 거절(failed)했으면 기존처럼 키를 지워 재전송 허용
+        rec = getattr(e, "outbox_rec", None)
+        if persisted and (rec is None or rec.get("state") == "failed"):
+            if rec is not None:
+                app.state.outbox.forget(rec["cid"])
+            persisted = False
+        if not persisted:
+            app.state.r.delete(f"idemp:{tv_id}")
+        logd(logger, cfg, "error_processing", id=tv_id, uid=server_uid, error=str(e), persisted=persisted)
         raise
+
+
+def _assign_unassigned(app, cfg: Config, intent, cur_side, cur_qty: float, pos: Dict[str, Any]) -> float:
+    """
+    거래소 순포지션 중 가상 포지션에 귀속되지 않은 몫(거래소 포지션 방향, 다른 전략 몫 제외)을 이 전략에 귀속.
+    가격은 거래소 진입가 (/admin/ledger/assign과 같음). 귀속한 부호 있는 수량 반환.
+    """
+    sym = intent.symbol
+    p = cur_qty * (1.0 if cur_side == "long" else -1.0)
+    vnet = app.state.ledger.net(sym)
+    drift = p - vnet
+    free = min(abs(drift), abs(p)) if p * drift > 0 else 0.0
+    if abs(drift) > 1e-12:
+        logd(app.state.logger, cfg, "exit_unassigned", id=intent.id, symbol=sym, strategy=intent.strategy,
+             exchange_qty=p, virtual_net=vnet, drift=drift, assigned=free)
+    if free <= 0:
+        return 0.0
+    px = float(pos.get("entryPrice") or 0.0) or get_last_or_mark(app.state.ex, sym, cfg.use_mark_price, app.state.snapshots)
+    q = free if p > 0 else -free
+    app.state.ledger.apply(intent.strategy, sym, q, px)
+    return q
+
+
+def _exit_virtual(app, cfg: Config, intent, result: Dict[str, Any], stamps: Dict[str, Optional[float]], mi: Dict[str, Any],
+                  cur_side, cur_qty, verbose: bool, shared: Optional[Dict[str, Any]]):
+    """
+    가상 포지션이 기록된 심볼의 청산: 거래소 포지션이 아니라 이 전략의 가상 수량 기준 (다른 전략 몫은 그대로).
+    원웨이에서 다른 전략의 반대 포지션과 상계돼 거래소 순포지션을 줄이지 않는 청산은 reduce-only가 아님.
+    """
+    ex = app.state.ex; logger = app.state.logger; snaps = app.state.snapshots
+    sym, tv_id, strategy_name = intent.symbol, intent.id, intent.strategy
+    vq = app.state.ledger.qty(strategy_name, sym)
+    base = abs(vq)
+    if intent.qty_pct is not None:
+        amt_for_exit = base * (max(1.0, min(100.0, float(intent.qty_pct))) / 100.0)
+    elif intent.qty is not None:
+        amt_for_exit = min(base, float(intent.qty))
+    else:
+        amt_for_exit = base
+    amt_for_exit = round_step(amt_for_exit, mi["amount_step"])
+    if amt_for_exit <= 0:
+        logd(logger, cfg, "exit_no_position", symbol=sym, strategy=strategy_name, virtual_qty=vq,
+             side=cur_side, qty=cur_qty)
+        return {"status": "no_position_to_exit", "symbol": sym, "strategy": strategy_name, "virtual_qty": vq,
+                "side": cur_side, "qty": cur_qty}
+
+    d = -amt_for_exit if vq > 0 else amt_for_exit
+    p = float(cur_qty or 0.0) * (1.0 if cur_side == "long" else -1.0)
+    ro = True if cfg.phemex_hedged else (p * d < 0 and abs(d) <= abs(p) + 1e-12)
+    logd(logger, cfg, "exit_virtual", id=tv_id, symbol=sym, strategy=strategy_name, virtual_qty=vq,
+         exchange_qty=p, exec_side="buy" if d > 0 else "sell", amount=amt_for_exit, reduce_only=ro,
+         mode="partial" if amt_for_exit < base else "full")
+
+    stamps["gate"] = time.time()
+    try:
+        _execute_leg(app, cfg, intent, Leg(strategy_name, tv_id, d, ro, None), stamps, result, shared)
+    except ccxt.NetworkError as e:
+        if getattr(e, "outbox_rec", None) is None:
+            raise
+        _latency(app, cfg, intent, stamps)
+        return _queued(logger, cfg, tv_id, e.outbox_rec, e)
+
+    pos = fetch_positions(ex, sym)
+    snaps.put("position", sym, pos); snaps.drop("equity", cfg.equity_code)
+    app.state.sizing_table.invalidate()
+    result["final_position"] = {"side": pos.get("side"), "qty": pos.get("contracts"), "entry": pos.get("entryPrice")}
+    logd(logger, cfg, "webhook_processed_exit", id=tv_id, final_position=result["final_position"],
+         virtual_position=result.get("virtual_position"))
+    _latency(app, cfg, intent, stamps, result)
+    return respond(result, verbose)
@@ -0,0 +1,104 @@
+"""
+웹훅 페이로드 파싱 비용 마이크로벤치마크.
+
+    python -m bench.bench_intent [-n 20000]
+
+legacy: 기존 tv_webhook 경로(comment 3회 파싱 + symbol/side/qty 재유도)를 재현
+intent: app.intent.normalize_payload 단일 패스
+(pydantic model_dump 비용은 포함하지 않음 → legacy 측이 실제보다 유리하게 측정됨)
+"""
+import argparse, json, math, time
+
+from app.intent import normalize_payload
+from app.parsers import parse_comment_field
+from app.symbols import tv_to_ccxt_symbol
+
+FALLBACK = "ETH/USDT:USDT"
+
+PAYLOADS = {
+    "entry": {
+        "id": "BULL-LONG-1700000000", "symbol": "PHEMEX:ETHUSDT.P", "action": "buy", "price": 2345.6,
+        "strategy": "BULL", "relaySecret": "x", "timestamp": "2024-01-01T00:05:00Z",
+        "comment": '{"entry":2345.6,"sl":2301.2,"tp":2425.4,"atr":17.73}',
+    },
+    "exit_partial": {
+        "id": "BULL-TP1-1700000300", "symbol": "ETHUSDT", "action": "sell", "prevMarketPosition": "long",
+        "qtyPct": 50, "price": 2370.1, "comment": "{entry:2345.6, sl:2301.2, tp:2425.4}",
+    },
+    "target": {
+        "id": "T-1", "ticker": "BTCUSDT", "marketPosition": "short", "marketPositionSize": "0.01",
+    },
+}
+
+
+def _pick_num(*vals):
+    for v in vals:
+        if v is None:
+            continue
+        try:
+            f = float(v)
+            if math.isfinite(f):
+                return f
+        except Exception:
+            pass
+    return None
+
+
+def legacy(data):
+    tv_sym = data.get("symbol") or data.get("ticker")
+    sym = (tv_to_ccxt_symbol(str(tv_sym)) if tv_sym else None) or FALLBACK
+    action = (data.get("side") or data.get("action") or "").lower()
+    side = "buy" if action in ("buy", "long") else ("sell" if action in ("sell", "short") else None)
+    mp = (data.get("marketPosition") or "").lower()
+    mps = data.get("marketPositionSize")
+    qty = data.get("qty") or data.get("amount") or data.get("contracts")
+    if mp in ("long", "short", "flat") and mps is not None:
+        desired = {"mode": "target", "marketPosition": mp, "size": float(mps)}
+    elif side:
+        desired = {"mode": "delta", "side": side, "amount": float(qty) if qty is not None else None}
+    else:
+        desired = {"mode": "none"}
+    strategy = (data.get("strategy") or "").lower() or ("bull" if side == "buy" else "bear")
+    comm = parse_comment_field(data.get("comment"))
+    if "comment" in data:
+        try: comm = json.loads(data["comment"])
+        except Exception: comm = {}
+    prev_mp = (data.get("prevMarketPosition") or "").lower()
+    looks_exit = mp == "flat" or "EXIT" in (data.get("id") or "").upper() or (prev_mp == "long" and side == "sell")
+    if looks_exit:
+        comm = parse_comment_field(data.get("comment"))
+        _pick_num(data.get("qtyPct"), comm.get("qtyPct"), data.get("percent"))
+        _pick_num(data.get("amount"), data.get("qty"), data.get("contracts"), comm.get("amount"))
+    else:
+        _pick_num(data.get("entry"), comm.get("entry"), data.get("price"))
+        _pick_num(data.get("sl"), comm.get("sl"))
+        _pick_num(data.get("tp"), comm.get("tp"))
+    return sym, side, desired, strategy
+
+
+def intent(data):
+    return normalize_payload(data, FALLBACK)
+
+
+def bench(fn, payload, n):
+    for _ in range(min(n, 1000)):
+        fn(payload)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(payload)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=20000)
+    args = ap.parse_args()
+    print(f"{'payload':<14}{'legacy_us':>11}{'intent_us':>11}{'speedup':>9}")
+    for name, p in PAYLOADS.items():
+        a = bench(legacy, p, args.n)
+        b = bench(intent, p, args.n)
+        print(f"{name:<14}{a:>11.2f}{b:>11.2f}{a / b:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
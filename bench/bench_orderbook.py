@@ -0,0 +1,48 @@
+"""
+L2 호가 sweep(예상 VWAP/임팩트) 마이크로벤치마크.
+
+    python -m bench.bench_orderbook [-n 20000] [--levels 30]
+
+clean : 변경 없는 호가에서 sweep (정렬 캐시 사용)
+dirty : 매번 델타 1건 적용 후 sweep (정렬 재계산 포함, 실시간 피드와 같은 최악 경로)
+"""
+import argparse, random, time
+
+from app.orderbook import L2Book
+
+
+def make_book(levels: int) -> L2Book:
+    b = L2Book("ETH/USDT:USDT")
+    bids = [[f"{2000 - i * 0.5:.2f}", f"{random.uniform(0.1, 5):.3f}"] for i in range(levels)]
+    asks = [[f"{2000.5 + i * 0.5:.2f}", f"{random.uniform(0.1, 5):.3f}"] for i in range(levels)]
+    b.snapshot(bids, asks, 1)
+    return b
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=20000)
+    ap.add_argument("--levels", type=int, default=30)
+    args = ap.parse_args()
+    random.seed(7)
+    b = make_book(args.levels)
+    total = sum(q for _, q in b.levels("asks"))
+    for frac in (0.01, 0.25, 1.0):
+        amt = total * frac
+        t0 = time.perf_counter()
+        for _ in range(args.n):
+            est = b.sweep("buy", amt)
+        us = (time.perf_counter() - t0) / args.n * 1e6
+        print(f"clean  amount={amt:9.3f} levels={est['levels']:3d} {us:7.2f} us/op  impact={est['impact'] * 1e4:.2f}bp")
+    seq = 1
+    t0 = time.perf_counter()
+    for i in range(args.n):
+        seq += 1
+        b.delta([], [[f"{2000.5 + (i % args.levels) * 0.5:.2f}", "1.0"]], seq)
+        est = b.sweep("buy", total * 0.25)
+    us = (time.perf_counter() - t0) / args.n * 1e6
+    print(f"dirty  amount={total * 0.25:9.3f} levels={est['levels']:3d} {us:7.2f} us/op (delta + resort + sweep)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+웹훅 응답 직렬화 비용/크기 마이크로벤치마크.
+
+    python -m bench.bench_serialize [-n 5000]
+
+legacy : json_sanitize(결과) → FastAPI 기본 경로(jsonable_encoder + json.dumps)
+compact: app.serialize.compact + dumps (orjson)
+verbose: app.serialize.respond(verbose=True) 와 같은 원본 출력
+*_std  : 같은 투영/정리 + 표준 json 인코더 (orjson 기여분 비교용)
+
+NaN 포함 결과(예: ccxt liquidationPrice=nan)는 legacy 경로에서 json_sanitize의 json.dumps가
+allow_nan=True로 통과시키고 응답 렌더링(allow_nan=False)에서 ValueError → 500이 난다.
+시간 비교는 NaN 없는 결과로 하고, NaN 처리 여부는 마지막에 따로 확인한다.
+"""
+import argparse, json, math, time
+
+from fastapi.encoders import jsonable_encoder
+
+from app import serialize
+
+# Phemex 주문 info는 40여 개 필드 (ccxt 4.x 실제 응답 축약 재현)
+_INFO = {f"field{i}": ("x" * 12 if i % 3 else i * 1.5) for i in range(40)}
+_INFO.update({"orderID": "b3d4c0de-0000-4000-8000-000000000000", "clOrdID": "", "symbol": "ETHUSDT",
+              "side": "Buy", "ordType": "Market", "priceRp": "2345.6", "orderQtyRq": "0.14"})
+
+ORDER = {
+    "id": "b3d4c0de-0000-4000-8000-000000000000", "clientOrderId": None, "timestamp": 1700000000000,
+    "datetime": "2023-11-14T22:13:20.000Z", "lastTradeTimestamp": None, "symbol": "ETH/USDT:USDT",
+    "type": "market", "timeInForce": "IOC", "postOnly": False, "reduceOnly": False, "side": "buy",
+    "price": 2345.6, "stopPrice": None, "triggerPrice": None, "amount": 0.14, "cost": 328.38,
+    "average": 2345.6, "filled": 0.14, "remaining": 0.0, "status": "closed",
+    "fee": {"cost": 0.197, "currency": "USDT"}, "trades": [], "fees": [{"cost": 0.197, "currency": "USDT"}],
+    "takeProfitPrice": None, "stopLossPrice": None, "info": _INFO,
+}
+POSITION = {
+    "symbol": "ETH/USDT:USDT", "side": "long", "contracts": 0.14, "contractSize": 1.0, "entryPrice": 2345.6,
+    "markPrice": 2346.0, "notional": 328.4, "leverage": 5.0, "unrealizedPnl": 0.05, "liquidationPrice": 1890.2,
+    "marginMode": "cross", "info": dict(list(_INFO.items())[:30]),
+}
+RESULT = {
+    "mode": "delta", "server_uid": "0f" * 16, "cfg_version": 3, "regime": "bull",
+    "regime_meta": {"base": "bull", "scope": "basket", "symbol": "ETH/USDT:USDT", "symbol_regime": "bull",
+                    "basket": "bull", "px": 2345.6, "ema": 2210.1, "atr": 17.7, "rv": 0.61, "funding": 0.0001,
+                    "funding_symbol": "ETH/USDT:USDT", "vix": 14.2, "vix_age_s": 12.0, "gated": False,
+                    "reason": None, "age_s": 3.1, "eval_ms": 0.4,
+                    "source": {"exchange": "binance", "testnet": False, "timeframe": "4h"}},
+    "sizing_source": "table",
+    "order": ORDER, "order_final": dict(ORDER), "pre_position": POSITION,
+    "final_position": {"side": "long", "qty": 0.14, "entry": 2345.6},
+}
+
+
+def json_sanitize(obj):
+    # 기존 app/webhook.py 구현
+    try:
+        _ = json.dumps(obj); return obj
+    except Exception:
+        def clean(x):
+            if isinstance(x, float):
+                if math.isfinite(x): return x
+                return None
+            if isinstance(x, dict):
+                return {k: clean(v) for k, v in x.items()}
+            if isinstance(x, list):
+                return [clean(v) for v in x]
+            return x
+        return clean(obj)
+
+
+def legacy(res):
+    return json.dumps(jsonable_encoder(json_sanitize(res)), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def compact(res):
+    return serialize.dumps(serialize.compact(res))
+
+
+def verbose(res):
+    return serialize.CompactJSONResponse(res).body
+
+
+def _std_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def compact_std(res):
+    return _std_dumps(serialize.compact(res))
+
+
+def verbose_std(res):
+    return _std_dumps(serialize.clean(res))
+
+
+def bench(fn, payload, n):
+    for _ in range(min(n, 500)):
+        fn(payload)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        out = fn(payload)
+    return (time.perf_counter() - t0) / n * 1e6, len(out)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=5000)
+    args = ap.parse_args()
+    rows = [("legacy", legacy), ("compact", compact), ("verbose", verbose),
+            ("compact_std", compact_std), ("verbose_std", verbose_std)]
+    base_us, base_b = bench(legacy, RESULT, args.n)
+    print(f"{'variant':<13}{'us/op':>9}{'bytes':>8}{'speedup':>9}{'size':>7}")
+    for name, fn in rows:
+        us, b = bench(fn, RESULT, args.n)
+        print(f"{name:<13}{us:>9.2f}{b:>8}{base_us / us:>8.2f}x{b / base_b:>6.0%}")
+
+    nan_res = {**RESULT, "pre_position": {**POSITION, "liquidationPrice": float("nan")}}
+    for name, fn in [("legacy", legacy)] + rows[1:]:
+        try:
+            fn(nan_res); ok = "ok"
+        except ValueError as e:
+            ok = f"ValueError ({e})"
+        print(f"nan/{name:<9} {ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# tests/test_intent.py
+import pytest
+
+from app.intent import normalize_payload
+
+SYM = "ETH/USDT:USDT"
+
+
+def test_exit_qty_precedence_is_amount_qty_contracts():
+    i = normalize_payload({"id": "x", "symbol": "ETHUSDT", "action": "sell", "prevMarketPosition": "long",
+                           "amount": 0.2, "qty": 0.3, "contracts": 0.4}, SYM)
+    assert i.is_exit and i.qty == pytest.approx(0.2)
+
+
+def test_entry_qty_precedence_is_qty_amount():
+    i = normalize_payload({"id": "x", "symbol": "ETHUSDT", "action": "buy", "amount": 0.2, "qty": 0.3}, SYM)
+    assert not i.is_exit and i.side == "buy" and i.qty == pytest.approx(0.3)
+
+
+def test_top_level_fields_win_over_comment():
+    i = normalize_payload({"id": "x", "symbol": "ETHUSDT", "action": "buy", "price": "2000", "sl": 1940,
+                           "comment": '{"entry": 1990, "sl": 1950}'}, SYM)
+    assert i.price == 2000.0 and i.entry == 1990.0 and i.sl == 1940.0
+
+
+def test_target_mode_desired():
+    i = normalize_payload({"id": "x", "symbol": "ETHUSDT", "marketPosition": "long", "marketPositionSize": 1}, SYM)
+    assert i.desired() == {"mode": "target", "marketPosition": "long", "size": 1.0}
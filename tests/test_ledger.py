@@ -0,0 +1,61 @@
+# tests/test_ledger.py
+import fakeredis
+import pytest
+
+from app.ledger import Leg, Ledger, allocate, net_legs
+
+
+def _leg(strategy, qty):
+    return Leg(strategy, f"{strategy}-1", qty, False, None)
+
+
+def test_net_legs_crosses_opposite_legs():
+    legs = [_leg("bull", 1.0), _leg("bear", -0.4)]
+    net, split = net_legs(legs)
+    assert net == pytest.approx(0.6)
+    assert split[0] == pytest.approx((0.4, 0.6))      # bull: 0.4 상계 + 0.6 거래소
+    assert split[1] == pytest.approx((-0.4, 0.0))     # bear: 전부 상계
+
+
+def test_allocate_full_fill_charges_fee_to_external_legs_only():
+    legs = [_leg("bull", 1.0), _leg("bear", -0.4)]
+    net, split = net_legs(legs)
+    bull, bear = allocate(legs, split, net, filled=0.6, avg_px=2010.0, fee=0.72, cross_px=2000.0)
+    assert bull["qty"] == pytest.approx(1.0)
+    assert bull["px"] == pytest.approx((0.4 * 2000.0 + 0.6 * 2010.0) / 1.0)
+    assert bull["fee"] == pytest.approx(0.72)
+    assert bear["qty"] == pytest.approx(-0.4)
+    assert bear["px"] == pytest.approx(2000.0)
+    assert bear["fee"] == 0.0
+
+
+def test_allocate_partial_fill_is_pro_rata():
+    legs = [_leg("a", 0.3), _leg("b", 0.1)]
+    net, split = net_legs(legs)
+    a, b = allocate(legs, split, net, filled=0.2, avg_px=100.0, fee=0.4, cross_px=100.0)
+    assert a["qty"] == pytest.approx(0.15) and b["qty"] == pytest.approx(0.05)
+    assert a["fee"] == pytest.approx(0.3) and b["fee"] == pytest.approx(0.1)
+    assert a["fee"] + b["fee"] == pytest.approx(0.4)
+
+
+def test_allocate_fully_crossed_round_has_no_order_and_no_fee():
+    legs = [_leg("bull", 0.3), _leg("bear", -0.3)]
+    net, split = net_legs(legs)
+    assert net == pytest.approx(0.0)
+    fills = allocate(legs, split, 0.0, filled=0.0, avg_px=1900.0, fee=0.0, cross_px=1900.0)
+    assert [f["qty"] for f in fills] == pytest.approx([0.3, -0.3])
+    assert [f["external"] for f in fills] == pytest.approx([0.0, 0.0])
+    assert all(f["fee"] == 0.0 and f["px"] == 1900.0 for f in fills)
+
+
+def test_ledger_apply_realizes_pnl_and_flips():
+    led = Ledger(fakeredis.FakeRedis())
+    led.apply("bull", "ETH", 1.0, 2000.0)
+    part = led.apply("bull", "ETH", -0.4, 2100.0, fee=1.0)
+    assert part["closed"] == pytest.approx(0.4)
+    assert part["pnl"] == pytest.approx(0.4 * 100.0 - 1.0)
+    assert part["qty"] == pytest.approx(0.6) and part["avg"] == pytest.approx(2000.0)
+    flip = led.apply("bull", "ETH", -1.0, 1900.0)
+    assert flip["qty"] == pytest.approx(-0.4) and flip["avg"] == pytest.approx(1900.0)
+    assert led.net("ETH") == pytest.approx(-0.4)
+    assert led.tracked("ETH") and not led.tracked("BTC")
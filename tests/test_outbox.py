@@ -0,0 +1,95 @@
+# tests/test_outbox.py
+import ccxt
+import fakeredis
+import pytest
+
+from app.config import Config
+from app.outbox import Outbox, PENDING_KEY, client_order_id
+
+
+class FakeEx:
+    """clientOrderId로 주문을 기억하는 최소 거래소. lose_acks 회 만큼은 접수 후 응답을 잃어버림(타임아웃)."""
+    def __init__(self, lose_acks=0, reject=None):
+        self.orders = {}
+        self.creates = 0
+        self.lookups = 0
+        self.lose_acks = lose_acks
+        self.reject = reject
+
+    def create_order(self, sym, typ, side, amount, price=None, params={}):
+        self.creates += 1
+        if self.reject is not None:
+            raise self.reject
+        cid = params["clientOrderId"]
+        o = {"id": str(len(self.orders) + 1), "clientOrderId": cid, "symbol": sym, "side": side,
+             "amount": amount, "filled": amount, "status": "closed"}
+        self.orders[cid] = o
+        if self.lose_acks > 0:
+            self.lose_acks -= 1
+            raise ccxt.RequestTimeout("read timeout")
+        return o
+
+    def fetch_order(self, oid, sym=None, params={}):
+        self.lookups += 1
+        o = self.orders.get(params.get("clientOrderId"))
+        if o is None:
+            raise ccxt.OrderNotFound("no such order")
+        return o
+
+
+def _cfg(**kw):
+    env = {"OUTBOX_INLINE_ATTEMPTS": "3", "OUTBOX_MAX_ATTEMPTS": "6", "OUTBOX_BACKOFF_S": "0",
+           "OUTBOX_BACKOFF_MAX_S": "0"}
+    env.update({k.upper(): str(v) for k, v in kw.items()})
+    return Config.from_mapping(env)
+
+
+@pytest.fixture
+def r():
+    return fakeredis.FakeRedis()
+
+
+def test_persist_is_idempotent(r):
+    ob = Outbox(r, FakeEx(), _cfg)
+    a = ob.persist("sig-1", "ETH/USDT:USDT", "buy", 0.5)
+    b = ob.persist("sig-1", "ETH/USDT:USDT", "buy", 0.7)
+    assert a["cid"] == b["cid"] == client_order_id("sig-1")
+    assert float(ob.load(a["cid"])["amount"]) == 0.5
+    assert r.zcard(PENDING_KEY) == 1
+
+
+def test_lost_ack_is_looked_up_not_resubmitted(r):
+    ex = FakeEx(lose_acks=1)
+    ob = Outbox(r, ex, _cfg)
+    rec = ob.persist("sig-2", "ETH/USDT:USDT", "buy", 0.5)
+    order = ob.submit(rec)
+    assert ex.creates == 1 and ex.lookups == 1
+    assert order["clientOrderId"] == rec["cid"]
+    assert ob.load(rec["cid"])["state"] == "acked"
+    assert r.zcard(PENDING_KEY) == 0
+
+
+def test_lost_ack_left_pending_then_recovered_by_sweep(r):
+    ex = FakeEx(lose_acks=1)
+    ob = Outbox(r, ex, lambda: _cfg(outbox_inline_attempts=1))
+    recovered = []
+    ob.on_recovered = lambda rec, order: recovered.append(order["id"])
+    rec = ob.persist("sig-3", "ETH/USDT:USDT", "sell", 0.2, reduce_only=True)
+    with pytest.raises(ccxt.NetworkError):
+        ob.submit(rec)
+    assert ob.load(rec["cid"])["state"] == "pending"
+    ob.sweep()
+    assert ex.creates == 1
+    assert ob.load(rec["cid"])["state"] == "acked"
+    assert recovered == ["1"]
+
+
+def test_exchange_rejection_fails_without_retry(r):
+    ex = FakeEx(reject=ccxt.InsufficientFunds("margin"))
+    ob = Outbox(r, ex, _cfg)
+    rec = ob.persist("sig-4", "ETH/USDT:USDT", "buy", 0.5)
+    with pytest.raises(ccxt.InsufficientFunds):
+        ob.submit(rec)
+    assert ex.creates == 1 and ex.lookups == 0
+    assert ob.load(rec["cid"])["state"] == "failed"
+    assert r.zcard(PENDING_KEY) == 0